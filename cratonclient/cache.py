@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Caching of responses for conditional requests."""
+import collections
+import copy
+import threading
+
+import six
+from six.moves.urllib import parse
+
+
+class ConditionalCache(object):
+    """Revalidate cached GET responses with conditional requests.
+
+    Responses carrying an ``ETag`` or ``Last-Modified`` header are
+    remembered. The next GET of the same URL and parameters is sent with
+    ``If-None-Match``/``If-Modified-Since`` and, if the server answers
+    ``304 Not Modified``, the remembered response is returned in its place.
+    The server then neither renders nor sends a body that has not changed.
+
+    .. code-block:: python
+
+        >>> from cratonclient import cache
+        >>> from cratonclient import session as craton
+        >>> session = craton.Session(
+        ...     username='demo',
+        ...     token='p@$$w0rd',
+        ...     project_id='1',
+        ...     conditional_cache=cache.ConditionalCache(),
+        ... )
+    """
+
+    def __init__(self, max_entries=256):
+        """Initialize our cache holding at most ``max_entries`` responses."""
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return the number of cached responses."""
+        return len(self._entries)
+
+    @staticmethod
+    def key(url, params=None):
+        """Return the cache key of a GET request."""
+        if isinstance(params, dict):
+            params = sorted((k, str(v)) for k, v in six.iteritems(params))
+        elif params:
+            params = sorted(params)
+        query = parse.urlencode(params or [], doseq=True)
+        return '{0}?{1}'.format(url, query) if query else url
+
+    def prepare(self, method, url, kwargs):
+        """Add validators to the headers of a request we have cached."""
+        if method.upper() != 'GET':
+            return
+        with self._lock:
+            entry = self._entries.get(self.key(url, kwargs.get('params')))
+        if entry is None:
+            return
+        headers = kwargs.setdefault('headers', {})
+        etag = entry.headers.get('ETag')
+        last_modified = entry.headers.get('Last-Modified')
+        if etag:
+            headers.setdefault('If-None-Match', etag)
+        if last_modified:
+            headers.setdefault('If-Modified-Since', last_modified)
+
+    def resolve(self, method, url, kwargs, response):
+        """Return the response to use for a request, updating the cache.
+
+        A ``304 Not Modified`` response is replaced by a copy of the cached
+        response with ``from_cache`` set to True.
+        """
+        if method.upper() != 'GET':
+            return response
+        key = self.key(url, kwargs.get('params'))
+        if response.status_code == 304:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.pop(key)
+                    self._entries[key] = entry
+            if entry is None:
+                return response
+            cached = copy.copy(entry)
+            cached.from_cache = True
+            return cached
+
+        headers = getattr(response, 'headers', None) or {}
+        if response.status_code == 200 and (headers.get('ETag') or
+                                            headers.get('Last-Modified')):
+            with self._lock:
+                self._entries.pop(key, None)
+                self._entries[key] = response
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return response
+
+    def clear(self):
+        """Forget every cached response."""
+        with self._lock:
+            self._entries.clear()
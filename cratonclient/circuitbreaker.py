@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Circuit breaker to fail fast while Craton is unhealthy."""
+import collections
+import contextlib
+import logging
+import threading
+
+from oslo_utils import timeutils
+
+from cratonclient import exceptions as exc
+
+LOG = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+FAILURE_EXCEPTIONS = (
+    exc.Timeout,
+    exc.ConnectionFailed,
+    exc.HTTPServerError,
+)
+
+
+class CircuitBreaker(object):
+    """Track request failures and fail fast once too many have failed.
+
+    The breaker starts ``closed`` and remembers the outcome of the last
+    ``window_size`` requests. Timeouts, connection failures and 5xx responses
+    count as failures. Once at least ``minimum_requests`` have been made and
+    the ratio of failures reaches ``failure_ratio`` the breaker is ``open``
+    and every request raises :class:`~cratonclient.exceptions.CircuitOpen`
+    without being attempted. After ``reset_timeout`` seconds the breaker is
+    ``half-open`` and lets ``probe_requests`` requests through. If they all
+    succeed the breaker closes, otherwise it opens again.
+
+    .. code-block:: python
+
+        >>> from cratonclient import circuitbreaker
+        >>> from cratonclient import session as craton
+        >>> session = craton.Session(
+        ...     username='demo',
+        ...     token='p@$$w0rd',
+        ...     project_id='1',
+        ...     circuit_breaker=circuitbreaker.CircuitBreaker(),
+        ... )
+    """
+
+    def __init__(self, failure_ratio=0.5, minimum_requests=10,
+                 window_size=20, reset_timeout=30.0, probe_requests=1,
+                 clock=timeutils.now):
+        """Initialize our circuit breaker.
+
+        :param float failure_ratio:
+            The ratio of failed requests, between 0 and 1, at which the
+            breaker opens.
+        :param int minimum_requests:
+            The number of requests that must be in the window before the
+            breaker may open.
+        :param int window_size:
+            The number of most recent requests to consider.
+        :param float reset_timeout:
+            The number of seconds the breaker stays open before probing.
+        :param int probe_requests:
+            The number of successful probes needed to close the breaker.
+        """
+        self.failure_ratio = failure_ratio
+        self.minimum_requests = minimum_requests
+        self.reset_timeout = reset_timeout
+        self.probe_requests = probe_requests
+        self._clock = clock
+        self._outcomes = collections.deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """Return the current state of the breaker."""
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if (self._state == OPEN and
+                self._clock() - self._opened_at >= self.reset_timeout):
+            LOG.info('Circuit breaker is half-open, probing the server')
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+
+    def _open(self):
+        LOG.warning('Circuit breaker opened, failing requests for %s seconds',
+                    self.reset_timeout)
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+
+    def before_request(self):
+        """Check whether a request may be attempted.
+
+        :raises cratonclient.exceptions.CircuitOpen:
+            If the breaker is open, or half-open with every probe already in
+            flight.
+        """
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == OPEN:
+                retry_after = (self._opened_at + self.reset_timeout -
+                               self._clock())
+                raise exc.CircuitOpen(retry_after=retry_after)
+            if self._state == HALF_OPEN:
+                if self._probes_in_flight >= self.probe_requests:
+                    raise exc.CircuitOpen(retry_after=0.0)
+                self._probes_in_flight += 1
+
+    def record(self, exception=None):
+        """Record the outcome of a request allowed by before_request.
+
+        :param exception:
+            The exception the request raised, if any. Exceptions that are
+            not failures of the server, e.g., a 404, count as successes.
+            Exceptions that are not HTTP related, e.g., a client-side rate
+            limit or deadline, are not counted at all.
+        """
+        if isinstance(exception, exc.DeadlineExceeded):
+            failed = None
+        elif exception is None or isinstance(exception, exc.HTTPError):
+            failed = isinstance(exception, FAILURE_EXCEPTIONS)
+        elif isinstance(exception, FAILURE_EXCEPTIONS):
+            failed = True
+        else:
+            failed = None
+
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                if failed:
+                    self._open()
+                elif failed is not None:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.probe_requests:
+                        LOG.info('Circuit breaker closed')
+                        self._state = CLOSED
+                return
+
+            if self._state != CLOSED or failed is None:
+                return
+            self._outcomes.append(failed)
+            if len(self._outcomes) < self.minimum_requests:
+                return
+            failures = sum(1 for outcome in self._outcomes if outcome)
+            if float(failures) / len(self._outcomes) >= self.failure_ratio:
+                self._open()
+
+    @contextlib.contextmanager
+    def guard(self):
+        """Check the breaker and record the outcome of the wrapped request."""
+        self.before_request()
+        try:
+            yield
+        except Exception as err:
+            self.record(err)
+            raise
+        self.record()
@@ -12,14 +12,19 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 """Craton CLI helper classes and functions."""
+import csv
+import heapq
+import itertools
 import json
 import os
-import prettytable
 import six
+import sys
 import textwrap
 
 from oslo_utils import encodeutils
 
+from cratonclient import exceptions as exc
+
 
 def arg(*args, **kwargs):
     """Decorator for CLI args.
@@ -51,10 +56,85 @@ def add_arg(func, *args, **kwargs):
         func.arguments.insert(0, (args, kwargs))
 
 
+OUTPUT_FORMATS = ('table', 'json', 'jsonl', 'csv', 'value')
+
+
+def format_arg(func):
+    """Add a ``--format`` argument to a shell command."""
+    add_arg(func, '--format',
+            dest='output_format',
+            choices=OUTPUT_FORMATS,
+            default='table',
+            help='Output format: "table" (default), "json", "jsonl", '
+                 '"csv" or "value".')
+    return func
+
+
+def list_format_arg(func):
+    """Add the ``--format`` and ``--chunk-size`` arguments of list commands."""
+    add_arg(func, '--chunk-size',
+            metavar='<rows>',
+            type=int,
+            help='Print a table every <rows> rows, as they are fetched, '
+                 'instead of one table of every row. Rows are only aligned '
+                 'within a table.')
+    return format_arg(func)
+
+
+def _write(text):
+    if six.PY3:
+        sys.stdout.write(text)
+    else:
+        sys.stdout.write(encodeutils.safe_encode(text))
+
+
+def _json_value(value):
+    return six.text_type(value)
+
+
+def _row(o, fields, formatters, mixed_case_fields):
+    row = []
+    for field in fields:
+        if field in formatters:
+            row.append(formatters[field](o))
+        else:
+            if field in mixed_case_fields:
+                field_name = field.replace(' ', '_')
+            else:
+                field_name = field.lower().replace(' ', '_')
+            data = getattr(o, field_name, '')
+            row.append(data)
+    return row
+
+
+def _print_table(rows, field_labels, sortby_index):
+    # NOTE: Only import prettytable when a table is printed, which keeps
+    # the start-up of commands using other formats short.
+    import prettytable
+
+    if sortby_index is None:
+        kwargs = {}
+    else:
+        kwargs = {'sortby': field_labels[sortby_index]}
+    pt = prettytable.PrettyTable(field_labels)
+    pt.align = 'l'
+    for row in rows:
+        pt.add_row(row)
+
+    if six.PY3:
+        print(encodeutils.safe_encode(pt.get_string(**kwargs)).decode())
+    else:
+        print(encodeutils.safe_encode(pt.get_string(**kwargs)))
+
+
 def print_list(objs, fields, formatters=None, sortby_index=0,
-               mixed_case_fields=None, field_labels=None):
+               mixed_case_fields=None, field_labels=None,
+               output_format='table', chunk_size=None):
     """Print a list or objects as a table, one row per object.
 
+    Formats other than ``'table'`` write each row as soon as its object is
+    produced by ``objs``, so that a generator of objects is streamed.
+
     :param objs: iterable of :class:`Resource`
     :param fields: attributes that correspond to columns, in order
     :param formatters: `dict` of callables for field formatting
@@ -63,6 +143,10 @@ def print_list(objs, fields, formatters=None, sortby_index=0,
         have mixed case names (e.g., 'serverId')
     :param field_labels: Labels to use in the heading of the table, default to
         fields.
+    :param output_format: one of :data:`OUTPUT_FORMATS`
+    :param chunk_size: if set, print a table every ``chunk_size`` rows
+        instead of one table of every row. Rows are only sorted within a
+        chunk.
     """
     formatters = formatters or {}
     mixed_case_fields = mixed_case_fields or []
@@ -72,35 +156,171 @@ def print_list(objs, fields, formatters=None, sortby_index=0,
                          "of elements than fields list %(fields)s",
                          {'labels': field_labels, 'fields': fields})
 
-    if sortby_index is None:
-        kwargs = {}
-    else:
-        kwargs = {'sortby': field_labels[sortby_index]}
-    pt = prettytable.PrettyTable(field_labels)
-    pt.align = 'l'
+    rows = (_row(o, fields, formatters, mixed_case_fields) for o in objs)
+    if output_format == 'table':
+        if chunk_size is None:
+            _print_table(rows, field_labels, sortby_index)
+            return
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                _print_table(chunk, field_labels, sortby_index)
+                chunk = []
+        if chunk:
+            _print_table(chunk, field_labels, sortby_index)
+        return
 
-    for o in objs:
-        row = []
-        for field in fields:
-            if field in formatters:
-                row.append(formatters[field](o))
-            else:
-                if field in mixed_case_fields:
-                    field_name = field.replace(' ', '_')
-                else:
-                    field_name = field.lower().replace(' ', '_')
-                data = getattr(o, field_name, '')
-                row.append(data)
-        pt.add_row(row)
+    if output_format == 'csv':
+        writer = csv.writer(sys.stdout)
+        writer.writerow(field_labels)
+        for row in rows:
+            writer.writerow(row)
+        return
+    if output_format == 'value':
+        for row in rows:
+            _write(u' '.join(six.text_type(value) for value in row) + u'\n')
+        return
+    if output_format == 'jsonl':
+        for row in rows:
+            _write(json.dumps(dict(zip(field_labels, row)), sort_keys=True,
+                              default=_json_value) + '\n')
+        return
+    if output_format != 'json':
+        raise ValueError('Unknown output format {0}'.format(output_format))
+    separator = '\n'
+    _write('[')
+    for row in rows:
+        _write(separator + '    ' + json.dumps(
+            dict(zip(field_labels, row)), sort_keys=True,
+            default=_json_value))
+        separator = ',\n'
+    _write('\n]\n')
 
-    if six.PY3:
-        print(encodeutils.safe_encode(pt.get_string(**kwargs)).decode())
+
+def _sort_value(field):
+    def sort_value(o):
+        value = getattr(o, field, None)
+        return (value is None, value)
+    return sort_value
+
+
+def sort_items(objs, sort_key=None, reverse=False, limit=None):
+    """Order and limit objects on the client.
+
+    With a ``limit``, only the ``limit`` first objects are kept in a heap
+    while ``objs`` is consumed, which takes O(n log k) time and O(k)
+    memory. Without a ``sort_key``, objects are passed through lazily in
+    their original order.
+
+    :param objs: iterable of objects
+    :param sort_key: the attribute to order by, if any
+    :param reverse: whether to order from the largest value
+    :param limit: the largest number of objects to return. None or 0 means
+        no limit.
+    :returns: an iterable of objects
+    """
+    if sort_key is None:
+        if limit:
+            return itertools.islice(objs, limit)
+        return objs
+    key = _sort_value(sort_key)
+    if limit:
+        select = heapq.nlargest if reverse else heapq.nsmallest
+        return select(limit, objs, key=key)
+    return sorted(objs, key=key, reverse=reverse)
+
+
+def list_items(manager, output_format='table', chunk_size=None,
+               page_size=100, **params):
+    """List a manager's objects, ordered and limited, for print_list.
+
+    Unless they are sorted, objects printed in a format that streams rows,
+    or as tables of ``chunk_size`` rows, are fetched a page at a time with
+    :meth:`~cratonclient.crud.CRUDClient.iterate` so that rows are printed
+    as pages arrive. Against a server that does not support paging, they
+    are listed at once after the first page. Otherwise every object is
+    needed before the first row is printed and they are listed at once.
+
+    :param manager: a :class:`~cratonclient.crud.CRUDClient` to list
+    :param output_format: the format the objects will be printed in
+    :param chunk_size: the number of rows of each printed table, if any
+    :param page_size: the number of objects to request per page
+    :param params: keyword arguments used to list the objects
+    :returns: an iterable of objects, see :func:`sort_items`
+    """
+    sort_key = params.get('sort_key')
+    limit = params.get('limit')
+    if sort_key is None and (output_format != 'table' or chunk_size):
+        params.pop('limit', None)
+        if limit:
+            page_size = min(page_size, limit)
+        objs = manager.iterate(page_size=page_size, **params)
     else:
-        print(encodeutils.safe_encode(pt.get_string(**kwargs)))
+        objs = manager.list(**params)
+    # NOTE: The server may ignore sorting and limits, so apply them on the
+    # client as well.
+    return sort_items(objs, sort_key=sort_key,
+                      reverse=params.get('sort_dir') == 'desc', limit=limit)
+
+
+def read_records(stream, record_format='jsonl'):
+    """Lazily read records from a CSV or JSON-lines stream.
+
+    :param stream: a file-like object open for reading text
+    :param record_format: either ``'csv'``, whose first row holds the field
+        names, or ``'jsonl'``, holding one JSON object per line
+    :returns: a generator of dictionaries. Empty CSV values are left out.
+    """
+    if record_format == 'csv':
+        for row in csv.DictReader(stream):
+            yield {k: v for (k, v) in row.items() if v not in (None, '')}
+        return
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise exc.CommandError('Line {0} is not valid JSON: {1}'
+                                   .format(number, e))
+        if not isinstance(record, dict):
+            raise exc.CommandError('Line {0} is not a JSON object'
+                                   .format(number))
+        yield record
+
+
+def print_watch(manager, fields, interval=2.0, **params):
+    """Watch a manager's listing and print only the rows that change.
+
+    The first table holds every object. After that, a table of the objects
+    added, changed or removed, with an extra ``change`` column, is printed
+    whenever the listing changes. Interrupting the watch exits quietly.
+
+    :param manager: a :class:`~cratonclient.crud.CRUDClient` to watch
+    :param fields: attributes that correspond to columns, in order
+    :param interval: the number of seconds between two polls
+    :param params: keyword arguments used to list the objects
+    """
+    first = True
+    try:
+        for events in manager.watch(interval=interval, **params):
+            if first:
+                first = False
+                print_list([event.resource for event in events], fields)
+                continue
+            actions = {id(event.resource): event.action for event in events}
+            print_list([event.resource for event in events],
+                       ['change'] + list(fields),
+                       formatters={'change': lambda o: actions[id(o)]},
+                       sortby_index=None)
+    except KeyboardInterrupt:
+        pass
 
 
 def print_dict(dct, dict_property="Property", wrap=0, dict_value='Value',
-               json_flag=False):
+               json_flag=False, output_format='table'):
     """Print a `dict` as a table of two columns.
 
     :param dct: `dict` to print
@@ -108,10 +328,27 @@ def print_dict(dct, dict_property="Property", wrap=0, dict_value='Value',
     :param wrap: wrapping for the second column
     :param dict_value: header label for the value (second) column
     :param json_flag: print `dict` as JSON instead of table
+    :param output_format: one of :data:`OUTPUT_FORMATS`
     """
-    if json_flag:
-        print(json.dumps(dct, indent=4, separators=(',', ': ')))
+    if json_flag or output_format == 'json':
+        print(json.dumps(dct, indent=4, separators=(',', ': '),
+                         sort_keys=True, default=_json_value))
         return
+    if output_format == 'jsonl':
+        print(json.dumps(dct, sort_keys=True, default=_json_value))
+        return
+    if output_format == 'csv':
+        writer = csv.writer(sys.stdout)
+        writer.writerow([dict_property, dict_value])
+        for k, v in sorted(dct.items()):
+            writer.writerow([k, v])
+        return
+    if output_format == 'value':
+        for _, v in sorted(dct.items()):
+            _write(six.text_type(v) + u'\n')
+        return
+    import prettytable
+
     pt = prettytable.PrettyTable([dict_property, dict_value])
     pt.align = 'l'
     for k, v in sorted(dct.items()):
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Craton helpers for the files it caches."""
+import contextlib
+import io
+import os
+import tempfile
+
+
+@contextlib.contextmanager
+def atomic_write(path):
+    """Open a temporary file that replaces ``path`` once written.
+
+    The file is created next to ``path``, in a directory created if needed,
+    and renamed over it only if the block succeeds. Readers therefore see
+    either the previous or the new contents, never a partial file.
+
+    .. code-block:: python
+
+        >>> with fileutils.atomic_write(path) as f:
+        ...     f.write(u'contents')
+
+    :param str path:
+        The path of the file to replace.
+    :returns:
+        A text file, encoded in UTF-8, to write the new contents to.
+    :raises IOError, OSError:
+        If the file could not be created, written or renamed.
+    """
+    directory = os.path.dirname(path) or '.'
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory,
+                                                  suffix='.tmp')
+    try:
+        with io.open(descriptor, 'w', encoding='utf-8') as f:
+            yield f
+        os.rename(temporary_path, path)
+    except Exception:
+        os.unlink(temporary_path)
+        raise
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""On-disk cache of resource IDs for shell completion."""
+import io
+import logging
+import os
+import threading
+
+import six
+
+from cratonclient.common import fileutils
+
+LOG = logging.getLogger(__name__)
+
+CACHE_DIRECTORY = os.path.join('~', '.cache', 'craton', 'completion')
+
+
+class CompletionCache(object):
+    """Remember the IDs and human IDs of resources the client has seen.
+
+    A :class:`~cratonclient.crud.CRUDClient` whose session has a completion
+    cache records every resource it lists, retrieves, creates or updates,
+    and forgets the ones it deletes. A listing without filters replaces
+    what was remembered for its resource type and region. Changes are kept
+    in memory until :meth:`CompletionCache.flush` writes each file once.
+
+    Every resource type and region has its own file, named after the
+    manager's ``key`` and, for resources within a region, the region's ID,
+    e.g., ``host-1``. Each line holds an ID and the resource's
+    :attr:`~cratonclient.crud.Resource.human_id`, separated by a space, so
+    that a completion script can read them without Python.
+
+    .. code-block:: python
+
+        >>> from cratonclient import completion
+        >>> from cratonclient import session as craton
+        >>> session = craton.Session(
+        ...     username='demo',
+        ...     token='p@$$w0rd',
+        ...     project_id='1',
+        ...     completion_cache=completion.CompletionCache(),
+        ... )
+
+        >>> session.completion_cache.flush()
+
+    Failing to read or write the cache is logged and otherwise ignored.
+    """
+
+    def __init__(self, directory=CACHE_DIRECTORY):
+        """Initialize our cache stored in ``directory``."""
+        self.directory = os.path.expanduser(directory)
+        self._lock = threading.Lock()
+        # NOTE: Maps (key, region_id) to whether the file is replaced and
+        # the human IDs to write, keyed by ID, where None forgets the ID.
+        self._pending = {}
+
+    def path(self, key, region_id=None):
+        """Return the path of the file of a resource type and region."""
+        name = key if region_id is None else '{0}-{1}'.format(key, region_id)
+        return os.path.join(self.directory, name)
+
+    def entries(self, key, region_id=None):
+        """Return the remembered human IDs keyed by ID.
+
+        IDs are strings and resources without a human ID map to ``''``.
+        Changes not yet flushed are included.
+        """
+        with self._lock:
+            pending = self._pending.get((key, region_id))
+            if pending is not None:
+                pending = (pending[0], dict(pending[1]))
+        if pending is None:
+            return self._read(key, region_id)
+        return self._apply(key, region_id, *pending)
+
+    def _read(self, key, region_id):
+        entries = {}
+        try:
+            with io.open(self.path(key, region_id), encoding='utf-8') as f:
+                for line in f:
+                    item_id, _, human_id = line.rstrip('\n').partition(' ')
+                    if item_id:
+                        entries[item_id] = human_id
+        except (IOError, OSError):
+            pass
+        return entries
+
+    def _write(self, key, region_id, entries):
+        path = self.path(key, region_id)
+        try:
+            with fileutils.atomic_write(path) as f:
+                for item_id in sorted(entries):
+                    f.write(u'{0} {1}\n'.format(item_id, entries[item_id]))
+        except (IOError, OSError) as e:
+            LOG.debug('Could not update the completion cache %s: %s', path,
+                      e)
+
+    def _apply(self, key, region_id, replace, changes):
+        entries = {} if replace else self._read(key, region_id)
+        for item_id, human_id in six.iteritems(changes):
+            if human_id is None:
+                entries.pop(item_id, None)
+            else:
+                entries[item_id] = human_id
+        return entries
+
+    def flush(self):
+        """Write every change since the last flush, one file at a time."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for (key, region_id), (replace, changes) in six.iteritems(pending):
+            entries = self._read(key, region_id)
+            updated = self._apply(key, region_id, replace, changes)
+            if updated != entries:
+                self._write(key, region_id, updated)
+
+    def add(self, key, region_id, resources, replace=False):
+        """Remember resources of one type and region.
+
+        :param str key:
+            The resource type, i.e., the manager's ``key``.
+        :param region_id:
+            The ID of the resources' region, or None.
+        :param resources:
+            An iterable of :class:`~cratonclient.crud.Resource`.
+        :param bool replace:
+            Whether to forget every other resource of this type and region.
+        """
+        seen = {}
+        for resource in resources:
+            item_id = getattr(resource, 'id', None)
+            if item_id is not None:
+                seen[six.text_type(item_id)] = resource.human_id or u''
+        with self._lock:
+            if replace:
+                self._pending[key, region_id] = (True, seen)
+            else:
+                _, changes = self._pending.setdefault((key, region_id),
+                                                      (False, {}))
+                changes.update(seen)
+
+    def remove(self, key, region_id, item_id):
+        """Forget a resource that was deleted."""
+        with self._lock:
+            _, changes = self._pending.setdefault((key, region_id),
+                                                  (False, {}))
+            changes[six.text_type(item_id)] = None
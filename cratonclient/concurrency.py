@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Helpers for making many requests to Craton concurrently."""
+import collections
+import logging
+import threading
+
+from concurrent import futures
+from oslo_utils import timeutils
+
+from cratonclient import deadline
+from cratonclient import exceptions as exc
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+
+Outcome = collections.namedtuple('Outcome', ['item', 'result', 'exception'])
+
+
+class AdaptiveLimiter(object):
+    """Limit concurrency with additive increase, multiplicative decrease.
+
+    Every healthy response grows the limit by roughly ``increase`` per
+    ``limit`` responses, i.e., by ``increase`` for each round of concurrent
+    requests. A 429 or 5xx response, a timeout, a connection failure or a
+    response slower than ``latency_threshold`` multiplies the limit by
+    ``decrease``, at most once per ``backoff_interval`` seconds so that a
+    single burst of failures is only counted once.
+
+    .. code-block:: python
+
+        >>> from cratonclient import concurrency
+        >>> limiter = concurrency.AdaptiveLimiter(initial=4, maximum=64)
+        >>> limiter.install(session)
+        >>> outcomes = concurrency.map_concurrently(
+        ...     lambda host: inventory.hosts.update(host_id=host.id,
+        ...                                         note='patched'),
+        ...     inventory.hosts.list(),
+        ...     limiter=limiter,
+        ... )
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=64, increase=1.0,
+                 decrease=0.5, latency_threshold=None, backoff_interval=1.0,
+                 clock=timeutils.now):
+        """Initialize our limiter.
+
+        :param int initial:
+            The concurrency to start with.
+        :param int minimum:
+            The concurrency never drops below this.
+        :param int maximum:
+            The concurrency never grows above this.
+        :param float increase:
+            How much the limit grows per round of healthy responses.
+        :param float decrease:
+            The factor, between 0 and 1, applied to the limit on back off.
+        :param float latency_threshold:
+            If provided, responses slower than this many seconds cause the
+            limit to back off.
+        :param float backoff_interval:
+            The least number of seconds between two back offs.
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_threshold = latency_threshold
+        self.backoff_interval = backoff_interval
+        self._clock = clock
+        self._limit = float(min(max(initial, minimum), maximum))
+        self._in_flight = 0
+        self._last_backoff = None
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self):
+        """Return the current concurrency limit."""
+        with self._condition:
+            return int(self._limit)
+
+    @property
+    def in_flight(self):
+        """Return the number of calls currently holding a slot."""
+        with self._condition:
+            return self._in_flight
+
+    def acquire(self):
+        """Wait for a free slot."""
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self):
+        """Return a slot taken by :meth:`acquire`."""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def __enter__(self):
+        """Acquire a slot."""
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Release the slot."""
+        self.release()
+
+    def on_success(self):
+        """Grow the limit after a healthy response."""
+        with self._condition:
+            previous = int(self._limit)
+            self._limit = min(self._limit + self.increase / self._limit,
+                              float(self.maximum))
+            if int(self._limit) > previous:
+                self._condition.notify_all()
+
+    def on_overload(self):
+        """Shrink the limit after a sign of overload."""
+        with self._condition:
+            now = self._clock()
+            if (self._last_backoff is not None and
+                    now - self._last_backoff < self.backoff_interval):
+                return
+            self._last_backoff = now
+            self._limit = max(self._limit * self.decrease,
+                              float(self.minimum))
+            LOG.debug('Backing off concurrency to %d', int(self._limit))
+
+    def observe_response(self, request_event):
+        """Adjust the limit based on a response received by a Session."""
+        status = request_event.status_code
+        latency = request_event.timings.get('total')
+        if status == 429 or status >= 500 or (
+                self.latency_threshold is not None and
+                latency is not None and latency > self.latency_threshold):
+            self.on_overload()
+        else:
+            self.on_success()
+
+    def observe_error(self, request_event):
+        """Adjust the limit based on a request that got no response."""
+        exception = request_event.exception
+        if isinstance(exception, exc.DeadlineExceeded):
+            return
+        if request_event.response is None and isinstance(
+                exception, (exc.Timeout, exc.ConnectionFailed)):
+            self.on_overload()
+
+    def install(self, session):
+        """Adapt to the responses of requests made by a session."""
+        session.register_hook('after-response', self.observe_response)
+        session.register_hook('on-error', self.observe_error)
+
+    def uninstall(self, session):
+        """Stop adapting to the requests made by a session."""
+        session.unregister_hook('after-response', self.observe_response)
+        session.unregister_hook('on-error', self.observe_error)
+
+
+def _call(func, item, active_deadline, limiter):
+    if limiter is not None:
+        with limiter:
+            return _call(func, item, active_deadline, None)
+    if active_deadline is None:
+        return func(item)
+    with active_deadline:
+        active_deadline.check()
+        return func(item)
+
+
+def map_concurrently(func, items, max_workers=None, limiter=None):
+    """Call ``func`` for each item using a pool of threads.
+
+    Any :class:`~cratonclient.deadline.Deadline` active in the calling
+    thread is honored by every call. Once it expires, work that has not
+    started yet is cancelled and we stop waiting for work in progress.
+
+    .. code-block:: python
+
+        >>> from cratonclient import concurrency
+        >>> outcomes = concurrency.map_concurrently(
+        ...     lambda cell: inventory.hosts.list(cell_id=cell.id),
+        ...     inventory.cells.list(),
+        ... )
+
+    :param func:
+        A callable accepting a single item.
+    :param items:
+        An iterable of items.
+    :param int max_workers:
+        The largest number of calls to make at once. When a ``limiter`` is
+        given, this defaults to its maximum.
+    :param limiter:
+        An optional :class:`AdaptiveLimiter` that every call must acquire a
+        slot from.
+    :returns:
+        A list of :class:`Outcome` in the same order as ``items``. Each has
+        either a ``result`` or the ``exception`` raised by ``func``.
+    """
+    items = list(items)
+    if not items:
+        return []
+    if max_workers is None:
+        max_workers = DEFAULT_MAX_WORKERS
+        if limiter is not None:
+            max_workers = limiter.maximum
+    active_deadline = deadline.current()
+    outcomes = [None] * len(items)
+    executor = futures.ThreadPoolExecutor(
+        max_workers=max(min(max_workers, len(items)), 1))
+    try:
+        pending = {
+            executor.submit(_call, func, item, active_deadline,
+                            limiter): index
+            for index, item in enumerate(items)
+        }
+        timeout = None
+        if active_deadline is not None:
+            timeout = active_deadline.remaining()
+        done, not_done = futures.wait(pending, timeout=timeout)
+        for future in done:
+            index = pending[future]
+            error = future.exception()
+            if error is None:
+                outcomes[index] = Outcome(items[index], future.result(), None)
+            else:
+                outcomes[index] = Outcome(items[index], None, error)
+        for future in not_done:
+            future.cancel()
+            index = pending[future]
+            outcomes[index] = Outcome(items[index], None,
+                                      exc.DeadlineExceeded())
+    finally:
+        executor.shutdown(wait=False)
+    return outcomes
+
+
+def _outcome(item, future, active_deadline):
+    timeout = None
+    if active_deadline is not None:
+        timeout = active_deadline.remaining()
+    try:
+        result = future.result(timeout=timeout)
+    except futures.TimeoutError:
+        if not future.done():
+            future.cancel()
+            return Outcome(item, None, exc.DeadlineExceeded())
+        return Outcome(item, None, future.exception())
+    except Exception as error:
+        return Outcome(item, None, error)
+    return Outcome(item, result, None)
+
+
+def imap_concurrently(func, items, max_workers=None, limiter=None):
+    """Lazily call ``func`` for each item using a pool of threads.
+
+    Unlike :func:`map_concurrently`, items are consumed as work is
+    submitted and outcomes are yielded as soon as they are ready, in the
+    same order as ``items``. At most twice ``max_workers`` items are held at
+    once, so arbitrarily long iterables can be processed in constant memory.
+
+    .. code-block:: python
+
+        >>> from cratonclient import concurrency
+        >>> for outcome in concurrency.imap_concurrently(
+        ...         lambda record: inventory.hosts.create(**record),
+        ...         read_records(sys.stdin)):
+        ...     print(outcome.item['name'], outcome.exception)
+
+    :param func:
+        A callable accepting a single item.
+    :param items:
+        An iterable of items. It is only iterated in the calling thread.
+    :param int max_workers:
+        The largest number of calls to make at once. When a ``limiter`` is
+        given, this defaults to its maximum.
+    :param limiter:
+        An optional :class:`AdaptiveLimiter` that every call must acquire a
+        slot from.
+    :returns:
+        A generator of :class:`Outcome`.
+    """
+    if max_workers is None:
+        max_workers = DEFAULT_MAX_WORKERS
+        if limiter is not None:
+            max_workers = limiter.maximum
+    max_workers = max(max_workers, 1)
+    active_deadline = deadline.current()
+    executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+    pending = collections.deque()
+    try:
+        for item in items:
+            pending.append((item, executor.submit(
+                _call, func, item, active_deadline, limiter)))
+            if len(pending) >= 2 * max_workers:
+                item, future = pending.popleft()
+                yield _outcome(item, future, active_deadline)
+        while pending:
+            item, future = pending.popleft()
+            yield _outcome(item, future, active_deadline)
+    finally:
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
@@ -12,9 +12,29 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 """Client for CRUD operations."""
+import collections
 import copy
+import time
 
 from oslo_utils import strutils
+from oslo_utils import timeutils
+
+from cratonclient import cache
+from cratonclient import concurrency
+from cratonclient import exceptions as exc
+
+ADDED = 'added'
+CHANGED = 'changed'
+REMOVED = 'removed'
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+
+WatchEvent = collections.namedtuple('WatchEvent',
+                                    ['action', 'id', 'resource'])
+Operation = collections.namedtuple('Operation',
+                                   ['action', 'key', 'id', 'data'])
 
 
 class CRUDClient(object):
@@ -23,6 +43,10 @@ class CRUDClient(object):
     key = None
     base_path = None
     resource_class = None
+    #: The query parameter the server filters listings by ID with, if any.
+    id_filter = None
+    #: The fields identifying an item for :meth:`reconcile`.
+    natural_key = None
 
     def __init__(self, session, url):
         """Initialize our Client with a session and base url."""
@@ -76,38 +100,354 @@ class CRUDClient(object):
 
         return url
 
+    def operation_name(self, operation):
+        """Return the name used to identify an operation in request hooks."""
+        return '{0}.{1}'.format(self.key, operation)
+
     def create(self, **kwargs):
         """Create a new item based on the keyword arguments provided."""
         url = self.build_url(path_arguments=kwargs)
-        response = self.session.post(url, json=kwargs)
-        return self.resource_class(self, response.json())
+        response = self.session.post(url, json=kwargs,
+                                     operation=self.operation_name('create'))
+        return self._remember(self._load(response))
 
     def get(self, **kwargs):
         """Retrieve the item based on the keyword arguments provided."""
         url = self.build_url(path_arguments=kwargs)
-        response = self.session.get(url)
-        return self.resource_class(self, response.json())
+        response = self.session.get(url, operation=self.operation_name('get'))
+        return self._remember(self._load(response))
+
+    def get_many(self, ids, max_workers=None, limiter=None):
+        """Retrieve many items by ID.
+
+        If the manager has an ``id_filter``, the items are listed with a
+        single request filtered by ID. Otherwise, they are retrieved with
+        concurrent GET requests.
+
+        .. code-block:: python
+
+            >>> outcomes = inventory.hosts.get_many([4, 8, 15])
+            >>> for host_id, outcome in outcomes.items():
+            ...     if outcome.exception is None:
+            ...         print(outcome.result.name)
+
+        :param ids:
+            An iterable of IDs. Duplicates are retrieved once.
+        :param int max_workers:
+            The largest number of GET requests to make at once. Defaults to
+            the ``limiter``'s maximum, if any, or
+            :data:`~cratonclient.concurrency.DEFAULT_MAX_WORKERS`.
+        :param limiter:
+            An optional :class:`~cratonclient.concurrency.AdaptiveLimiter`
+            for the GET requests.
+        :returns:
+            An ordered dictionary of :class:`~cratonclient.concurrency.Outcome`
+            keyed by ID. Items that do not exist have a
+            :class:`~cratonclient.exceptions.NotFound` exception.
+        """
+        ids = list(collections.OrderedDict.fromkeys(ids))
+        if not ids:
+            return collections.OrderedDict()
+        if self.id_filter is not None:
+            found = {resource.id: resource
+                     for resource in self.list(**{self.id_filter: ids})}
+            outcomes = [
+                concurrency.Outcome(item_id, found[item_id], None)
+                if item_id in found else
+                concurrency.Outcome(item_id, None, exc.NotFound())
+                for item_id in ids
+            ]
+        else:
+            outcomes = concurrency.map_concurrently(
+                lambda item_id: self.get(
+                    **{'{0}_id'.format(self.key): item_id}),
+                ids, max_workers=max_workers, limiter=limiter)
+        return collections.OrderedDict(
+            (outcome.item, outcome) for outcome in outcomes)
 
     def list(self, **kwargs):
-        """List the items from this endpoint."""
+        """List the items from this endpoint.
+
+        A ``conditional_cache`` keyword argument is not a filter but the
+        :class:`~cratonclient.cache.ConditionalCache` revalidating this
+        listing in place of the session's.
+        """
+        request_kwargs = {'operation': self.operation_name('list')}
+        conditional_cache = kwargs.pop('conditional_cache', None)
+        if conditional_cache is not None:
+            request_kwargs['conditional_cache'] = conditional_cache
         url = self.build_url(path_arguments=kwargs)
-        response = self.session.get(url, params=kwargs)
-        return [self.resource_class(self, item) for item in response.json()]
+        response = self.session.get(url, params=kwargs, **request_kwargs)
+        resources = self._load(response, many=True)
+        completion_cache = getattr(self.session, 'completion_cache', None)
+        if completion_cache is not None:
+            # NOTE: Only a listing without filters holds every item.
+            completion_cache.add(self.key, getattr(self, 'region_id', None),
+                                 resources,
+                                 replace=set(kwargs) <= set(['region_id']))
+        return resources
+
+    def watch(self, interval=2.0, max_polls=None, sleep=time.sleep,
+              **kwargs):
+        """Poll the list of items and yield only what changed.
+
+        Every ``interval`` seconds the items are listed again and compared,
+        by ``id``, to the previous listing. Each poll with changes yields a
+        list of :class:`WatchEvent`. The first poll reports every item as
+        added. Items that were removed are reported with the resource last
+        seen.
+
+        .. code-block:: python
+
+            >>> for events in inventory.hosts.watch(cell_id=4):
+            ...     for event in events:
+            ...         print(event.action, event.id)
+
+        Unless the session already has one, a
+        :class:`~cratonclient.cache.ConditionalCache` of the watch's own is
+        used so that the server only sends listings that changed.
+
+        :param float interval:
+            The number of seconds to wait between two polls.
+        :param int max_polls:
+            The number of polls after which to stop. By default, we poll
+            forever.
+        :param sleep:
+            The callable used to wait between polls.
+        :param kwargs:
+            Passed to :meth:`list` on every poll.
+        """
+        watch_cache = None
+        if getattr(self.session, 'conditional_cache', False) is None:
+            # NOTE: The cache is only passed to our own listings since the
+            # session may be shared with other threads.
+            watch_cache = cache.ConditionalCache(max_entries=1)
+        previous = {}
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            if polls:
+                sleep(interval)
+            polls += 1
+            params = copy.deepcopy(kwargs)
+            if watch_cache is not None:
+                params['conditional_cache'] = watch_cache
+            current = collections.OrderedDict(
+                (resource.id, resource) for resource in self.list(**params))
+            events = self._diff(previous, current)
+            previous = current
+            if events:
+                yield events
+
+    def _natural_key(self, info):
+        return tuple(info.get(field) for field in self.natural_key)
+
+    def plan(self, desired, prune=False, **kwargs):
+        """Compute the operations that make the items match ``desired``.
+
+        Desired records are matched to the listed items by
+        :attr:`natural_key`. Unmatched records are created and matched
+        records are updated with only the fields that differ.
+
+        :param desired:
+            An iterable of dictionaries describing the desired items.
+        :param bool prune:
+            Whether to delete listed items that are not desired.
+        :param kwargs:
+            Passed to :meth:`list` to fetch the current items.
+        :returns:
+            A list of :class:`Operation`, creations first, then updates,
+            then deletions.
+        """
+        if not self.natural_key:
+            raise ValueError('{0} has no natural key to reconcile '
+                             'by'.format(self.__class__.__name__))
+        current = {}
+        for resource in self.list(**kwargs):
+            info = resource.to_dict()
+            current[self._natural_key(info)] = info
+
+        creates, updates, seen = [], [], set()
+        for record in desired:
+            key = self._natural_key(record)
+            if key in seen:
+                raise ValueError('{0} is desired more than once'.format(key))
+            seen.add(key)
+            info = current.get(key)
+            if info is None:
+                creates.append(Operation(CREATE, key, None, dict(record)))
+                continue
+            changes = {field: value for field, value in record.items()
+                       if info.get(field) != value}
+            if changes:
+                updates.append(Operation(UPDATE, key, info['id'], changes))
+
+        deletes = []
+        if prune:
+            deletes = [Operation(DELETE, key, info['id'], None)
+                       for key, info in current.items()
+                       if key not in seen]
+            deletes.sort(key=lambda operation: operation.id)
+        return creates + updates + deletes
+
+    def _execute(self, operation):
+        id_argument = '{0}_id'.format(self.key)
+        if operation.action == CREATE:
+            return self.create(**operation.data)
+        if operation.action == UPDATE:
+            data = dict(operation.data)
+            data[id_argument] = operation.id
+            return self.update(**data)
+        return self.delete(**{id_argument: operation.id})
+
+    def reconcile(self, desired, dry_run=False, prune=False,
+                  max_workers=None, limiter=None, **kwargs):
+        """Create, update and delete items so they match ``desired``.
+
+        .. code-block:: python
+
+            >>> for operation in inventory.hosts.reconcile(
+            ...         desired_hosts, dry_run=True):
+            ...     print(operation.action, operation.key, operation.data)
+            >>> outcomes = inventory.hosts.reconcile(desired_hosts)
+
+        :param desired:
+            An iterable of dictionaries describing the desired items.
+        :param bool dry_run:
+            Whether to only return the planned operations.
+        :param bool prune:
+            Whether to delete listed items that are not desired.
+        :param int max_workers:
+            The largest number of operations to run at once. Defaults to the
+            ``limiter``'s maximum, if any, or
+            :data:`~cratonclient.concurrency.DEFAULT_MAX_WORKERS`.
+        :param limiter:
+            An optional :class:`~cratonclient.concurrency.AdaptiveLimiter`
+            for the operations.
+        :param kwargs:
+            Passed to :meth:`list` to fetch the current items.
+        :returns:
+            The list of :class:`Operation` from :meth:`plan` when
+            ``dry_run`` is True, otherwise a list of
+            :class:`~cratonclient.concurrency.Outcome` whose ``item`` is
+            the operation.
+        """
+        operations = self.plan(desired, prune=prune, **kwargs)
+        if dry_run:
+            return operations
+        return concurrency.map_concurrently(self._execute, operations,
+                                            max_workers=max_workers,
+                                            limiter=limiter)
+
+    @staticmethod
+    def _diff(previous, current):
+        events = []
+        for item_id, resource in current.items():
+            if item_id not in previous:
+                events.append(WatchEvent(ADDED, item_id, resource))
+            elif previous[item_id].to_dict() != resource.to_dict():
+                events.append(WatchEvent(CHANGED, item_id, resource))
+        for item_id, resource in previous.items():
+            if item_id not in current:
+                events.append(WatchEvent(REMOVED, item_id, resource))
+        return events
+
+    def iterate(self, page_size=100, **kwargs):
+        """Lazily list the items, one page at a time.
+
+        Pages are requested with ``limit`` and a ``marker`` set to the ID of
+        the last item of the previous page, so only one page is held in
+        memory at a time. If the server ignores the marker, i.e., returns
+        the first page again, the items are listed at once instead and
+        those not yielded yet are yielded.
+
+        .. code-block:: python
+
+            >>> for host in inventory.hosts.iterate(page_size=500):
+            ...     print(host.name)
+
+        :param int page_size:
+            The number of items to request per page.
+        :param kwargs:
+            Passed to :meth:`list` for every page.
+        """
+        marker = None
+        first_ids = None
+        while True:
+            params = copy.deepcopy(kwargs)
+            params['limit'] = page_size
+            if marker is not None:
+                params['marker'] = marker
+            page = self.list(**params)
+            if not page:
+                return
+            if first_ids is not None and page[0].id in first_ids:
+                # NOTE: The server ignored our marker and only the first
+                # page was yielded. Rather than dropping the other items,
+                # list them without paging.
+                for resource in self.list(**copy.deepcopy(kwargs)):
+                    if resource.id not in first_ids:
+                        yield resource
+                return
+            if first_ids is None:
+                first_ids = set(resource.id for resource in page)
+            for resource in page:
+                yield resource
+            if len(page) != page_size:
+                return
+            marker = page[-1].id
 
     def update(self, **kwargs):
         """Update the item based on the keyword arguments provided."""
         url = self.build_url(path_arguments=kwargs)
-        response = self.session.put(url, json=kwargs)
-        return self.resource_class(self, response.json())
+        response = self.session.put(url, json=kwargs,
+                                    operation=self.operation_name('update'))
+        return self._remember(self._load(response))
 
     def delete(self, **kwargs):
         """Delete the item based on the keyword arguments provided."""
+        item_id = kwargs.get('{0}_id'.format(self.key))
         url = self.build_url(path_arguments=kwargs)
-        response = self.session.delete(url, params=kwargs)
+        response = self.session.delete(url, params=kwargs,
+                                       operation=self.operation_name('delete'))
         if 200 <= response.status_code < 300:
+            completion_cache = getattr(self.session, 'completion_cache', None)
+            if completion_cache is not None and item_id is not None:
+                completion_cache.remove(self.key,
+                                        getattr(self, 'region_id', None),
+                                        item_id)
             return True
         return False
 
+    def _remember(self, resource):
+        """Record a resource in the session's completion cache, if any."""
+        completion_cache = getattr(self.session, 'completion_cache', None)
+        if completion_cache is not None:
+            completion_cache.add(self.key, getattr(self, 'region_id', None),
+                                 [resource])
+        return resource
+
+    def _load(self, response, many=False):
+        """Convert a response body into resources and time the conversion."""
+        stopwatch = timeutils.StopWatch().start()
+        request_event = getattr(response, 'request_event', None)
+        request_id = None
+        if request_event is not None:
+            request_id = (request_event.server_request_id or
+                          request_event.request_id)
+
+        body = response.json()
+        if many:
+            result = [self.resource_class(self, item, request_id=request_id)
+                      for item in body]
+        else:
+            result = self.resource_class(self, body, request_id=request_id)
+
+        if request_event is not None:
+            request_event.timings['parse'] = stopwatch.elapsed()
+            request_event.resources = result
+            self.session.dispatch_hook('after-parse', request_event)
+        return result
+
 
 # NOTE(sigmavirus24): Credit for this Resource object goes to the
 # keystoneclient developers and contributors.
@@ -120,14 +460,16 @@ class Resource(object):
     HUMAN_ID = False
     NAME_ATTR = 'name'
 
-    def __init__(self, manager, info, loaded=False):
+    def __init__(self, manager, info, loaded=False, request_id=None):
         """Populate and bind to a manager.
 
         :param manager: BaseManager object
         :param info: dictionary representing resource attributes
         :param loaded: prevent lazy-loading if set to True
+        :param request_id: ID of the request that retrieved this resource
         """
         self.manager = manager
+        self._request_id = request_id
         self._info = info
         self._add_details(info)
         self._loaded = loaded
@@ -140,11 +482,17 @@ class Resource(object):
         info = ", ".join("%s=%s" % (k, getattr(self, k)) for k in reprkeys)
         return "<%s %s>" % (self.__class__.__name__, info)
 
+    @property
+    def request_id(self):
+        """ID of the request that last retrieved this resource."""
+        return self.__dict__.get('_request_id')
+
     @property
     def human_id(self):
         """Human-readable ID which can be used for bash completion."""
         if self.HUMAN_ID:
-            name = getattr(self, self.NAME_ATTR, None)
+            # NOTE: Do not lazy-load a resource to compute its human ID.
+            name = self._info.get(self.NAME_ATTR)
             if name is not None:
                 return strutils.to_slug(name)
         return None
@@ -181,11 +529,10 @@ class Resource(object):
         if not hasattr(self.manager, 'get'):
             return
 
-        new = self.manager.get(self.id)
+        new = self.manager.get(**{'{0}_id'.format(self.manager.key): self.id})
         if new:
             self._add_details(new._info)
-            self._add_details(
-                {'x_request_id': self.manager.client.last_request_id})
+            self._request_id = new.request_id
 
     def __eq__(self, other):
         """Define equality for resources."""
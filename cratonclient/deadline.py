@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Deadlines bounding the total time spent on a group of requests."""
+import threading
+
+from oslo_utils import timeutils
+
+from cratonclient import exceptions as exc
+
+_local = threading.local()
+
+
+class Deadline(object):
+    """A point in time by which a group of operations must finish.
+
+    While a deadline is active, every request made through a
+    :class:`~cratonclient.session.Session` in the same thread has its
+    timeout shrunk to the time remaining and raises
+    :class:`~cratonclient.exceptions.DeadlineExceeded` once the deadline has
+    passed. Fan-out helpers such as
+    :func:`cratonclient.concurrency.map_concurrently` carry the deadline
+    into their worker threads.
+
+    .. code-block:: python
+
+        >>> from cratonclient import deadline
+        >>> with deadline.Deadline(2.0):
+        ...     for cell in inventory.cells.list():
+        ...         hosts = inventory.hosts.list(cell_id=cell.id)
+
+    Deadlines nest; the earliest active deadline always wins.
+    """
+
+    def __init__(self, timeout, clock=timeutils.now):
+        """Initialize our deadline ``timeout`` seconds from now."""
+        self.timeout = timeout
+        self._clock = clock
+        self.expires_at = clock() + timeout
+
+    def __repr__(self):
+        """Return a string representation of the deadline."""
+        return '<Deadline remaining={0:.3f}>'.format(self.remaining())
+
+    def remaining(self):
+        """Return the number of seconds left, never less than zero."""
+        return max(self.expires_at - self._clock(), 0.0)
+
+    def expired(self):
+        """Return whether the deadline has passed."""
+        return self.remaining() <= 0
+
+    def check(self):
+        """Return the seconds remaining or raise if the deadline passed.
+
+        :raises cratonclient.exceptions.DeadlineExceeded:
+            If there is no time left.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise exc.DeadlineExceeded()
+        return remaining
+
+    def __enter__(self):
+        """Activate the deadline for the current thread."""
+        _stack().append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        """Deactivate the deadline for the current thread."""
+        _stack().remove(self)
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def current():
+    """Return the earliest deadline active in this thread, if any."""
+    stack = _stack()
+    if not stack:
+        return None
+    return min(stack, key=lambda active: active.expires_at)
+
+
+def shrink_timeout(timeout, remaining):
+    """Limit a requests-style timeout to the seconds remaining.
+
+    ``timeout`` may be None, a number, or a ``(connect, read)`` tuple.
+    """
+    if timeout is None:
+        return remaining
+    if isinstance(timeout, tuple):
+        return tuple(remaining if part is None else min(part, remaining)
+                     for part in timeout)
+    return min(timeout, remaining)
@@ -50,6 +50,43 @@ class Timeout(ClientException):
         super(Timeout, self).__init__(message)
 
 
+class DeadlineExceeded(Timeout):
+    """The deadline for a group of requests passed."""
+
+    message = 'The deadline for the operation was exceeded'
+
+
+class RateLimited(ClientException):
+    """The client-side rate limit for the request was exceeded."""
+
+    message = "The client-side rate limit was exceeded."
+
+    def __init__(self, message=None, **kwargs):
+        """Initialize our RateLimited exception.
+
+        This takes an optional keyword-only argument of ``retry_after``, the
+        number of seconds after which the request is expected to be allowed.
+        """
+        self.retry_after = kwargs.pop('retry_after', None)
+        super(RateLimited, self).__init__(message)
+
+
+class CircuitOpen(ClientException):
+    """The circuit breaker is open and the request was not attempted."""
+
+    message = ("Too many recent requests to the server failed. The request "
+               "was not attempted.")
+
+    def __init__(self, message=None, **kwargs):
+        """Initialize our CircuitOpen exception.
+
+        This takes an optional keyword-only argument of ``retry_after``, the
+        number of seconds after which the circuit will allow a probe.
+        """
+        self.retry_after = kwargs.pop('retry_after', None)
+        super(CircuitOpen, self).__init__(message)
+
+
 class HTTPError(ClientException):
     """Base exception class for all HTTP related exceptions in."""
 
@@ -64,22 +101,16 @@ class HTTPError(ClientException):
         - response: for the response generating the error
         - original_exception: in the event that this is a requests exception
           that we are re-raising.
+        - request_id: the ID of the request that failed, preferably as
+          returned by the server.
         """
         self.response = kwargs.pop('response', None)
         self.original_exception = kwargs.pop('exception', None)
+        self.request_id = kwargs.pop('request_id', None)
         self.status_code = (self.status_code
                             or getattr(self.response, 'status_code', None))
         super(HTTPError, self).__init__(message)
 
-    @property
-    def status_code(self):
-        """Shim to provide a similar API to other OpenStack clients."""
-        return self.status_code
-
-    @status_code.setter
-    def status_code(self, code):
-        self.status_code = code
-
 
 class CommandError(ClientException):
     """Client command was invalid or failed."""
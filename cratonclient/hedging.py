@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Hedged requests to reduce tail latency of idempotent reads."""
+import collections
+import logging
+import threading
+
+from concurrent import futures
+from oslo_utils import timeutils
+
+LOG = logging.getLogger(__name__)
+
+
+def _close_response(future):
+    """Release the connection held by a response nobody will read."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    close = getattr(future.result(), 'close', None)
+    if close is not None:
+        close()
+
+
+def _start(attempt):
+    """Run an attempt in a thread of its own and return its future."""
+    future = futures.Future()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            result = attempt()
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return future
+
+
+class HedgingPolicy(object):
+    """Send a second copy of slow idempotent requests.
+
+    If the first attempt has not finished after the hedge delay, an
+    identical request is sent and whichever succeeds first is used. The
+    delay is either fixed or the ``percentile`` of recently observed
+    latencies. The number of hedged requests is bounded by ``budget``, the
+    largest fraction of requests that may be sent twice.
+
+    .. code-block:: python
+
+        >>> from cratonclient import hedging
+        >>> from cratonclient import session as craton
+        >>> session = craton.Session(
+        ...     username='demo',
+        ...     token='p@$$w0rd',
+        ...     project_id='1',
+        ...     hedging=hedging.HedgingPolicy(percentile=95, budget=0.05),
+        ... )
+
+    The first attempt starts right away, in a thread of its own while a
+    hedge may be sent, so that the delay is measured from when it was sent
+    and concurrent requests are not limited by the hedges' pool. The losing
+    attempt cannot be interrupted once it has been sent; its response is
+    closed as soon as it arrives so that the connection is returned to the
+    pool.
+    """
+
+    def __init__(self, delay=None, percentile=95, min_samples=20,
+                 budget=0.05, methods=('GET', 'HEAD'), window_size=1000,
+                 max_workers=16):
+        """Initialize our hedging policy.
+
+        :param float delay:
+            A fixed number of seconds to wait before hedging. If not
+            provided, the delay is the ``percentile`` of observed latencies.
+        :param float percentile:
+            The percentile of observed latencies to use as the delay.
+        :param int min_samples:
+            The number of latencies to observe before hedging when no fixed
+            delay is given.
+        :param float budget:
+            The largest fraction of requests, between 0 and 1, that may be
+            hedged.
+        :param methods:
+            The idempotent HTTP methods that may be hedged.
+        :param int window_size:
+            The number of recent latencies used to compute the percentile.
+        :param int max_workers:
+            The largest number of hedges in flight at once.
+        """
+        self.delay = delay
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.budget = budget
+        self.methods = frozenset(method.upper() for method in methods)
+        self._latencies = collections.deque(maxlen=window_size)
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+        self._executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+
+    def applies_to(self, method):
+        """Return whether requests with this method may be hedged."""
+        return method.upper() in self.methods
+
+    def observe(self, latency):
+        """Record the latency of a completed request."""
+        with self._lock:
+            self._latencies.append(latency)
+
+    def hedge_delay(self):
+        """Return the number of seconds to wait before hedging, if any."""
+        if self.delay is not None:
+            return self.delay
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        index = int(round((len(latencies) - 1) * self.percentile / 100.0))
+        return latencies[index]
+
+    def _earn(self):
+        with self._lock:
+            self._tokens = min(self._tokens + self.budget, 10.0)
+
+    def _spend(self, may_hedge=None):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+        if may_hedge is None or may_hedge():
+            return True
+        # NOTE: Return the token of a hedge that may not be sent so that
+        # refused hedges do not use up the budget.
+        with self._lock:
+            self._tokens = min(self._tokens + 1, 10.0)
+        return False
+
+    def send(self, attempt, may_hedge=None):
+        """Call ``attempt``, hedging it if it is slow.
+
+        :param attempt:
+            A callable making the request and returning the response.
+        :param may_hedge:
+            An optional callable returning whether a hedge may be sent right
+            now, e.g., to consult a rate limiter.
+        :returns:
+            A tuple of the response and whether a hedge was sent.
+        """
+        self._earn()
+        stopwatch = timeutils.StopWatch().start()
+        delay = self.hedge_delay()
+        if delay is None:
+            response = attempt()
+            self.observe(stopwatch.elapsed())
+            return response, False
+
+        primary = _start(attempt)
+        done, _ = futures.wait([primary], timeout=delay)
+        if done or not self._spend(may_hedge):
+            response = primary.result()
+            self.observe(stopwatch.elapsed())
+            return response, False
+
+        LOG.debug('Request has taken longer than %.3fs, sending a hedge',
+                  delay)
+        attempts = [primary, self._executor.submit(attempt)]
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = futures.wait(
+                pending, return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                for loser in attempts:
+                    if loser is not future:
+                        loser.cancel()
+                        loser.add_done_callback(_close_response)
+                self.observe(stopwatch.elapsed())
+                return future.result(), True
+        raise error
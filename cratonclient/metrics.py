@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""In-process request metrics for cratonclient sessions."""
+import bisect
+import collections
+import re
+import threading
+
+from six.moves.urllib import parse
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                           2.5, 5.0, 10.0)
+DEFAULT_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576,
+                        4194304)
+
+_ID_SEGMENT = re.compile(r'^(\d+|[0-9a-fA-F-]{32,36})$')
+
+
+def endpoint_for(url):
+    """Return the endpoint template for a URL.
+
+    Query strings are dropped and path segments that look like IDs are
+    replaced so that all requests for the same kind of resource share a
+    single set of metrics, e.g.,
+    ``https://craton:8080/v1/hosts/12?detail=1`` becomes ``/v1/hosts/{id}``.
+    """
+    path = parse.urlsplit(url).path.rstrip('/') or '/'
+    segments = ['{id}' if _ID_SEGMENT.match(segment) else segment
+                for segment in path.split('/')]
+    return '/'.join(segments)
+
+
+class Histogram(object):
+    """A cumulative histogram with fixed bucket boundaries."""
+
+    def __init__(self, buckets):
+        """Initialize our histogram with its upper bucket boundaries."""
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Record a single observation."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self):
+        """Return (upper bound, cumulative count) pairs, ending with +Inf."""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def percentile(self, percent):
+        """Estimate a percentile by interpolating within its bucket.
+
+        Observations above the largest bucket are reported as the largest
+        bucket boundary.
+        """
+        if not self.count:
+            return None
+        rank = self.count * percent / 100.0
+        lower = 0.0
+        previous = 0
+        for bound, total in self.cumulative_counts():
+            if total >= rank:
+                if bound == float('inf'):
+                    return lower
+                in_bucket = total - previous
+                fraction = (rank - previous) / in_bucket if in_bucket else 0
+                return lower + (bound - lower) * fraction
+            lower = bound
+            previous = total
+        return lower
+
+    def snapshot(self):
+        """Return a dictionary describing the histogram."""
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': [(bound, total)
+                        for bound, total in self.cumulative_counts()],
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+
+class MetricsCollector(object):
+    """Collect latency, error and payload size metrics from sessions.
+
+    The collector subscribes to the hooks on a
+    :class:`~cratonclient.session.Session` and keeps per-endpoint and
+    per-method histograms in memory. It is safe to share a collector between
+    threads and sessions.
+
+    .. code-block:: python
+
+        >>> from cratonclient import metrics
+        >>> collector = metrics.MetricsCollector()
+        >>> collector.install(session)
+        >>> # ... make some requests ...
+        >>> print(collector.to_prometheus())
+    """
+
+    def __init__(self, latency_buckets=DEFAULT_LATENCY_BUCKETS,
+                 size_buckets=DEFAULT_SIZE_BUCKETS):
+        """Initialize our collector.
+
+        :param latency_buckets:
+            Upper bounds, in seconds, of the latency histogram buckets.
+        :param size_buckets:
+            Upper bounds, in bytes, of the payload size histogram buckets.
+        """
+        self.latency_buckets = latency_buckets
+        self.size_buckets = size_buckets
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._request_sizes = {}
+        self._response_sizes = {}
+        self._errors = collections.Counter()
+        self._gauges = {}
+
+    def register_gauge(self, name, getter, help_text=''):
+        """Report the value returned by ``getter`` as a gauge.
+
+        .. code-block:: python
+
+            >>> collector.register_gauge(
+            ...     'concurrency_limit',
+            ...     lambda: limiter.limit,
+            ...     'Current adaptive concurrency limit.',
+            ... )
+        """
+        with self._lock:
+            self._gauges[name] = (getter, help_text)
+
+    def install(self, session):
+        """Start collecting metrics for requests made by a session."""
+        session.register_hook('after-response', self.observe_response)
+        session.register_hook('on-error', self.observe_error)
+
+    def uninstall(self, session):
+        """Stop collecting metrics for requests made by a session."""
+        session.unregister_hook('after-response', self.observe_response)
+        session.unregister_hook('on-error', self.observe_error)
+
+    def _histogram(self, histograms, key, buckets):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(buckets)
+        return histogram
+
+    def observe_response(self, request_event):
+        """Record the latency and sizes of a request that got a response."""
+        key = (endpoint_for(request_event.url), request_event.method)
+        with self._lock:
+            self._histogram(self._latencies, key, self.latency_buckets
+                            ).observe(request_event.timings['total'])
+            self._histogram(self._request_sizes, key, self.size_buckets
+                            ).observe(request_event.request_bytes)
+            self._histogram(self._response_sizes, key, self.size_buckets
+                            ).observe(request_event.response_bytes)
+
+    def observe_error(self, request_event):
+        """Count a failed request by the class of exception it raised."""
+        key = (endpoint_for(request_event.url), request_event.method,
+               request_event.exception.__class__.__name__)
+        with self._lock:
+            self._errors[key] += 1
+
+    def reset(self):
+        """Discard everything collected so far."""
+        with self._lock:
+            self._latencies.clear()
+            self._request_sizes.clear()
+            self._response_sizes.clear()
+            self._errors.clear()
+
+    def snapshot(self):
+        """Return a dictionary of everything collected so far.
+
+        The result is keyed by ``'latency'``, ``'request_size'``,
+        ``'response_size'``, ``'errors'`` and ``'gauges'``. The histograms
+        are keyed by ``(endpoint, method)``, the error counts by
+        ``(endpoint, method, exception class name)`` and the gauges by name.
+        """
+        with self._lock:
+            return {
+                'latency': {key: histogram.snapshot()
+                            for key, histogram in self._latencies.items()},
+                'request_size': {
+                    key: histogram.snapshot()
+                    for key, histogram in self._request_sizes.items()},
+                'response_size': {
+                    key: histogram.snapshot()
+                    for key, histogram in self._response_sizes.items()},
+                'errors': dict(self._errors),
+                'gauges': {name: getter()
+                           for name, (getter, _) in self._gauges.items()},
+            }
+
+    def to_prometheus(self, prefix='cratonclient'):
+        """Render everything collected so far in Prometheus text format."""
+        lines = []
+        with self._lock:
+            for name, histograms, help_text in [
+                    ('request_duration_seconds', self._latencies,
+                     'Time spent making requests to the Craton API.'),
+                    ('request_size_bytes', self._request_sizes,
+                     'Size of request bodies sent to the Craton API.'),
+                    ('response_size_bytes', self._response_sizes,
+                     'Size of response bodies received from the Craton API.'),
+            ]:
+                metric = '{0}_{1}'.format(prefix, name)
+                lines.append('# HELP {0} {1}'.format(metric, help_text))
+                lines.append('# TYPE {0} histogram'.format(metric))
+                for (endpoint, method), histogram in sorted(
+                        histograms.items()):
+                    labels = _labels(endpoint=endpoint, method=method)
+                    for bound, total in histogram.cumulative_counts():
+                        lines.append('{0}_bucket{{{1},le="{2}"}} {3}'.format(
+                            metric, labels, _format_bound(bound), total))
+                    lines.append('{0}_sum{{{1}}} {2!r}'.format(
+                        metric, labels, histogram.sum))
+                    lines.append('{0}_count{{{1}}} {2}'.format(
+                        metric, labels, histogram.count))
+
+            metric = '{0}_request_errors_total'.format(prefix)
+            lines.append('# HELP {0} Failed requests to the Craton API by '
+                         'exception class.'.format(metric))
+            lines.append('# TYPE {0} counter'.format(metric))
+            for (endpoint, method, error), count in sorted(
+                    self._errors.items()):
+                lines.append('{0}{{{1}}} {2}'.format(
+                    metric,
+                    _labels(endpoint=endpoint, method=method,
+                            exception=error),
+                    count))
+
+            for name, (getter, help_text) in sorted(self._gauges.items()):
+                metric = '{0}_{1}'.format(prefix, name)
+                if help_text:
+                    lines.append('# HELP {0} {1}'.format(metric, help_text))
+                lines.append('# TYPE {0} gauge'.format(metric))
+                lines.append('{0} {1}'.format(metric, getter()))
+        return '\n'.join(lines) + '\n'
+
+
+def _format_bound(bound):
+    if bound == float('inf'):
+        return '+Inf'
+    return repr(float(bound))
+
+
+def _labels(**labels):
+    return ','.join(
+        '{0}="{1}"'.format(name, _escape(value))
+        for name, value in sorted(labels.items()))
+
+
+def _escape(value):
+    return (value.replace('\\', '\\\\')
+            .replace('"', '\\"')
+            .replace('\n', '\\n'))
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Client-side rate limiting for requests to Craton."""
+import re
+import threading
+import time
+
+from oslo_utils import timeutils
+import six
+from six.moves.urllib import parse
+
+from cratonclient import exceptions as exc
+
+_VERSION_SEGMENT = re.compile(r'^v\d+(\.\d+)?$')
+
+
+def base_path_for(url):
+    """Return the resource base path of a URL, e.g., ``'/hosts'``.
+
+    The API version prefix is skipped so that
+    ``https://craton:8080/v1/hosts/1`` becomes ``/hosts``.
+    """
+    segments = [segment
+                for segment in parse.urlsplit(url).path.split('/')
+                if segment]
+    if segments and _VERSION_SEGMENT.match(segments[0]):
+        segments = segments[1:]
+    if not segments:
+        return '/'
+    return '/' + segments[0]
+
+
+class TokenBucket(object):
+    """A thread-safe token bucket.
+
+    Tokens are added at ``rate`` per second up to ``capacity``. Each request
+    consumes one token.
+    """
+
+    def __init__(self, rate, capacity=None, clock=timeutils.now,
+                 sleep=time.sleep):
+        """Initialize our bucket, starting full.
+
+        :param float rate:
+            The number of tokens added to the bucket per second.
+        :param float capacity:
+            The maximum number of tokens, i.e., the largest burst allowed.
+            Defaults to ``rate`` (or 1 if ``rate`` is smaller than 1).
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive, got {0}'.format(rate))
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if they are available without waiting.
+
+        :returns:
+            ``0.0`` if the tokens were taken, otherwise the number of seconds
+            to wait before they are expected to be available.
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def refund(self, tokens=1):
+        """Return tokens that were taken but not used."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def acquire(self, tokens=1, blocking=True, timeout=None):
+        """Take tokens, waiting for them if ``blocking`` is True.
+
+        :returns:
+            True if the tokens were taken, False if they were unavailable
+            (or would not be available within ``timeout`` seconds).
+        """
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(tokens)
+            if not delay:
+                return True
+            if not blocking or (timeout is not None and
+                                waited + delay > timeout):
+                return False
+            self._sleep(delay)
+            waited += delay
+
+
+class RateLimiter(object):
+    """Global and per-base-path rate limits for a Session.
+
+    .. code-block:: python
+
+        >>> from cratonclient import ratelimit
+        >>> from cratonclient import session as craton
+        >>> limiter = ratelimit.RateLimiter(
+        ...     rate=50,
+        ...     per_path={'/hosts': 20, '/cells': (5, 10)},
+        ... )
+        >>> session = craton.Session(
+        ...     username='demo',
+        ...     token='p@$$w0rd',
+        ...     project_id='1',
+        ...     rate_limiter=limiter,
+        ... )
+
+    A single limiter may be shared between sessions and threads. Callers
+    that must not block a thread, e.g., asyncio tasks, can use
+    :meth:`RateLimiter.try_acquire` and sleep asynchronously for the
+    returned delay.
+    """
+
+    def __init__(self, rate=None, burst=None, per_path=None, blocking=True,
+                 timeout=None):
+        """Initialize our rate limiter.
+
+        :param float rate:
+            The number of requests per second allowed across all paths. If
+            not provided, there is no global limit.
+        :param float burst:
+            The number of requests that may be made at once globally.
+        :param dict per_path:
+            A mapping of base paths, e.g., ``'/hosts'``, to either a rate or
+            a ``(rate, burst)`` tuple.
+        :param bool blocking:
+            Whether :meth:`RateLimiter.acquire` waits for a token or raises
+            :class:`~cratonclient.exceptions.RateLimited`.
+        :param float timeout:
+            The longest a blocking acquire waits before raising
+            :class:`~cratonclient.exceptions.RateLimited`.
+        """
+        self.blocking = blocking
+        self.timeout = timeout
+        self.bucket = None
+        if rate is not None:
+            self.bucket = TokenBucket(rate, burst)
+        self.path_buckets = {}
+        for path, limit in six.iteritems(per_path or {}):
+            if not isinstance(limit, (tuple, list)):
+                limit = (limit,)
+            self.path_buckets['/' + path.strip('/')] = TokenBucket(*limit)
+
+    def _buckets_for(self, url):
+        buckets = []
+        path_bucket = self.path_buckets.get(base_path_for(url))
+        if path_bucket is not None:
+            buckets.append(path_bucket)
+        if self.bucket is not None:
+            buckets.append(self.bucket)
+        return buckets
+
+    def try_acquire(self, url):
+        """Take a token for a request to ``url`` without waiting.
+
+        :returns:
+            ``0.0`` if the request may proceed, otherwise the number of
+            seconds to wait before trying again.
+        """
+        taken = []
+        for bucket in self._buckets_for(url):
+            delay = bucket.try_acquire()
+            if delay:
+                for taken_bucket in taken:
+                    taken_bucket.refund()
+                return delay
+            taken.append(bucket)
+        return 0.0
+
+    def acquire(self, url, blocking=None, timeout=None):
+        """Take a token for a request to ``url``.
+
+        :raises cratonclient.exceptions.RateLimited:
+            If the token could not be taken without blocking (when not
+            blocking) or within the timeout.
+        """
+        blocking = self.blocking if blocking is None else blocking
+        if timeout is None:
+            timeout = self.timeout
+        elif self.timeout is not None:
+            timeout = min(timeout, self.timeout)
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(url)
+            if not delay:
+                return
+            if not blocking or (timeout is not None and
+                                waited + delay > timeout):
+                raise exc.RateLimited(retry_after=delay)
+            time.sleep(delay)
+            waited += delay
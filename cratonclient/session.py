@@ -12,20 +12,170 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 """Craton-specific session details."""
+import functools
 import logging
+import uuid
 
+from keystoneauth1 import exceptions as ksa_exc
 from keystoneauth1 import plugin
 from keystoneauth1 import session as ksa_session
 from oslo_utils import encodeutils
 from oslo_utils import strutils
+from oslo_utils import timeutils
 from requests import exceptions as requests_exc
 import six
 
 import cratonclient
+from cratonclient import deadline
 from cratonclient import exceptions as exc
 
 LOG = logging.getLogger(__name__)
 
+REQUEST_ID_HEADER = 'X-OpenStack-Request-ID'
+SERVER_REQUEST_ID_HEADERS = ('X-OpenStack-Request-ID', 'X-Request-ID')
+TRACEPARENT_HEADER = 'traceparent'
+
+HOOK_EVENTS = (
+    'before-request',
+    'after-response',
+    'on-error',
+    'after-parse',
+)
+
+
+class RequestEvent(object):
+    """Details about a single request made through a :class:`Session`.
+
+    An instance of this class is passed to every hook registered on a
+    :class:`Session`. Timings are recorded in seconds in the ``timings``
+    dictionary under the following keys:
+
+    - ``total``: the time spent inside :meth:`Session.request`
+    - ``time_to_headers``: the time between sending the request and parsing
+      the response headers, i.e., connecting to the server and waiting for
+      it to respond
+    - ``body``: the remainder of ``total``, i.e., reading the response body
+      and any client-side overhead such as authentication
+    - ``parse``: the time a :class:`~cratonclient.crud.CRUDClient` spent
+      converting the JSON body into resources
+
+    Each event also carries the ``request_id`` and W3C trace context
+    (``trace_id`` and ``span_id``) that were sent to the server as well as
+    the ``server_request_id`` returned by it, if any. ``hedged`` is True if
+    a second copy of the request was sent (see
+    :class:`~cratonclient.hedging.HedgingPolicy`). Once the response has
+    been parsed, ``resources`` holds the resource, or list of resources,
+    it was converted into.
+    """
+
+    def __init__(self, method, url, operation=None, headers=None):
+        """Initialize our event for a request that is about to be made.
+
+        :param str method:
+            The HTTP method of the request.
+        :param str url:
+            The URL of the request.
+        :param str operation:
+            The name of the manager operation making the request, e.g.,
+            ``'host.list'``.
+        :param dict headers:
+            The headers that will be sent with the request. A request ID and
+            trace context will be added to them unless they are already
+            present, in which case they are propagated.
+        """
+        headers = {} if headers is None else headers
+        self.request_id = _find_header(headers, REQUEST_ID_HEADER)
+        if self.request_id is None:
+            self.request_id = 'req-{0}'.format(uuid.uuid4())
+            headers[REQUEST_ID_HEADER] = self.request_id
+        self.trace_id = _parse_traceparent(
+            _find_header(headers, TRACEPARENT_HEADER))
+        if self.trace_id is None:
+            self.trace_id = uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        _set_header(headers, TRACEPARENT_HEADER, '00-{0}-{1}-01'.format(
+            self.trace_id, self.span_id))
+        self.server_request_id = None
+        self.hedged = False
+        self.method = method
+        self.url = url
+        self.operation = operation
+        self.status_code = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.response = None
+        self.resources = None
+        self.exception = None
+        self.timings = {}
+        self._stopwatch = timeutils.StopWatch().start()
+
+    def __repr__(self):
+        """Return a string representation of the event."""
+        return ('<RequestEvent {0} {1} operation={2} status={3} '
+                'request_id={4}>').format(self.method, self.url,
+                                          self.operation, self.status_code,
+                                          self.request_id)
+
+    def record_response(self, response):
+        """Record the timings and sizes of the response we received."""
+        self.response = response
+        self.status_code = response.status_code
+        headers = getattr(response, 'headers', None) or {}
+        for header in SERVER_REQUEST_ID_HEADERS:
+            self.server_request_id = _find_header(headers, header)
+            if self.server_request_id is not None:
+                break
+        total = self._stopwatch.elapsed()
+        self.timings['total'] = total
+        elapsed = getattr(response, 'elapsed', None)
+        if elapsed is not None:
+            time_to_headers = elapsed.total_seconds()
+            self.timings['time_to_headers'] = time_to_headers
+            self.timings['body'] = max(total - time_to_headers, 0.0)
+        self.response_bytes = len(response.content or b'')
+        request = getattr(response, 'request', None)
+        body = getattr(request, 'body', None)
+        if body:
+            self.request_bytes = len(body)
+
+    def record_exception(self, exception):
+        """Record the exception that caused the request to fail."""
+        self.exception = exception
+        self.timings.setdefault('total', self._stopwatch.elapsed())
+        if isinstance(exception, exc.HTTPError):
+            exception.request_id = (self.server_request_id or
+                                    self.request_id)
+
+
+def _find_header(headers, name):
+    """Find a header value regardless of the case of its name."""
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _set_header(headers, name, value):
+    """Set a header, replacing any existing header of a different case."""
+    for key in [key for key in headers if key.lower() == name.lower()]:
+        del headers[key]
+    headers[name] = value
+
+
+def _parse_traceparent(traceparent):
+    """Return the trace ID from a W3C traceparent header, if it is valid."""
+    if not traceparent:
+        return None
+    parts = traceparent.split('-')
+    if len(parts) < 4 or len(parts[1]) != 32 or parts[1] == '0' * 32:
+        return None
+    try:
+        int(parts[1], 16)
+    except ValueError:
+        return None
+    return parts[1].lower()
+
 
 class Session(object):
     """Management class to allow different types of sessions to be used.
@@ -36,7 +186,9 @@ class Session(object):
     """
 
     def __init__(self, session=None, username=None, token=None,
-                 project_id=None):
+                 project_id=None, hooks=None, span_factory=None,
+                 rate_limiter=None, circuit_breaker=None, hedging=None,
+                 conditional_cache=None, completion_cache=None):
         """Initialize our Session.
 
         :param session:
@@ -48,7 +200,45 @@ class Session(object):
             The authentication token of the user authenticating.
         :param str project_id:
             The user's project id in Craton.
+        :param dict hooks:
+            A mapping of event names (see :data:`HOOK_EVENTS`) to a callable
+            or list of callables that will be called with a
+            :class:`RequestEvent`. See also :meth:`Session.register_hook`.
+        :param span_factory:
+            A callable that accepts a :class:`RequestEvent` and returns a
+            context manager wrapped around sending the request, e.g., to
+            create a span in a distributed tracing system. The event's
+            ``trace_id`` and ``span_id`` match the ``traceparent`` header
+            sent to the server.
+        :param rate_limiter:
+            A :class:`~cratonclient.ratelimit.RateLimiter` that every request
+            must acquire a token from before it is sent.
+        :param circuit_breaker:
+            A :class:`~cratonclient.circuitbreaker.CircuitBreaker` that
+            fails requests fast while the API is unhealthy.
+        :param hedging:
+            A :class:`~cratonclient.hedging.HedgingPolicy` used to send a
+            second copy of slow idempotent requests.
+        :param conditional_cache:
+            A :class:`~cratonclient.cache.ConditionalCache` used to revalidate
+            GET responses instead of downloading them again.
+        :param completion_cache:
+            A :class:`~cratonclient.completion.CompletionCache` recording the
+            IDs of the resources seen, for shell completion.
         """
+        self.conditional_cache = conditional_cache
+        self.completion_cache = completion_cache
+        self.hedging = hedging
+        self.circuit_breaker = circuit_breaker
+        self.span_factory = span_factory
+        self.rate_limiter = rate_limiter
+        self.last_request_id = None
+        self._hooks = {event: [] for event in HOOK_EVENTS}
+        for event, callbacks in (hooks or {}).items():
+            if callable(callbacks):
+                callbacks = [callbacks]
+            for callback in callbacks:
+                self.register_hook(event, callback)
         self._auth = None
         if session is None:
             self._auth = CratonAuth(username=username,
@@ -60,6 +250,57 @@ class Session(object):
                                           user_agent=craton_user_agent)
         self._session = session
 
+    def register_hook(self, event, callback):
+        """Register a callback to be called for a request event.
+
+        The available events are:
+
+        - ``before-request``: called before the request is sent
+        - ``after-response``: called once a response is received, regardless
+          of its status code
+        - ``on-error``: called when the request raises an exception, either
+          because of a transport failure or an error status code
+        - ``after-parse``: called once a
+          :class:`~cratonclient.crud.CRUDClient` has converted the response
+          into resources, which are set as ``resources`` on the event
+
+        Exceptions raised by callbacks are logged and otherwise ignored so
+        that instrumentation can never break a request.
+
+        .. code-block:: python
+
+            >>> def log_slow_requests(event):
+            ...     if event.timings['total'] > 1:
+            ...         print(event.operation, event.timings)
+            >>> session.register_hook('after-response', log_slow_requests)
+
+        :param str event:
+            The name of the event, one of :data:`HOOK_EVENTS`.
+        :param callback:
+            A callable accepting a single :class:`RequestEvent`.
+        """
+        if event not in self._hooks:
+            raise ValueError('{0} is not a valid hook event, expected one of '
+                             '{1}'.format(event, ', '.join(HOOK_EVENTS)))
+        self._hooks[event].append(callback)
+
+    def unregister_hook(self, event, callback):
+        """Remove a callback previously registered for an event."""
+        try:
+            self._hooks[event].remove(callback)
+        except (KeyError, ValueError):
+            return False
+        return True
+
+    def dispatch_hook(self, event, request_event):
+        """Call every callback registered for an event."""
+        for callback in self._hooks.get(event, []):
+            try:
+                callback(request_event)
+            except Exception:
+                LOG.exception('Hook %r for event %s raised an exception',
+                              callback, event)
+
     def delete(self, url, **kwargs):
         """Make a DELETE request with url and optional parameters.
 
@@ -201,6 +442,11 @@ class Session(object):
         # Default the Keystone specific arguments
         kwargs.setdefault('endpoint_filter',
                           {'service_type': 'fleet_management'})
+        if isinstance(self._session, ksa_session.Session):
+            # NOTE: Error status codes are turned into our own exceptions by
+            # Session.request so that hooks, the circuit breaker and the
+            # conditional cache see every response.
+            kwargs.setdefault('raise_exc', False)
         try:
             response = self._session.request(**kwargs)
         except TypeError:
@@ -225,7 +471,121 @@ class Session(object):
             ...     project_id='1',
             ... )
             >>> response = session.request('GET', 'http://example.com')
+
+        :param str operation:
+            (Optional) The name of the manager operation making this request.
+            It is passed along to any registered hooks and is not sent to the
+            server.
+        :param conditional_cache:
+            (Optional) A :class:`~cratonclient.cache.ConditionalCache` used
+            for this request instead of :attr:`Session.conditional_cache`.
+
+        Every request is sent with an ``X-OpenStack-Request-ID`` header and a
+        W3C ``traceparent`` header. If either is passed in ``headers`` it is
+        propagated instead. The ID the server returns is available as
+        ``response.request_event.server_request_id``, on the ``request_id``
+        attribute of any :class:`~cratonclient.exceptions.HTTPError` raised
+        and as :attr:`Session.last_request_id`.
+
+        If a :class:`~cratonclient.deadline.Deadline` is active the request's
+        ``timeout`` is shrunk to the time remaining and
+        :class:`~cratonclient.exceptions.DeadlineExceeded` is raised once it
+        has passed.
         """
+        if self.circuit_breaker is None:
+            return self._request_once(method, url, **kwargs)
+        with self.circuit_breaker.guard():
+            return self._request_once(method, url, **kwargs)
+
+    def _request_once(self, method, url, **kwargs):
+        """Make a single request, dispatching hooks along the way."""
+        current_deadline = deadline.current()
+        if self.rate_limiter is not None:
+            self._acquire(url, current_deadline)
+        if current_deadline is not None:
+            kwargs['timeout'] = deadline.shrink_timeout(
+                kwargs.get('timeout'), current_deadline.check())
+
+        kwargs['headers'] = dict(kwargs.get('headers') or {})
+        request_event = RequestEvent(method, url,
+                                     operation=kwargs.pop('operation', None),
+                                     headers=kwargs['headers'])
+        conditional_cache = kwargs.pop('conditional_cache', None)
+        if conditional_cache is None:
+            conditional_cache = self.conditional_cache
+        if conditional_cache is not None:
+            conditional_cache.prepare(method, url, kwargs)
+        self.dispatch_hook('before-request', request_event)
+        try:
+            if self.span_factory is None:
+                response = self._send_hedged(request_event, **kwargs)
+            else:
+                with self.span_factory(request_event):
+                    response = self._send_hedged(request_event, **kwargs)
+        except exc.ClientException as err:
+            if (isinstance(err, exc.Timeout) and
+                    not isinstance(err, exc.DeadlineExceeded) and
+                    current_deadline is not None and
+                    current_deadline.expired()):
+                # NOTE: The timeout was shrunk by the deadline, so it says
+                # nothing about the health of the server.
+                err = exc.DeadlineExceeded(exception=err)
+            self.last_request_id = request_event.request_id
+            request_event.record_exception(err)
+            self.dispatch_hook('on-error', request_event)
+            raise err
+
+        request_event.record_response(response)
+        self.last_request_id = (request_event.server_request_id or
+                                request_event.request_id)
+        response.request_event = request_event
+        self.dispatch_hook('after-response', request_event)
+        if conditional_cache is not None:
+            response = conditional_cache.resolve(method, url, kwargs,
+                                                 response)
+            response.request_event = request_event
+        if response.status_code >= 400:
+            error = exc.error_from(response)
+            request_event.record_exception(error)
+            self.dispatch_hook('on-error', request_event)
+            raise error
+
+        return response
+
+    def _acquire(self, url, current_deadline):
+        """Take a rate limiter token, waiting no longer than the deadline."""
+        if current_deadline is None:
+            self.rate_limiter.acquire(url)
+            return
+        try:
+            self.rate_limiter.acquire(url, timeout=current_deadline.check())
+        except exc.RateLimited as err:
+            if (self.rate_limiter.blocking and
+                    err.retry_after is not None and
+                    err.retry_after >= current_deadline.remaining()):
+                raise exc.DeadlineExceeded()
+            raise
+
+    def _send_hedged(self, request_event, **kwargs):
+        """Send the request, hedging it if our policy allows."""
+        method, url = request_event.method, request_event.url
+        if self.hedging is None or not self.hedging.applies_to(method):
+            return self._send(method, url, **kwargs)
+
+        may_hedge = None
+        if self.rate_limiter is not None:
+            may_hedge = functools.partial(self._may_hedge, url)
+        response, request_event.hedged = self.hedging.send(
+            functools.partial(self._send, method, url, **kwargs),
+            may_hedge=may_hedge)
+        return response
+
+    def _may_hedge(self, url):
+        """Take a rate limiter token for a hedge without waiting for it."""
+        return not self.rate_limiter.try_acquire(url)
+
+    def _send(self, method, url, **kwargs):
+        """Send the request and translate transport exceptions."""
         self._http_log_request(method=method,
                                url=url,
                                data=kwargs.get('data'),
@@ -244,11 +604,15 @@ class Session(object):
             raise exc.Timeout(exception=err)
         except requests_exc.ConnectionError as err:
             raise exc.ConnectionFailed(exception=err)
+        # NOTE: keystoneauth1 translates the requests exceptions above into
+        # its own, where ConnectTimeout also covers read timeouts.
+        except ksa_exc.ConnectTimeout as err:
+            raise exc.Timeout(exception=err)
+        except (ksa_exc.ConnectionError,
+                ksa_exc.RetriableConnectionFailure) as err:
+            raise exc.ConnectionFailed(exception=err)
 
         self._http_log_response(response)
-        if response.status_code >= 400:
-            raise exc.error_from(response)
-
         return response
 
     def _http_log_request(self, url, method=None, data=None,
@@ -0,0 +1,172 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Run many craton commands, read from a file, with a single client."""
+import collections
+import shlex
+import sys
+import threading
+
+import six
+
+from cratonclient import concurrency
+
+# NOTE: Commands that read commands of their own, from the input, the
+# terminal or a socket, and so cannot run from a batch or the interactive
+# shell.
+NESTED_COMMANDS = ('batch', 'daemon', 'shell')
+
+Result = collections.namedtuple('Result',
+                                ['line', 'command', 'status', 'output',
+                                 'error'])
+
+
+def read_commands(stream):
+    """Yield the line number and text of every command in a stream.
+
+    Blank lines and lines starting with ``#`` are skipped.
+    """
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield number, line
+
+
+class ThreadOutput(object):
+    """A stream that sends writes of capturing threads to their buffer.
+
+    Installed as :data:`sys.stdout` while commands run concurrently, so that
+    the output of every command can be printed whole and in order.
+    """
+
+    def __init__(self, stream):
+        """Initialize our stream.
+
+        :param stream:
+            The stream that writes of other threads go to.
+        """
+        self.stream = stream
+        self._local = threading.local()
+
+    def capture(self, stream=None):
+        """Send the writes of the current thread elsewhere.
+
+        :param stream:
+            The stream to write to. Defaults to a new buffer.
+        """
+        self._local.buffer = six.StringIO() if stream is None else stream
+
+    def release(self):
+        """Stop capturing the current thread.
+
+        :returns:
+            What the thread wrote, if it wrote to a buffer, or None.
+        """
+        buffer = self._local.__dict__.pop('buffer', None)
+        getvalue = getattr(buffer, 'getvalue', None)
+        return None if getvalue is None else getvalue()
+
+    def write(self, text):
+        """Write to the current thread's buffer or to the stream."""
+        getattr(self._local, 'buffer', self.stream).write(text)
+
+    def __getattr__(self, name):
+        """Delegate everything else, e.g., ``flush``, to the stream."""
+        return getattr(self.stream, name)
+
+
+def _parse(craton_shell, number, text):
+    """Parse one line into a tuple of its number, text, arguments, error."""
+    try:
+        argv = shlex.split(text, comments=True)
+    except ValueError as e:
+        return number, text, None, e
+    if argv and argv[0] in NESTED_COMMANDS:
+        return number, text, None, ValueError(
+            '{0} cannot be run in a batch'.format(argv[0]))
+    try:
+        return number, text, craton_shell.parse_command(argv), None
+    except SystemExit as e:
+        if e.code:
+            return number, text, None, ValueError('Invalid arguments')
+        # NOTE: Help was printed, there is nothing else to do.
+        return number, text, None, None
+
+
+def run_batch(craton_shell, stream, max_workers=1, stop_on_error=False):
+    """Run the commands of a stream with the client of a shell.
+
+    Lines are parsed in the calling thread, one at a time, by the subparser
+    of their command. With ``max_workers`` greater than 1, that many lines
+    run concurrently and their output is captured and returned in their
+    :class:`Result` rather than printed, so lines must be independent of
+    each other.
+
+    :param craton_shell:
+        The :class:`~cratonclient.shell.main.CratonShell` whose client and
+        subparsers run the commands.
+    :param stream:
+        A file-like object of commands, one per line.
+    :param int max_workers:
+        The number of lines to run at once.
+    :param bool stop_on_error:
+        Whether to stop starting lines once a line failed.
+    :returns:
+        A generator of :class:`Result`, in the order of the lines. Their
+        ``status`` is the exit status the line would have had on its own: 0
+        on success, 1 if the command failed and 2 if the line could not be
+        parsed. Their ``output`` is what the command printed, or None if it
+        was printed directly.
+    """
+    failed = threading.Event()
+    output = None
+
+    def lines():
+        for number, text in read_commands(stream):
+            if stop_on_error and failed.is_set():
+                return
+            item = _parse(craton_shell, number, text)
+            if item[3] is not None:
+                failed.set()
+            yield item
+
+    def run(item):
+        number, text, args, error = item
+        if args is None:
+            return Result(number, text, 0 if error is None else 2, None,
+                          error)
+        if output is not None:
+            output.capture()
+        try:
+            args.func(craton_shell.cc, args)
+        except Exception as e:
+            failed.set()
+            return Result(number, text, 1, release(), e)
+        return Result(number, text, 0, release(), None)
+
+    def release():
+        return None if output is None else output.release()
+
+    if max_workers <= 1:
+        for item in lines():
+            yield run(item)
+        return
+
+    output = ThreadOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        for outcome in concurrency.imap_concurrently(
+                run, lines(), max_workers=max_workers):
+            if outcome.exception is not None:
+                raise outcome.exception
+            yield outcome.result
+    finally:
+        sys.stdout = output.stream
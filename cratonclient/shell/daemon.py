@@ -0,0 +1,288 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Local daemon running craton commands sent over a Unix socket.
+
+The daemon keeps one client, and so one session, connection pool and
+response cache, for every command. The protocol is one JSON object per
+line. The caller sends ``{"argv": [...], "key": ...}`` and the daemon
+answers with ``{"accepted": true}``, any number of ``{"stdout": ...}`` and
+``{"stderr": ...}`` messages, as the command writes them, and finally
+``{"status": ...}``. A command the daemon will not run is answered with
+``{"refused": ...}`` instead and should be run locally.
+"""
+
+from __future__ import print_function
+
+import errno
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+
+import six
+from six.moves import socketserver
+
+SOCKET_PATH = os.path.join('~', '.cache', 'craton', 'daemon.sock')
+
+# NOTE: Commands that read or write local files, or the terminal, run in
+# the calling process.
+LOCAL_COMMANDS = ('batch', 'daemon', 'export', 'host-import', 'shell')
+
+# NOTE: Options keeping a command running until the caller interrupts it,
+# which the daemon would not notice.
+LOCAL_OPTIONS = ('--watch',)
+
+# NOTE: Seconds a daemon has to accept a command before it is considered
+# hung and the command runs locally.
+ACCEPT_TIMEOUT = 1.0
+
+
+def credentials_key(args):
+    """Return a digest identifying the endpoint and credentials of args.
+
+    A command is only forwarded to a daemon authenticated the same way, and
+    the password itself is never sent.
+    """
+    identity = json.dumps([args.craton_url, args.craton_project_id,
+                           args.os_username, args.os_password])
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+
+def runs_locally(command, argv):
+    """Return whether a command must run in the calling process."""
+    return (command is None or command in LOCAL_COMMANDS or
+            any(arg in LOCAL_OPTIONS for arg in argv))
+
+
+def _send(stream, lock, **message):
+    data = json.dumps(message) + '\n'
+    with lock:
+        stream.write(data.encode('utf-8'))
+        stream.flush()
+
+
+def forward(path, argv, key, timeout=ACCEPT_TIMEOUT):
+    """Run a command through the daemon listening on ``path``, if any.
+
+    What the command writes is copied to :data:`sys.stdout` and
+    :data:`sys.stderr` as it arrives. A daemon that does not accept or
+    refuse the command within ``timeout`` seconds is not used. Once the
+    command is accepted, we wait for it to finish however long it takes, as
+    if it ran locally.
+
+    :param str path:
+        The path of the daemon's socket.
+    :param list argv:
+        The command and its arguments.
+    :param str key:
+        The :func:`credentials_key` of the caller.
+    :param float timeout:
+        The number of seconds to wait for the daemon to accept the command.
+    :returns:
+        The exit status of the command, or None if no daemon ran it.
+    """
+    path = os.path.expanduser(path)
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(path):
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(timeout)
+    try:
+        try:
+            connection.connect(path)
+            stream = connection.makefile('rwb')
+            _send(stream, threading.Lock(), argv=argv, key=key)
+            answer = json.loads(stream.readline().decode('utf-8'))
+        except (socket.error, ValueError):
+            # NOTE: socket.timeout is a socket.error.
+            return None
+        if not answer.get('accepted'):
+            return None
+        connection.settimeout(None)
+        for line in stream:
+            message = json.loads(line.decode('utf-8'))
+            if 'status' in message:
+                return message['status']
+            for name in ('stdout', 'stderr'):
+                if name in message:
+                    output = getattr(sys, name)
+                    output.write(message[name])
+                    output.flush()
+        # NOTE: The daemon stopped before the command finished.
+        return 1
+    finally:
+        connection.close()
+
+
+def is_listening(path):
+    """Return whether something accepts connections on the socket."""
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+        return True
+    except socket.error:
+        return False
+    finally:
+        connection.close()
+
+
+class _Channel(object):
+    """A text stream sending what is written to a connected caller."""
+
+    def __init__(self, stream, lock, name):
+        self.stream = stream
+        self.lock = lock
+        self.name = name
+
+    def write(self, text):
+        if isinstance(text, six.binary_type):
+            text = text.decode('utf-8')
+        _send(self.stream, self.lock, **{self.name: text})
+
+    def flush(self):
+        pass
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Run the command of a single caller."""
+
+    def handle(self):
+        lock = threading.Lock()
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            argv = list(request['argv'])
+        except (ValueError, KeyError, TypeError):
+            _send(self.wfile, lock, refused='Invalid request')
+            return
+        reason = self.server.refusal(argv, request.get('key'))
+        if reason is not None:
+            _send(self.wfile, lock, refused=reason)
+            return
+        _send(self.wfile, lock, accepted=True)
+        status = self.server.run(argv,
+                                 _Channel(self.wfile, lock, 'stdout'),
+                                 _Channel(self.wfile, lock, 'stderr'))
+        _send(self.wfile, lock, status=status)
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serve craton commands over a Unix socket with a single client.
+
+    Every caller is served by its own thread. Only the user running the
+    daemon can connect to its socket.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, craton_shell, key):
+        """Bind our socket.
+
+        :param str path:
+            The path of the socket. A stale socket is replaced.
+        :param craton_shell:
+            The :class:`~cratonclient.shell.main.CratonShell` whose client
+            and subparsers run the commands.
+        :param str key:
+            The :func:`credentials_key` callers must match.
+        :raises RuntimeError:
+            If another daemon is already listening on ``path``.
+        """
+        path = os.path.expanduser(path)
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        if os.path.exists(path):
+            if is_listening(path):
+                raise RuntimeError(
+                    'A craton daemon is already listening on {0}'.format(
+                        path))
+            os.unlink(path)
+        self.craton_shell = craton_shell
+        self.key = key
+        self._parse_lock = threading.Lock()
+        umask = os.umask(0o177)
+        try:
+            socketserver.UnixStreamServer.__init__(self, path,
+                                                   _RequestHandler)
+        finally:
+            os.umask(umask)
+
+    def refusal(self, argv, key):
+        """Return why a command should run locally, or None to run it."""
+        if key != self.key:
+            return 'Different endpoint or credentials'
+        try:
+            command = self.craton_shell.find_command(argv)
+        except SystemExit:
+            command = None
+        if runs_locally(command, argv):
+            return 'Not a command for the daemon'
+        return None
+
+    def run(self, argv, stdout, stderr):
+        """Run a command, sending its output to the given streams.
+
+        :returns:
+            The exit status of the command.
+        """
+        sys.stdout.capture(stdout)
+        sys.stderr.capture(stderr)
+        try:
+            # NOTE: Building subparsers updates the shell's attributes.
+            with self._parse_lock:
+                args = self.craton_shell.parse_command(argv)
+            args.func(self.craton_shell.cc, args)
+            return 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                return e.code or 0
+            print(e.code, file=sys.stderr)
+            return 1
+        except Exception as e:
+            print("ERROR: %s" % six.text_type(e), file=sys.stderr)
+            return 1
+        finally:
+            self.craton_shell.flush_completion_cache()
+            sys.stdout.release()
+            sys.stderr.release()
+
+    def handle_error(self, request, client_address):
+        """Ignore callers that went away before their command finished."""
+        if isinstance(sys.exc_info()[1], socket.error):
+            return
+        socketserver.UnixStreamServer.handle_error(self, request,
+                                                   client_address)
+
+    def serve(self, poll_interval=0.5):
+        """Serve callers until interrupted, then remove the socket.
+
+        :param float poll_interval:
+            The number of seconds between checks for a shutdown request.
+        """
+        from cratonclient.shell import batch
+
+        stdout, stderr = sys.stdout, sys.stderr
+        sys.stdout = batch.ThreadOutput(stdout)
+        sys.stderr = batch.ThreadOutput(stderr)
+        try:
+            self.serve_forever(poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+            self.server_close()
+            try:
+                os.unlink(self.server_address)
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
@@ -0,0 +1,152 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Ansible dynamic inventory script for Craton."""
+
+from __future__ import print_function
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+from cratonclient.common import cliutils
+from cratonclient.v1 import ansible_inventory
+
+DEFAULT_CACHE_PATH = os.path.join('~', '.cache', 'craton', 'inventory.json')
+DEFAULT_CACHE_TTL = 300
+
+
+def get_parser():
+    """Configure the arguments of craton-inventory."""
+    parser = argparse.ArgumentParser(
+        prog='craton-inventory',
+        description=__doc__.strip(),
+    )
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--list',
+                      action='store_true',
+                      help='Print every group and host.')
+    mode.add_argument('--host',
+                      metavar='<host>',
+                      help='Print the variables of a single host.')
+    parser.add_argument('--region',
+                        dest='regions',
+                        metavar='<region>',
+                        type=int,
+                        action='append',
+                        help='ID of a region to include. May be repeated. '
+                             'Defaults to every region.')
+    parser.add_argument('--refresh',
+                        action='store_true',
+                        default=False,
+                        help='Ignore the cache and fetch the inventory.')
+    parser.add_argument('--cache-path',
+                        default=cliutils.env('CRATON_INVENTORY_CACHE',
+                                             default=DEFAULT_CACHE_PATH),
+                        help='Defaults to env[CRATON_INVENTORY_CACHE] or '
+                             '{0}'.format(DEFAULT_CACHE_PATH))
+    parser.add_argument('--cache-ttl',
+                        type=int,
+                        default=int(cliutils.env('CRATON_INVENTORY_CACHE_TTL',
+                                                 default=DEFAULT_CACHE_TTL)),
+                        help='Seconds the cache stays fresh, 0 to disable '
+                             'it. Defaults to '
+                             'env[CRATON_INVENTORY_CACHE_TTL] or '
+                             '{0}'.format(DEFAULT_CACHE_TTL))
+    parser.add_argument('--max-workers',
+                        type=int,
+                        default=8,
+                        help='Number of regions to fetch concurrently.')
+    parser.add_argument('--craton-url',
+                        default=cliutils.env('CRATON_URL'),
+                        help='Defaults to env[CRATON_URL]')
+    parser.add_argument('--craton-project-id',
+                        type=int,
+                        default=int(cliutils.env('CRATON_PROJECT_ID',
+                                                 default=1)),
+                        help='Defaults to env[CRATON_PROJECT_ID] or 1')
+    parser.add_argument('--os-username',
+                        default=cliutils.env('OS_USERNAME'),
+                        help='Defaults to env[OS_USERNAME]')
+    parser.add_argument('--os-password',
+                        default=cliutils.env('OS_PASSWORD'),
+                        help='Defaults to env[OS_PASSWORD]')
+    return parser
+
+
+def fetch_inventory(args):
+    """Build the inventory from the Craton API."""
+    # NOTE: Ansible runs this script on every playbook run. Only import
+    # the HTTP stack when the cache cannot answer.
+    from cratonclient import session as craton
+    from cratonclient.v1 import client
+
+    session = craton.Session(
+        username=args.os_username,
+        token=args.os_password,
+        project_id=args.craton_project_id,
+    )
+    return ansible_inventory.build_inventory(
+        client.Client(session, args.craton_url),
+        region_ids=args.regions,
+        max_workers=args.max_workers,
+    )
+
+
+def cache_key(args):
+    """Return a digest identifying the endpoint, project and user of args.
+
+    The inventory of one deployment is never answered from the cache of
+    another.
+    """
+    identity = json.dumps([args.craton_url, args.craton_project_id,
+                           args.os_username])
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+
+def get_inventory(args):
+    """Return the inventory from the cache or, if stale, from the API."""
+    cache_path = os.path.expanduser(args.cache_path)
+    key = cache_key(args)
+    use_cache = args.cache_ttl > 0 and not args.regions
+    if use_cache and not args.refresh:
+        inventory = ansible_inventory.load_cache(cache_path, args.cache_ttl,
+                                                 key)
+        if inventory is not None:
+            return inventory
+    inventory = fetch_inventory(args)
+    if use_cache:
+        ansible_inventory.save_cache(cache_path, inventory, key)
+    return inventory
+
+
+def main(argv=None):
+    """Main entry-point for craton-inventory."""
+    args = get_parser().parse_args(argv)
+    try:
+        inventory = get_inventory(args)
+    except Exception as e:
+        print('ERROR: {0}'.format(e), file=sys.stderr)
+        return 1
+
+    if args.list:
+        result = inventory
+    else:
+        result = inventory['_meta']['hostvars'].get(args.host, {})
+    json.dump(result, sys.stdout, sort_keys=True)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,17 +14,19 @@
 from __future__ import print_function
 
 import argparse
+import importlib
+import json
 import six
 import sys
 
 from oslo_utils import encodeutils
 
 from cratonclient import __version__
-from cratonclient import session as craton
+from cratonclient import exceptions as exc
 
 from cratonclient.common import cliutils
+from cratonclient.shell import daemon
 from cratonclient.shell.v1 import shell
-from cratonclient.v1 import client
 
 
 class CratonShell(object):
@@ -68,29 +70,59 @@ class CratonShell(object):
                             )
         return parser
 
+    def get_command_index(self):
+        """Return the cached index of command names to command modules."""
+        if getattr(self, '_command_index', None) is None:
+            self._command_index = shell.load_command_index(
+                cliutils.env('CRATON_COMMAND_CACHE',
+                             default=shell.COMMAND_CACHE_PATH))
+        return self._command_index
+
     # NOTE(cmspence): Credit for this get_subcommand_parser function
     # goes to the magnumclient developers and contributors.
-    def get_subcommand_parser(self):
-        """Get subcommands by parsing COMMAND_MODULES."""
+    def get_subcommand_parser(self, command=None):
+        """Get subcommands by parsing COMMAND_MODULES.
+
+        :param str command:
+            If set, only the module defining this command is imported and
+            only its subparser is built. Unknown commands fall back to every
+            subparser, so that argparse can list the valid choices.
+        """
         parser = self.get_base_parser()
 
         self.subcommands = {}
         subparsers = parser.add_subparsers(metavar='<subcommand>',
                                            dest='subparser_name')
-        command_modules = shell.COMMAND_MODULES
-        for command_module in command_modules:
+        if command in shell.command_names(self):
+            self._find_subparsers(subparsers, self, [command])
+            return parser
+        module_name = None
+        if command is not None:
+            module_name = self.get_command_index().get(command)
+        if module_name is not None:
+            self._find_subparsers(subparsers,
+                                  importlib.import_module(module_name),
+                                  [command])
+            return parser
+        for command_module in shell.load_command_modules():
             self._find_subparsers(subparsers, command_module)
         self._find_subparsers(subparsers, self)
         return parser
 
     # NOTE(cmspence): Credit for this function goes to the
     # magnumclient developers and contributors.
-    def _find_subparsers(self, subparsers, actions_module):
-        """Find subparsers by looking at *_shell files."""
+    def _find_subparsers(self, subparsers, actions_module, commands=None):
+        """Find subparsers by looking at *_shell files.
+
+        :param commands:
+            If set, only the subparsers of these commands are built.
+        """
         help_formatter = argparse.HelpFormatter
-        for attr in (a for a in dir(actions_module) if a.startswith('do_')):
-            command = attr[3:].replace('_', '-')
-            callback = getattr(actions_module, attr)
+        for command in shell.command_names(actions_module):
+            if commands is not None and command not in commands:
+                continue
+            callback = getattr(actions_module,
+                               'do_' + command.replace('-', '_'))
             desc = callback.__doc__ or ''
             action_help = desc.strip()
             arguments = getattr(callback, 'arguments', [])
@@ -108,33 +140,209 @@ class CratonShell(object):
                 subparser.add_argument(*args, **kwargs)
             subparser.set_defaults(func=callback)
 
+    def get_client(self, args):
+        """Create the client used to run commands from parsed arguments."""
+        # NOTE: keystoneauth1 and requests are slow to import, so only
+        # import them once a command is about to run.
+        from cratonclient import completion
+        from cratonclient import session as craton
+        from cratonclient.v1 import client
+
+        session = craton.Session(
+            username=args.os_username,
+            token=args.os_password,
+            project_id=args.craton_project_id,
+        )
+        self.completion_cache = completion.CompletionCache(
+            cliutils.env('CRATON_COMPLETION_CACHE',
+                         default=completion.CACHE_DIRECTORY))
+        session.completion_cache = self.completion_cache
+        return client.Client(session, args.craton_url)
+
+    def flush_completion_cache(self):
+        """Write the IDs the last commands saw for shell completion."""
+        if getattr(self, 'completion_cache', None) is not None:
+            self.completion_cache.flush()
+
+    def find_command(self, argv):
+        """Return the name of the command in ``argv``, or None."""
+        (_, args) = self.get_base_parser().parse_known_args(argv)
+        return next((arg for arg in args if not arg.startswith('-')), None)
+
+    def parse_command(self, argv):
+        """Parse a single command with the subparser of that command only.
+
+        :param list argv:
+            The command and its arguments.
+        :returns:
+            The parsed arguments, whose ``func`` runs the command.
+        :raises SystemExit:
+            If the arguments are invalid or help was requested.
+        """
+        command = self.find_command(argv)
+        return self.get_subcommand_parser(command).parse_args(argv)
+
+    def run_command(self, argv):
+        """Run a single command in-process with the existing client.
+
+        Options of the base parser, such as ``--craton-url``, are parsed but
+        ignored since the client already exists.
+
+        :param list argv:
+            The command and its arguments, e.g., ``['host-list', '-r',
+            '1']``.
+        :raises SystemExit:
+            If the arguments are invalid or help was requested.
+        """
+        args = self.parse_command(argv)
+        try:
+            return args.func(self.cc, args)
+        finally:
+            self.flush_completion_cache()
+
+    @cliutils.arg('--prompt',
+                  default='craton> ',
+                  help='The prompt of the interactive shell.')
+    def do_shell(self, cc, args):
+        """Start an interactive shell that runs commands in-process.
+
+        The client, its session and its connections are reused by every
+        command. Type "help" to list the commands and "exit" to leave.
+        """
+        from cratonclient.shell import repl
+
+        repl.CratonRepl(self, prompt=args.prompt).cmdloop()
+
+    @cliutils.arg('file',
+                  metavar='<file>',
+                  nargs='?',
+                  type=argparse.FileType('r'),
+                  default='-',
+                  help='File of commands, one per line, or "-" for stdin, '
+                       'the default. Blank lines and lines starting with '
+                       '"#" are skipped.')
+    @cliutils.arg('--max-workers',
+                  metavar='<count>',
+                  type=int,
+                  default=1,
+                  help='Number of lines to run concurrently. Only use more '
+                       'than 1 when lines are independent. Defaults to 1.')
+    @cliutils.arg('--stop-on-error',
+                  action='store_true',
+                  default=False,
+                  help='Do not start any line once a line failed.')
+    @cliutils.arg('--report',
+                  metavar='<file>',
+                  type=argparse.FileType('w'),
+                  help='Write the JSON-lines status of every line to this '
+                       'file instead of stderr.')
+    def do_batch(self, cc, args):
+        """Run many commands, read one per line, with a single client."""
+        from cratonclient.shell import batch
+
+        report = args.report or sys.stderr
+        total = failed = 0
+        for result in batch.run_batch(self, args.file,
+                                      max_workers=args.max_workers,
+                                      stop_on_error=args.stop_on_error):
+            if result.output:
+                sys.stdout.write(result.output)
+            entry = {'line': result.line, 'command': result.command,
+                     'status': result.status}
+            if result.status:
+                failed += 1
+                entry['error'] = six.text_type(result.error)
+            total += 1
+            report.write(json.dumps(entry, sort_keys=True) + '\n')
+        sys.stdout.flush()
+        report.flush()
+        print('{0} of {1} commands succeeded.'.format(total - failed, total),
+              file=sys.stderr)
+        if failed:
+            raise exc.CommandError('{0} commands failed'.format(failed))
+
+    def do_bash_completion(self, cc, args):
+        """Print the commands and options of craton for bash completion."""
+        parser = self.get_subcommand_parser()
+        words = set(self.subcommands)
+        for command_parser in [parser] + list(self.subcommands.values()):
+            words.update(command_parser._option_string_actions)
+        print(' '.join(sorted(words)))
+
+    @cliutils.arg('--socket',
+                  metavar='<path>',
+                  default=cliutils.env('CRATON_DAEMON_SOCKET',
+                                       default=daemon.SOCKET_PATH),
+                  help='Path of the Unix socket to listen on. Defaults to '
+                       'env[CRATON_DAEMON_SOCKET] or '
+                       '{0}'.format(daemon.SOCKET_PATH))
+    def do_daemon(self, cc, args):
+        """Serve the commands of craton from a single client.
+
+        While the daemon runs, craton sends it every command it can run
+        with the same endpoint and credentials, which saves creating a
+        session and connecting for every command.
+        """
+        from cratonclient import cache
+
+        session = cc._session
+        if getattr(session, 'conditional_cache', False) is None:
+            session.conditional_cache = cache.ConditionalCache()
+        server = daemon.DaemonServer(args.socket, self,
+                                     daemon.credentials_key(args))
+        print('Listening on {0}'.format(server.server_address),
+              file=sys.stderr)
+        server.serve()
+
+    def forward(self, argv):
+        """Run a command through a running craton daemon, if there is one.
+
+        :returns:
+            The exit status of the command, or None if it must run in this
+            process.
+        """
+        (options, args) = self.get_base_parser().parse_known_args(argv)
+        if options.help or ('help' in argv):
+            return None
+        command = next((arg for arg in args if not arg.startswith('-')),
+                       None)
+        if daemon.runs_locally(command, args):
+            return None
+        # NOTE: Only the command is sent. The daemon uses its own endpoint
+        # and credentials, which must match ours.
+        return daemon.forward(
+            cliutils.env('CRATON_DAEMON_SOCKET', default=daemon.SOCKET_PATH),
+            args, daemon.credentials_key(options))
+
     def main(self, argv):
         """Main entry-point for cratonclient shell argument parsing."""
         parser = self.get_base_parser()
         (options, args) = parser.parse_known_args(argv)
-        subcommand_parser = (
-            self.get_subcommand_parser()
-        )
-        self.parser = subcommand_parser
-
         if options.help or ('help' in argv) or not argv:
             parser.print_help()
             return 0
 
+        command = self.find_command(argv)
+        subcommand_parser = self.get_subcommand_parser(command)
+        self.parser = subcommand_parser
         args = subcommand_parser.parse_args(argv)
-        session = craton.Session(
-            username=args.os_username,
-            token=args.os_password,
-            project_id=args.craton_project_id,
-        )
-        self.cc = client.Client(session, args.craton_url)
-        args.func(self.cc, args)
+        self.cc = self.get_client(args)
+        try:
+            args.func(self.cc, args)
+        finally:
+            self.flush_completion_cache()
 
 
 def main():
     """Main entry-point for cratonclient's CLI."""
+    argv = [encodeutils.safe_decode(a) for a in sys.argv[1:]]
     try:
-        CratonShell().main([encodeutils.safe_decode(a) for a in sys.argv[1:]])
+        craton_shell = CratonShell()
+        status = craton_shell.forward(argv)
+        if status is None:
+            craton_shell.main(argv)
+        elif status:
+            sys.exit(status)
     except Exception as e:
         print("ERROR: %s" % encodeutils.safe_encode(six.text_type(e)),
               file=sys.stderr)
@@ -0,0 +1,163 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Interactive shell running craton commands in-process."""
+
+from __future__ import print_function
+
+import cmd
+import collections
+import shlex
+import sys
+
+from oslo_utils import encodeutils
+import six
+
+from cratonclient.shell import batch
+
+# NOTE: Commands of the interactive shell itself, next to the craton ones.
+BUILTIN_COMMANDS = ('exit', 'help', 'quit')
+
+
+class CratonRepl(cmd.Cmd):
+    """Read, parse and run craton commands with a single client.
+
+    Every line is parsed by the subparser of its command and run by that
+    command's ``do_*`` function with the client of the
+    :class:`~cratonclient.shell.main.CratonShell`, so the session and its
+    connection pool are reused instead of being created for every command.
+
+    The IDs and names of the resources that commands return are remembered
+    to complete the arguments of later commands.
+    """
+
+    def __init__(self, craton_shell, prompt='craton> ', stdin=None,
+                 stdout=None):
+        """Initialize our interactive shell.
+
+        :param craton_shell:
+            The :class:`~cratonclient.shell.main.CratonShell` whose client
+            and subparsers run the commands.
+        :param str prompt:
+            The prompt printed before every line.
+        :param stdin:
+            The file to read lines from. Defaults to :data:`sys.stdin`.
+        :param stdout:
+            The file to print the prompt to. Defaults to :data:`sys.stdout`.
+        """
+        # NOTE: cmd.Cmd is an old-style class on Python 2.
+        cmd.Cmd.__init__(self, stdin=stdin, stdout=stdout)
+        if stdin is not None:
+            self.use_rawinput = False
+        self.craton_shell = craton_shell
+        self.prompt = prompt
+        self.names = collections.defaultdict(set)
+        craton_shell.cc._session.register_hook('after-parse',
+                                               self.remember_names)
+
+    def remember_names(self, request_event):
+        """Remember the IDs and names of parsed resources for completion."""
+        resources = request_event.resources
+        if not isinstance(resources, list):
+            resources = [resources]
+        for resource in resources:
+            key = getattr(resource.manager, 'key', None)
+            info = resource.to_dict()
+            for field in ('id', 'name'):
+                if info.get(field) is not None:
+                    self.names[key].add(six.text_type(info[field]))
+
+    def preloop(self):
+        """Complete whole command names, which contain dashes."""
+        try:
+            import readline
+        except ImportError:
+            return
+        readline.set_completer_delims(' \t\n')
+
+    def command_names(self):
+        """Return every command the interactive shell can run."""
+        names = set(self.craton_shell.get_command_index())
+        names.update(BUILTIN_COMMANDS)
+        return sorted(names)
+
+    def emptyline(self):
+        """Do nothing instead of repeating the previous command."""
+
+    def default(self, line):
+        """Run a craton command."""
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            self._error(e)
+            return
+        if argv[0] == 'shell':
+            self._error('Already in the interactive shell')
+            return
+        if argv[0] in batch.NESTED_COMMANDS:
+            self._error('{0} cannot be run in the interactive '
+                        'shell'.format(argv[0]))
+            return
+        try:
+            self.craton_shell.run_command(argv)
+        except SystemExit:
+            # NOTE: argparse exits after printing help or a usage error.
+            pass
+        except Exception as e:
+            self._error(e)
+
+    def _error(self, error):
+        print("ERROR: %s" % encodeutils.safe_encode(six.text_type(error)),
+              file=sys.stderr)
+
+    def do_help(self, arg):
+        """List the commands or show the help of one."""
+        if arg:
+            self.default('{0} --help'.format(arg))
+            return
+        self.columnize(self.command_names(), displaywidth=80)
+
+    def do_exit(self, arg):
+        """Leave the interactive shell."""
+        return True
+
+    do_quit = do_exit
+
+    def do_EOF(self, arg):
+        """Leave the interactive shell at the end of the input."""
+        print(file=self.stdout)
+        return True
+
+    def completenames(self, text, *ignored):
+        """Complete command names."""
+        return [name for name in self.command_names()
+                if name.startswith(text)]
+
+    def complete_help(self, text, line, begidx, endidx):
+        """Complete the command whose help is requested."""
+        return self.completenames(text)
+
+    def completedefault(self, text, line, begidx, endidx):
+        """Complete the options of a command and the resources it takes."""
+        command = line.split()[0]
+        if text.startswith('-'):
+            try:
+                self.craton_shell.get_subcommand_parser(command)
+            except Exception:
+                return []
+            subparser = self.craton_shell.subcommands.get(command)
+            if subparser is None:
+                return []
+            options = subparser._option_string_actions
+            return sorted(option for option in options
+                          if option.startswith(text))
+        names = self.names.get(command.split('-')[0], ())
+        return sorted(name for name in names if name.startswith(text))
@@ -25,11 +25,12 @@ from cratonclient.v1.cells import CELL_FIELDS as c_fields
               metavar='<cell>',
               type=int,
               help='ID of the cell.')
+@cliutils.format_arg
 def do_cell_show(cc, args):
     """Show detailed information about a cell."""
     cell = cc.inventory(args.region).cells.get(args.id)
     data = {f: getattr(cell, f, '') for f in c_fields}
-    cliutils.print_dict(data, wrap=72)
+    cliutils.print_dict(data, wrap=72, output_format=args.output_format)
 
 
 @cliutils.arg('-r', '--region',
@@ -59,6 +60,17 @@ def do_cell_show(cc, args):
               help='Comma-separated list of fields to display. '
                    'Only these fields will be fetched from the server. '
                    'Can not be used when "--detail" is specified')
+@cliutils.arg('--watch',
+              action='store_true',
+              default=False,
+              help='Keep polling and print the cells that change.')
+@cliutils.arg('--watch-interval',
+              metavar='<seconds>',
+              type=float,
+              default=2.0,
+              help='Seconds between two polls when watching. '
+                   'Defaults to 2.')
+@cliutils.list_format_arg
 def do_cell_list(cc, args):
     """Print list of cells which are registered with the Craton service."""
     params = {}
@@ -94,8 +106,18 @@ def do_cell_list(cc, args):
                                        'are: "asc", "desc".')
         params['sort_dir'] = args.sort_dir
 
-    cells = cc.inventory(args.region).cells.list(**params)
-    cliutils.print_list(cells, list(fields))
+    manager = cc.inventory(args.region).cells
+    if args.watch:
+        cliutils.print_watch(manager, list(fields),
+                             interval=args.watch_interval, **params)
+        return
+    cells = cliutils.list_items(manager,
+                                output_format=args.output_format,
+                                chunk_size=args.chunk_size, **params)
+    # NOTE: Keep the table from sorting the rows again.
+    cliutils.print_list(cells, list(fields), sortby_index=None,
+                        output_format=args.output_format,
+                        chunk_size=args.chunk_size)
 
 
 @cliutils.arg('-n', '--name',
@@ -0,0 +1,106 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Inventory export shell wrapper."""
+from __future__ import print_function
+
+import gzip
+import io
+import sys
+
+import six
+
+from cratonclient.common import cliutils
+from cratonclient.v1 import export
+
+
+def _open_output(path, compress):
+    """Open the export destination for writing text."""
+    if not six.PY3:
+        if path == '-':
+            if compress:
+                return gzip.GzipFile(fileobj=sys.stdout, mode='wb')
+            return sys.stdout
+        return gzip.open(path, 'wb') if compress else open(path, 'w')
+    if path == '-':
+        if compress:
+            return io.TextIOWrapper(
+                gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb'),
+                encoding='utf-8')
+        return sys.stdout
+    if compress:
+        return io.TextIOWrapper(gzip.GzipFile(path, 'wb'), encoding='utf-8')
+    return io.open(path, 'w', encoding='utf-8', newline='')
+
+
+@cliutils.arg('-o', '--output',
+              metavar='<file>',
+              default='-',
+              help='File to write the export to. Defaults to stdout.')
+@cliutils.arg('--format',
+              dest='record_format',
+              choices=('jsonl', 'csv'),
+              help='Format of the export. Defaults to csv for files ending '
+                   'in ".csv" or ".csv.gz" and jsonl otherwise.')
+@cliutils.arg('--gzip',
+              dest='compress',
+              action='store_true',
+              default=False,
+              help='Compress the export. Implied by files ending in ".gz".')
+@cliutils.arg('-r', '--region',
+              dest='regions',
+              metavar='<region>',
+              type=int,
+              action='append',
+              help='ID of a region to export. May be repeated. Defaults to '
+                   'every region.')
+@cliutils.arg('-t', '--type',
+              dest='resource_types',
+              choices=export.RESOURCE_TYPES,
+              action='append',
+              help='Type of resource to export. May be repeated. Defaults to '
+                   'every type.')
+@cliutils.arg('--page-size',
+              metavar='<size>',
+              type=int,
+              default=export.DEFAULT_PAGE_SIZE,
+              help='Number of cells or hosts to request at once. '
+                   'Defaults to {0}.'.format(export.DEFAULT_PAGE_SIZE))
+@cliutils.arg('--max-workers',
+              metavar='<count>',
+              type=int,
+              default=8,
+              help='Number of regions to fetch concurrently. Defaults to 8.')
+def do_export(cc, args):
+    """Export regions, cells and hosts as JSON-lines or CSV."""
+    path = args.output
+    compress = args.compress or path.endswith('.gz')
+    record_format = args.record_format
+    if record_format is None:
+        stem = path[:-3] if path.endswith('.gz') else path
+        record_format = 'csv' if stem.endswith('.csv') else 'jsonl'
+
+    stream = _open_output(path, compress)
+    try:
+        counts = export.export_inventory(
+            cc, stream, record_format,
+            resource_types=args.resource_types or export.RESOURCE_TYPES,
+            region_ids=args.regions,
+            page_size=args.page_size,
+            max_workers=args.max_workers,
+        )
+    finally:
+        if stream is sys.stdout:
+            stream.flush()
+        else:
+            stream.close()
+    print('Exported {regions} regions, {cells} cells and {hosts} '
+          'hosts.'.format(**counts), file=sys.stderr)
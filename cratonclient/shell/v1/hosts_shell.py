@@ -12,10 +12,28 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 """Hosts resource and resource shell wrapper."""
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+
+from oslo_utils import strutils
+import six
+
 from cratonclient.common import cliutils
+from cratonclient import concurrency
 from cratonclient import exceptions as exc
 from cratonclient.v1.hosts import HOST_FIELDS as h_fields
 
+IMPORT_REQUIRED_FIELDS = ('name', 'ip_address', 'device_type')
+IMPORT_READ_ONLY_FIELDS = ('id', 'created_at', 'update_at')
+IMPORT_INTEGER_FIELDS = ('project_id', 'region_id', 'cell_id',
+                         'access_secret_id')
+# NOTE: Labels are accepted on creation but are not one of HOST_FIELDS.
+IMPORT_FIELDS = set(h_fields).union(['labels']).difference(
+    IMPORT_READ_ONLY_FIELDS)
+
 
 @cliutils.arg('region',
               metavar='<region>',
@@ -25,11 +43,12 @@ from cratonclient.v1.hosts import HOST_FIELDS as h_fields
               metavar='<host>',
               type=int,
               help='ID of the host.')
+@cliutils.format_arg
 def do_host_show(cc, args):
     """Show detailed information about a host."""
     host = cc.inventory(args.region).hosts.get(args.id)
     data = {f: getattr(host, f, '') for f in h_fields}
-    cliutils.print_dict(data, wrap=72)
+    cliutils.print_dict(data, wrap=72, output_format=args.output_format)
 
 
 @cliutils.arg('-r', '--region',
@@ -64,6 +83,17 @@ def do_host_show(cc, args):
               help='Comma-separated list of fields to display. '
                    'Only these fields will be fetched from the server. '
                    'Can not be used when "--detail" is specified')
+@cliutils.arg('--watch',
+              action='store_true',
+              default=False,
+              help='Keep polling and print the hosts that change.')
+@cliutils.arg('--watch-interval',
+              metavar='<seconds>',
+              type=float,
+              default=2.0,
+              help='Seconds between two polls when watching. '
+                   'Defaults to 2.')
+@cliutils.list_format_arg
 def do_host_list(cc, args):
     """Print list of hosts which are registered with the Craton service."""
     params = {}
@@ -101,8 +131,18 @@ def do_host_list(cc, args):
                                        'are: "asc", "desc".')
         params['sort_dir'] = args.sort_dir
 
-    hosts = cc.inventory(args.region).hosts.list(**params)
-    cliutils.print_list(hosts, list(fields))
+    manager = cc.inventory(args.region).hosts
+    if args.watch:
+        cliutils.print_watch(manager, list(fields),
+                             interval=args.watch_interval, **params)
+        return
+    hosts = cliutils.list_items(manager,
+                                output_format=args.output_format,
+                                chunk_size=args.chunk_size, **params)
+    # NOTE: Keep the table from sorting the rows again.
+    cliutils.print_list(hosts, list(fields), sortby_index=None,
+                        output_format=args.output_format,
+                        chunk_size=args.chunk_size)
 
 
 @cliutils.arg('-n', '--name',
@@ -157,6 +197,123 @@ def do_host_create(cc, args):
     cliutils.print_dict(data, wrap=72)
 
 
+def _import_fields(record, defaults):
+    """Validate and convert a record read by host-import."""
+    unknown = sorted(k for k in record if k not in IMPORT_FIELDS)
+    if unknown:
+        raise exc.CommandError('Unknown fields: {0}'.format(
+            ', '.join(unknown)))
+    fields = dict(defaults)
+    fields.update(record)
+    missing = [k for k in IMPORT_REQUIRED_FIELDS + ('region_id',)
+               if fields.get(k) in (None, '')]
+    if missing:
+        raise exc.CommandError('Missing fields: {0}'.format(
+            ', '.join(missing)))
+    for k in IMPORT_INTEGER_FIELDS:
+        if isinstance(fields.get(k), six.string_types):
+            try:
+                fields[k] = int(fields[k])
+            except ValueError:
+                raise exc.CommandError('{0} must be an integer, got '
+                                       '{1!r}'.format(k, fields[k]))
+    if isinstance(fields.get('active'), six.string_types):
+        fields['active'] = strutils.bool_from_string(fields['active'],
+                                                     strict=True)
+    if isinstance(fields.get('labels'), six.string_types):
+        fields['labels'] = [label.strip()
+                            for label in fields['labels'].split(';')
+                            if label.strip()]
+    return fields
+
+
+@cliutils.arg('file',
+              metavar='<file>',
+              type=argparse.FileType('r'),
+              help='CSV or JSON-lines file of hosts, or "-" for stdin.')
+@cliutils.arg('-r', '--region',
+              metavar='<region>',
+              type=int,
+              help='ID of the region of hosts that do not specify one.')
+@cliutils.arg('-p', '--project',
+              dest='project_id',
+              metavar='<project>',
+              type=int,
+              help='ID of the project of hosts that do not specify one. '
+                   'Defaults to --craton-project-id.')
+@cliutils.arg('--format',
+              dest='record_format',
+              choices=('csv', 'jsonl'),
+              help='Format of the file. Defaults to csv for files ending in '
+                   '".csv" and jsonl otherwise.')
+@cliutils.arg('--max-workers',
+              metavar='<count>',
+              type=int,
+              default=8,
+              help='Number of hosts to create concurrently. Defaults to 8.')
+@cliutils.arg('--report',
+              metavar='<file>',
+              type=argparse.FileType('w'),
+              help='Write the JSON-lines report of every row to this file '
+                   'instead of stdout.')
+@cliutils.arg('--dry-run',
+              action='store_true',
+              default=False,
+              help='Only validate the hosts.')
+def do_host_import(cc, args):
+    """Register many hosts read from a CSV or JSON-lines file."""
+    record_format = args.record_format
+    if record_format is None:
+        name = getattr(args.file, 'name', '')
+        record_format = 'csv' if name.endswith('.csv') else 'jsonl'
+    defaults = {'project_id': args.project_id or
+                getattr(args, 'craton_project_id', None)}
+    if args.region is not None:
+        defaults['region_id'] = args.region
+    defaults = {k: v for (k, v) in defaults.items() if v is not None}
+
+    def rows():
+        records = cliutils.read_records(args.file, record_format)
+        for number, record in enumerate(records, 1):
+            try:
+                fields = _import_fields(record, defaults)
+            except exc.CommandError as e:
+                yield number, record, None, e
+                continue
+            yield (number, fields, cc.inventory(fields['region_id']).hosts,
+                   None)
+
+    def create(row):
+        _, fields, manager, error = row
+        if error is not None:
+            raise error
+        if args.dry_run:
+            return None
+        return manager.create(**fields)
+
+    report = args.report or sys.stdout
+    total = failed = 0
+    for outcome in concurrency.imap_concurrently(
+            create, rows(), max_workers=args.max_workers):
+        number, fields = outcome.item[:2]
+        entry = {'row': number, 'name': fields.get('name')}
+        if outcome.exception is not None:
+            failed += 1
+            entry.update(status='failed', error=str(outcome.exception))
+        elif args.dry_run:
+            entry['status'] = 'valid'
+        else:
+            entry.update(status='created', id=outcome.result.id)
+        total += 1
+        report.write(json.dumps(entry, sort_keys=True) + '\n')
+    report.flush()
+    print('{0} of {1} hosts {2}.'.format(
+        total - failed, total, 'valid' if args.dry_run else 'imported'),
+        file=sys.stderr)
+    if failed:
+        raise exc.CommandError('{0} hosts failed to import'.format(failed))
+
+
 @cliutils.arg('region',
               metavar='<region>',
               type=int,
@@ -35,8 +35,9 @@ def do_region_create(cc, args):
               metavar='<region>',
               type=int,
               help='ID of the region.')
+@cliutils.format_arg
 def do_region_show(cc, args):
     """Show detailed information about a region."""
     region = cc.regions.get(args.id)
     data = {f: getattr(region, f, '') for f in r_fields}
-    cliutils.print_dict(data, wrap=72)
+    cliutils.print_dict(data, wrap=72, output_format=args.output_format)
@@ -10,14 +10,98 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 """Command-line interface to the OpenStack Craton API V1."""
-from cratonclient.shell.v1 import cells_shell
-from cratonclient.shell.v1 import hosts_shell
-from cratonclient.shell.v1 import regions_shell
+import importlib
+import json
+import logging
+import os
 
+import six
 
+from cratonclient import __version__
+from cratonclient.common import fileutils
+
+LOG = logging.getLogger(__name__)
+
+# NOTE: Command modules are listed by name and only imported when one of
+# their commands is run, see load_command_index.
 COMMAND_MODULES = [
     # TODO(cmspence): project_shell, cell_shell, device_shell, user_shell, etc.
-    regions_shell,
-    hosts_shell,
-    cells_shell,
+    'cratonclient.shell.v1.regions_shell',
+    'cratonclient.shell.v1.hosts_shell',
+    'cratonclient.shell.v1.cells_shell',
+    'cratonclient.shell.v1.export_shell',
 ]
+
+COMMAND_CACHE_PATH = os.path.join('~', '.cache', 'craton', 'commands.json')
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def command_names(actions_module):
+    """Return the names of the commands an actions module defines."""
+    return [attr[3:].replace('_', '-')
+            for attr in dir(actions_module) if attr.startswith('do_')]
+
+
+def load_command_modules():
+    """Import and return every command module."""
+    return [importlib.import_module(name) for name in COMMAND_MODULES]
+
+
+def build_command_index():
+    """Import every command module and map command names to modules.
+
+    :returns:
+        A dictionary of command name to the name of the module defining it.
+    """
+    index = {}
+    for module in load_command_modules():
+        for command in command_names(module):
+            index[command] = module.__name__
+    return index
+
+
+def _signature():
+    """Identify the installed command modules without importing them."""
+    mtimes = []
+    for name in COMMAND_MODULES:
+        path = os.path.join(_HERE, name.rpartition('.')[2] + '.py')
+        try:
+            mtimes.append(os.path.getmtime(path))
+        except OSError:
+            mtimes.append(None)
+    return [__version__, COMMAND_MODULES, mtimes]
+
+
+def _save_command_index(path, cache):
+    try:
+        with fileutils.atomic_write(path) as cache_file:
+            cache_file.write(six.text_type(json.dumps(cache)))
+    except (IOError, OSError) as e:
+        LOG.debug('Could not save the command index to %s: %s', path, e)
+
+
+def load_command_index(path=COMMAND_CACHE_PATH):
+    """Return the command index, from the cache file when it is current.
+
+    The cache is keyed on the client version and on the modification times
+    of the command modules, so it is rebuilt after an upgrade or an edit.
+    Building it imports every command module; reading it imports none.
+
+    :param str path:
+        The path of the cache file.
+    :returns:
+        A dictionary of command name to the name of the module defining it.
+    """
+    path = os.path.expanduser(path)
+    signature = _signature()
+    try:
+        with open(path) as cache_file:
+            cache = json.load(cache_file)
+        if cache['signature'] == signature:
+            return cache['commands']
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        pass
+    index = build_command_index()
+    _save_command_index(path, {'signature': signature, 'commands': index})
+    return index
@@ -16,21 +16,63 @@
 # under the License.
 """Base TestCase for all cratonclient tests."""
 
+import os
+
+import fixtures
 import mock
+import requests
 import six
 
 from oslotest import base
 
+from cratonclient import session
 from cratonclient.shell import main
 
 
+def http_response(status_code, content=b'{}'):
+    """Build a requests response as a server would have sent it."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers['Content-Type'] = 'application/json'
+    response._content = content
+    return response
+
+
 class TestCase(base.BaseTestCase):
     """Test case base class for all unit tests."""
 
+    def keystoneauth_session(self, **kwargs):
+        """Create a Session using a real keystoneauth1 session.
+
+        Only the requests session underneath keystoneauth1 is replaced, by
+        ``self.transport``, so keystoneauth1 handles its responses and
+        exceptions as it would for a real server.
+        """
+        craton_session = session.Session(username='demo', token='token',
+                                         project_id='1', **kwargs)
+        self.transport = mock.Mock()
+        self.transport.request.return_value = http_response(200)
+        craton_session._session.session = self.transport
+        return craton_session
+
 
 class ShellTestCase(base.BaseTestCase):
     """Test case base class for all shell unit tests."""
 
+    def setUp(self):
+        """Keep the caches and daemon of the CLI out of the home."""
+        super(ShellTestCase, self).setUp()
+        cache_directory = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(fixtures.EnvironmentVariable(
+            'CRATON_COMMAND_CACHE',
+            os.path.join(cache_directory, 'commands.json')))
+        self.useFixture(fixtures.EnvironmentVariable(
+            'CRATON_DAEMON_SOCKET',
+            os.path.join(cache_directory, 'daemon.sock')))
+        self.useFixture(fixtures.EnvironmentVariable(
+            'CRATON_COMPLETION_CACHE',
+            os.path.join(cache_directory, 'completion')))
+
     def shell(self, arg_str, exitcodes=(0,)):
         """Main function for exercising the craton shell."""
         with mock.patch('sys.stdout', new=six.StringIO()) as mock_stdout, \
@@ -36,3 +36,9 @@ class TestCratonclient(base.TestCase):
         mock_inventory.assert_called_once_with(region_id=region_id,
                                                session=session,
                                                url=url + '/v1')
+
+    def test_client_creates_region_manager(self):
+        """Verify that Craton client creates a RegionManager."""
+        craton = client.Client(mock.Mock(), 'https://10.1.1.0:8080')
+        self.assertEqual('https://10.1.1.0:8080/v1/regions',
+                         craton.regions.build_url())
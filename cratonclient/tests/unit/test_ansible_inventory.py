@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for the Ansible dynamic inventory."""
+import json
+import os
+import shutil
+import tempfile
+
+import mock
+import six
+
+from cratonclient.shell import inventory as inventory_shell
+from cratonclient.tests import base
+from cratonclient.tests.unit import test_mirror
+from cratonclient.v1 import ansible_inventory
+
+HOSTS = [
+    {'id': 100, 'region_id': 1, 'cell_id': 10, 'name': 'h1',
+     'ip_address': '10.0.0.1', 'device_type': 'server',
+     'labels': ['compute', 'gpu-a100'], 'variables': {'ntp': 'ntp1'}},
+    {'id': 101, 'region_id': 1, 'cell_id': 10, 'name': 'h2',
+     'ip_address': '10.0.0.2', 'device_type': 'switch'},
+    {'id': 200, 'region_id': 2, 'cell_id': None, 'name': 'h3',
+     'ip_address': '10.1.0.1', 'device_type': 'server'},
+]
+
+
+class TestBuildInventory(base.TestCase):
+    """Unit tests for build_inventory."""
+
+    def setUp(self):
+        """Build an inventory from a fake client."""
+        super(TestBuildInventory, self).setUp()
+        self.client = test_mirror.fake_client(test_mirror.REGIONS,
+                                              test_mirror.CELLS, HOSTS)
+
+    def test_groups(self):
+        """Verify hosts are grouped by region, cell, type and label."""
+        inventory = ansible_inventory.build_inventory(self.client)
+
+        self.assertEqual(['region_ORD', 'region_DFW'],
+                         inventory['all']['children'])
+        self.assertEqual(['cell_ORD_C1'],
+                         inventory['region_ORD']['children'])
+        self.assertEqual(['h1', 'h2'], inventory['cell_ORD_C1']['hosts'])
+        self.assertEqual(['h3'], inventory['region_DFW']['hosts'])
+        self.assertEqual(['h1', 'h3'], inventory['type_server']['hosts'])
+        self.assertEqual(['h1'], inventory['label_gpu_a100']['hosts'])
+
+    def test_hostvars(self):
+        """Verify host variables include the host's own and Craton's."""
+        inventory = ansible_inventory.build_inventory(self.client)
+
+        hostvars = inventory['_meta']['hostvars']['h1']
+        self.assertEqual('10.0.0.1', hostvars['ansible_host'])
+        self.assertEqual('ntp1', hostvars['ntp'])
+        self.assertEqual('C1', hostvars['craton_cell'])
+        self.assertEqual('ORD', hostvars['craton_region'])
+        self.assertEqual(['compute', 'gpu-a100'], hostvars['craton_labels'])
+
+    def test_fetches_each_region_once(self):
+        """Verify one listing of cells and hosts per selected region."""
+        ansible_inventory.build_inventory(self.client, region_ids=[2])
+
+        self.assertEqual([2], list(self.client.inventories))
+        inventory = self.client.inventories[2]
+        inventory.cells.list.assert_called_once_with()
+        inventory.hosts.list.assert_called_once_with()
+
+
+class TestInventoryCache(base.TestCase):
+    """Unit tests for the on-disk inventory cache."""
+
+    def setUp(self):
+        """Create a temporary cache directory."""
+        super(TestInventoryCache, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'cache', 'inventory.json')
+
+    def test_round_trip_and_ttl(self):
+        """Verify a saved inventory is loaded until it is older than ttl."""
+        ansible_inventory.save_cache(self.path, {'all': {}})
+        mtime = os.path.getmtime(self.path)
+
+        self.assertEqual({'all': {}}, ansible_inventory.load_cache(
+            self.path, 60, clock=lambda: mtime + 30))
+        self.assertIsNone(ansible_inventory.load_cache(
+            self.path, 60, clock=lambda: mtime + 90))
+
+    def test_key_must_match(self):
+        """Verify an inventory saved with another key is ignored."""
+        ansible_inventory.save_cache(self.path, {'all': {}}, key='a')
+
+        self.assertEqual({'all': {}},
+                         ansible_inventory.load_cache(self.path, 60, 'a'))
+        self.assertIsNone(ansible_inventory.load_cache(self.path, 60, 'b'))
+
+    def test_missing_or_corrupt_cache(self):
+        """Verify unreadable caches are ignored."""
+        self.assertIsNone(ansible_inventory.load_cache(self.path, 60))
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as cache_file:
+            cache_file.write('{not json')
+        self.assertIsNone(ansible_inventory.load_cache(self.path, 60))
+
+    def run_script(self, *argv):
+        """Run craton-inventory and return its exit code and output."""
+        with mock.patch('sys.stdout', new=six.StringIO()) as stdout:
+            code = inventory_shell.main(
+                ['--cache-path', self.path] + list(argv))
+        return code, stdout.getvalue()
+
+    @mock.patch('cratonclient.shell.inventory.fetch_inventory')
+    def test_script_uses_cache(self, mock_fetch):
+        """Verify --list fetches once and then answers from the cache."""
+        mock_fetch.return_value = {
+            '_meta': {'hostvars': {'h1': {'ansible_host': '10.0.0.1'}}},
+        }
+
+        code, output = self.run_script('--list')
+        self.assertEqual(0, code)
+        self.assertEqual(mock_fetch.return_value, json.loads(output))
+
+        code, output = self.run_script('--host', 'h1')
+        self.assertEqual({'ansible_host': '10.0.0.1'}, json.loads(output))
+        self.assertEqual(1, mock_fetch.call_count)
+
+        self.run_script('--list', '--refresh')
+        self.assertEqual(2, mock_fetch.call_count)
+
+    @mock.patch('cratonclient.shell.inventory.fetch_inventory')
+    def test_script_cache_is_per_deployment(self, mock_fetch):
+        """Verify another endpoint, project or user fetches its own."""
+        mock_fetch.side_effect = lambda args: {
+            '_meta': {'hostvars': {}}, 'url': args.craton_url}
+
+        self.run_script('--list', '--craton-url', 'http://one/v1')
+        for argv in (['--craton-url', 'http://two/v1'],
+                     ['--craton-url', 'http://one/v1',
+                      '--craton-project-id', '2'],
+                     ['--craton-url', 'http://one/v1',
+                      '--os-username', 'other']):
+            code, output = self.run_script('--list', *argv)
+            self.assertEqual(0, code)
+            self.assertEqual(argv[1], json.loads(output)['url'])
+        self.assertEqual(4, mock_fetch.call_count)
+
+    @mock.patch('cratonclient.shell.inventory.fetch_inventory')
+    def test_script_reports_errors(self, mock_fetch):
+        """Verify failures exit non-zero with a message on stderr."""
+        mock_fetch.side_effect = ValueError('boom')
+
+        with mock.patch('sys.stderr', new=six.StringIO()) as stderr:
+            code, output = self.run_script('--list')
+
+        self.assertEqual(1, code)
+        self.assertEqual('', output)
+        self.assertIn('boom', stderr.getvalue())
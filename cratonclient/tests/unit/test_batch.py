@@ -0,0 +1,173 @@
+#   Licensed under the Apache License, Version 2.0 (the "License"); you may
+#   not use this file except in compliance with the License. You may obtain
+#   a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#   WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#   License for the specific language governing permissions and limitations
+#   under the License.
+
+"""Tests for `cratonclient.shell.batch` module."""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import fixtures
+import mock
+import six
+
+from cratonclient import exceptions as exc
+from cratonclient.shell import batch
+from cratonclient.tests import base
+
+
+def echo(cc, args):
+    """Print the argument of a fake command."""
+    if args.delay:
+        time.sleep(args.delay)
+    if args.fail:
+        raise Exception('failed ' + args.value)
+    print(args.value)
+
+
+def parse_command(argv):
+    """Parse the arguments of the fake echo command."""
+    if argv[0] == 'bad':
+        raise SystemExit(2)
+    return argparse.Namespace(func=echo, value=argv[1],
+                              delay=float(argv[2]) if len(argv) > 2 else 0,
+                              fail=argv[0] == 'fail')
+
+
+class TestReadCommands(base.TestCase):
+    """Tests for reading commands."""
+
+    def test_skips_blank_lines_and_comments(self):
+        """Verify blank lines and comments are skipped."""
+        stream = six.StringIO('host-list -r 1\n\n  # note\n  cell-list\n')
+        self.assertEqual([(1, 'host-list -r 1'), (4, 'cell-list')],
+                         list(batch.read_commands(stream)))
+
+
+class TestThreadOutput(base.TestCase):
+    """Tests for the per-thread output capture."""
+
+    def test_captures_only_capturing_threads(self):
+        """Verify writes of other threads go to the stream."""
+        stream = six.StringIO()
+        output = batch.ThreadOutput(stream)
+        captured = []
+
+        def write():
+            output.capture()
+            output.write('captured')
+            captured.append(output.release())
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        thread.join()
+        output.write('direct')
+        self.assertEqual(['captured'], captured)
+        self.assertEqual('direct', stream.getvalue())
+        self.assertIsNone(output.release())
+
+
+class TestRunBatch(base.TestCase):
+    """Tests for running a batch."""
+
+    def setUp(self):
+        """Create a fake shell."""
+        super(TestRunBatch, self).setUp()
+        self.craton_shell = mock.Mock()
+        self.craton_shell.parse_command.side_effect = parse_command
+        self.stdout = self.useFixture(fixtures.MonkeyPatch(
+            'sys.stdout', six.StringIO())).new_value
+
+    def run_batch(self, text, **kwargs):
+        """Run a batch of lines and return its results."""
+        return list(batch.run_batch(self.craton_shell, six.StringIO(text),
+                                    **kwargs))
+
+    def test_runs_lines_in_order(self):
+        """Verify lines are run one after another by default."""
+        results = self.run_batch('echo a\n\necho b\n')
+        self.assertEqual([(1, 'echo a', 0, None, None),
+                          (3, 'echo b', 0, None, None)], results)
+        self.assertEqual('a\nb\n', self.stdout.getvalue())
+
+    def test_reports_failures(self):
+        """Verify failing and invalid lines get their status."""
+        results = self.run_batch(
+            'fail a\nbad\necho "b\nshell\ndaemon\necho c\n')
+        self.assertEqual([1, 2, 2, 2, 2, 0],
+                         [result.status for result in results])
+        self.assertEqual('failed a', str(results[0].error))
+        self.assertEqual('shell cannot be run in a batch',
+                         str(results[3].error))
+        self.assertEqual('daemon cannot be run in a batch',
+                         str(results[4].error))
+
+    def test_stop_on_error(self):
+        """Verify no line starts after a failure."""
+        results = self.run_batch('echo a\nfail b\necho c\n',
+                                 stop_on_error=True)
+        self.assertEqual([0, 1], [result.status for result in results])
+        self.assertEqual('a\n', self.stdout.getvalue())
+
+    def test_concurrent_output_is_kept_in_order(self):
+        """Verify concurrent lines' output is captured per line."""
+        results = self.run_batch('echo a 0.05\necho b\nfail c\necho d\n',
+                                 max_workers=4)
+        self.assertEqual(['a\n', 'b\n', '', 'd\n'],
+                         [result.output for result in results])
+        self.assertEqual([0, 0, 1, 0], [result.status for result in results])
+        self.assertEqual('', self.stdout.getvalue())
+        self.assertIs(self.stdout, sys.stdout)
+
+
+class TestBatchCommand(base.ShellTestCase):
+    """Tests for the craton batch command."""
+
+    def setUp(self):
+        """Write a batch file and fake the client."""
+        super(TestBatchCommand, self).setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'commands')
+        self.useFixture(fixtures.MockPatch('cratonclient.session.Session'))
+        self.client = self.useFixture(fixtures.MockPatch(
+            'cratonclient.v1.client.Client')).mock.return_value
+        self.useFixture(fixtures.MockPatch(
+            'cratonclient.common.cliutils.print_list'))
+
+    def write(self, text):
+        """Write the batch file."""
+        with open(self.path, 'w') as commands:
+            commands.write(text)
+
+    def test_batch_reuses_one_client(self):
+        """Verify every line is run with the same client."""
+        self.write('host-list -r 1\ncell-list -r 2\n')
+        _, stderr = self.shell('batch ' + self.path)
+        self.assertEqual([mock.call(1), mock.call(2)],
+                         self.client.inventory.call_args_list)
+        report = [json.loads(line) for line in stderr.splitlines()[:2]]
+        self.assertEqual([{'line': 1, 'command': 'host-list -r 1',
+                           'status': 0},
+                          {'line': 2, 'command': 'cell-list -r 2',
+                           'status': 0}], report)
+        self.assertIn('2 of 2 commands succeeded.', stderr)
+
+    def test_batch_fails_if_a_line_fails(self):
+        """Verify a failing line fails the batch."""
+        self.write('host-list -r 1\nhost-list -r 2\n')
+        self.client.inventory.side_effect = [mock.Mock(), Exception('boom')]
+        self.assertRaises(exc.CommandError, self.shell,
+                          'batch --max-workers 2 ' + self.path)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.cache` module."""
+import datetime
+
+import mock
+
+from cratonclient import cache
+from cratonclient import session
+from cratonclient.tests import base
+
+URL = 'http://example.com/v1/hosts'
+
+
+def make_response(status_code=200, headers=None, body=b'[]'):
+    """Create a fake response."""
+    response = mock.Mock(status_code=status_code,
+                         headers=headers or {},
+                         content=body,
+                         elapsed=datetime.timedelta(seconds=0.1))
+    response.request.body = None
+    return response
+
+
+class TestConditionalCache(base.TestCase):
+    """Unit tests for the ConditionalCache."""
+
+    def setUp(self):
+        """Create an empty cache."""
+        super(TestConditionalCache, self).setUp()
+        self.cache = cache.ConditionalCache(max_entries=2)
+
+    def test_key_ignores_parameter_order(self):
+        """Verify parameters are part of the key regardless of order."""
+        self.assertEqual(
+            cache.ConditionalCache.key(URL, {'limit': 1, 'cell_id': 2}),
+            cache.ConditionalCache.key(URL, {'cell_id': 2, 'limit': 1}))
+        self.assertNotEqual(URL, cache.ConditionalCache.key(URL, {'a': 1}))
+        self.assertEqual(URL, cache.ConditionalCache.key(URL, {}))
+
+    def test_stores_responses_with_validators(self):
+        """Verify only GET responses carrying validators are stored."""
+        self.cache.resolve('GET', URL, {}, make_response())
+        self.cache.resolve('PUT', URL, {}, make_response(
+            headers={'ETag': '"1"'}))
+        self.assertEqual(0, len(self.cache))
+
+        self.cache.resolve('GET', URL, {}, make_response(
+            headers={'ETag': '"1"'}))
+        self.assertEqual(1, len(self.cache))
+
+    def test_prepare_adds_validators(self):
+        """Verify a cached request is sent with conditional headers."""
+        self.cache.resolve('GET', URL, {'params': {'limit': 1}}, make_response(
+            headers={'ETag': '"1"', 'Last-Modified': 'yesterday'}))
+
+        kwargs = {'params': {'limit': 1}, 'headers': {}}
+        self.cache.prepare('GET', URL, kwargs)
+        self.assertEqual({'If-None-Match': '"1"',
+                          'If-Modified-Since': 'yesterday'},
+                         kwargs['headers'])
+
+        kwargs = {'params': {'limit': 2}, 'headers': {}}
+        self.cache.prepare('GET', URL, kwargs)
+        self.assertEqual({}, kwargs['headers'])
+
+    def test_not_modified_returns_cached_copy(self):
+        """Verify a 304 is replaced by a copy of the cached response."""
+        cached = make_response(headers={'ETag': '"1"'})
+        self.cache.resolve('GET', URL, {}, cached)
+
+        response = self.cache.resolve('GET', URL, {}, make_response(304))
+
+        self.assertIsNot(cached, response)
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.from_cache)
+
+    def test_evicts_least_recently_used(self):
+        """Verify we keep at most max_entries responses."""
+        for name in ('a', 'b', 'c'):
+            self.cache.resolve('GET', URL + name, {},
+                               make_response(headers={'ETag': name}))
+
+        self.assertEqual(2, len(self.cache))
+        kwargs = {'headers': {}}
+        self.cache.prepare('GET', URL + 'a', kwargs)
+        self.assertEqual({}, kwargs['headers'])
+
+
+class TestSessionConditionalRequests(base.TestCase):
+    """Verify a Session revalidates responses with its cache."""
+
+    def test_revalidates_with_cache(self):
+        """Verify the second GET is conditional and served from cache."""
+        first = make_response(headers={'ETag': '"1"'}, body=b'[{"id": 1}]')
+        transport = mock.Mock()
+        transport.request.side_effect = [first, make_response(304)]
+        craton_session = session.Session(
+            session=transport, conditional_cache=cache.ConditionalCache())
+
+        craton_session.get(URL, params={'limit': 1})
+        response = craton_session.get(URL, params={'limit': 1})
+
+        _, kwargs = transport.request.call_args
+        self.assertEqual('"1"', kwargs['headers']['If-None-Match'])
+        self.assertEqual(b'[{"id": 1}]', response.content)
+        self.assertEqual(304, response.request_event.status_code)
+
+    def test_revalidates_with_cache_of_request(self):
+        """Verify a cache passed to one request is used for it alone."""
+        first = make_response(headers={'ETag': '"1"'}, body=b'[{"id": 1}]')
+        transport = mock.Mock()
+        transport.request.side_effect = [first, make_response(304)]
+        craton_session = session.Session(session=transport)
+        conditional_cache = cache.ConditionalCache()
+
+        craton_session.get(URL, conditional_cache=conditional_cache)
+        response = craton_session.get(URL,
+                                      conditional_cache=conditional_cache)
+
+        _, kwargs = transport.request.call_args
+        self.assertEqual('"1"', kwargs['headers']['If-None-Match'])
+        self.assertNotIn('conditional_cache', kwargs)
+        self.assertEqual(b'[{"id": 1}]', response.content)
+        self.assertIsNone(craton_session.conditional_cache)
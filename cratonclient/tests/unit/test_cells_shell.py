@@ -78,6 +78,17 @@ class TestCellsShell(base.ShellTestCase):
                           self.shell,
                           'cell-list -r 1 --limit -1')
 
+    @mock.patch('cratonclient.v1.cells.CellManager.list')
+    @mock.patch('cratonclient.common.cliutils.print_watch')
+    def test_cell_list_watch_success(self, mock_print_watch, mock_list):
+        """Verify --watch polls the cells instead of listing them once."""
+        self.shell('cell-list -r 1 --limit 2 --watch --watch-interval 5')
+        self.assertFalse(mock_list.called)
+        mock_print_watch.assert_called_once_with(
+            mock.ANY, mock.ANY, interval=5.0, limit=2)
+        self.assertIsInstance(mock_print_watch.call_args[0][0],
+                              cells.CellManager)
+
     @mock.patch('cratonclient.v1.cells.CellManager.list')
     def test_cell_list_detail_success(self, mock_list):
         """Verify --detail argument successfully pass detail to Client."""
@@ -92,7 +103,10 @@ class TestCellsShell(base.ShellTestCase):
         mock_list.assert_called_once_with()
         mock_printlist.assert_called_once_with(mock.ANY,
                                                list({'id': 'ID',
-                                                     'name': 'Name'}))
+                                                     'name': 'Name'}),
+                                               sortby_index=None,
+                                               output_format='table',
+                                               chunk_size=None)
 
     @mock.patch('cratonclient.v1.cells.CellManager.list')
     def test_cell_list_detail_and_fields_specified(self, mock_list):
@@ -247,7 +261,7 @@ class TestCellsShell(base.ShellTestCase):
                                             'http://127.0.0.1/')
         client.inventory = mock.Mock(name='inventory')
         client.inventory.return_value = inventory
-        test_args = Namespace(id=1, region=1)
+        test_args = Namespace(id=1, region=1, output_format='table')
         cells_shell.do_cell_show(client, test_args)
         mock_get.assert_called_once_with(vars(test_args)['id'])
 
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.circuitbreaker` module."""
+import mock
+from requests import exceptions as requests_exc
+
+from cratonclient import circuitbreaker
+from cratonclient import exceptions as exc
+from cratonclient import session
+from cratonclient.tests import base
+
+
+class TestCircuitBreaker(base.TestCase):
+    """Tests for the CircuitBreaker class."""
+
+    def setUp(self):
+        """Create a breaker with a fake clock."""
+        super(TestCircuitBreaker, self).setUp()
+        self.now = 0.0
+        self.breaker = circuitbreaker.CircuitBreaker(
+            failure_ratio=0.5, minimum_requests=4, window_size=4,
+            reset_timeout=10, clock=lambda: self.now)
+
+    def fail(self, count, exception=exc.Timeout):
+        """Record a number of failed requests."""
+        for _ in range(count):
+            self.breaker.before_request()
+            self.breaker.record(exception())
+
+    def succeed(self, count):
+        """Record a number of successful requests."""
+        for _ in range(count):
+            self.breaker.before_request()
+            self.breaker.record()
+
+    def test_opens_once_failure_ratio_is_reached(self):
+        """Verify the breaker opens after too many failures."""
+        self.succeed(2)
+        self.fail(1)
+        self.assertEqual(circuitbreaker.CLOSED, self.breaker.state)
+
+        self.fail(1)
+
+        self.assertEqual(circuitbreaker.OPEN, self.breaker.state)
+        error = self.assertRaises(exc.CircuitOpen,
+                                  self.breaker.before_request)
+        self.assertEqual(10, error.retry_after)
+
+    def test_requires_minimum_requests(self):
+        """Verify a few failures do not open the breaker."""
+        self.fail(3)
+
+        self.assertEqual(circuitbreaker.CLOSED, self.breaker.state)
+
+    def test_client_errors_are_not_failures(self):
+        """Verify 4xx responses do not count as failures."""
+        self.fail(4, exception=exc.NotFound)
+
+        self.assertEqual(circuitbreaker.CLOSED, self.breaker.state)
+
+    def test_half_opens_and_closes_after_successful_probe(self):
+        """Verify a successful probe closes the breaker."""
+        self.fail(4)
+        self.now = 10
+
+        self.assertEqual(circuitbreaker.HALF_OPEN, self.breaker.state)
+        self.breaker.before_request()
+        self.assertRaises(exc.CircuitOpen, self.breaker.before_request)
+        self.breaker.record()
+
+        self.assertEqual(circuitbreaker.CLOSED, self.breaker.state)
+
+    def test_failed_probe_reopens(self):
+        """Verify a failed probe opens the breaker again."""
+        self.fail(4)
+        self.now = 10
+
+        self.fail(1, exception=exc.InternalServerError)
+
+        self.assertEqual(circuitbreaker.OPEN, self.breaker.state)
+
+    def test_unrelated_exceptions_release_probes(self):
+        """Verify probes are released for exceptions we do not count."""
+        self.fail(4)
+        self.now = 10
+
+        self.fail(1, exception=exc.RateLimited)
+
+        self.assertEqual(circuitbreaker.HALF_OPEN, self.breaker.state)
+        self.breaker.before_request()
+
+
+class TestSessionCircuitBreaker(base.TestCase):
+    """Tests for the Session integration of the circuit breaker."""
+
+    def test_session_fails_fast_when_open(self):
+        """Verify the session does not send requests once open."""
+        transport = mock.Mock()
+        transport.request.side_effect = requests_exc.ConnectTimeout()
+        breaker = circuitbreaker.CircuitBreaker(minimum_requests=2,
+                                                window_size=2)
+        craton_session = session.Session(session=transport,
+                                         circuit_breaker=breaker)
+
+        for _ in range(2):
+            self.assertRaises(exc.Timeout, craton_session.get,
+                              'http://craton/v1/hosts')
+        self.assertRaises(exc.CircuitOpen, craton_session.get,
+                          'http://craton/v1/hosts')
+        self.assertEqual(2, transport.request.call_count)
+
+    def test_keystoneauth_session_opens_on_server_errors(self):
+        """Verify 5xx responses through keystoneauth1 open the breaker."""
+        breaker = circuitbreaker.CircuitBreaker(minimum_requests=2,
+                                                window_size=2)
+        craton_session = self.keystoneauth_session(circuit_breaker=breaker)
+        self.transport.request.return_value = base.http_response(503)
+
+        for _ in range(2):
+            self.assertRaises(exc.HTTPServerError, craton_session.get,
+                              'http://craton/v1/hosts')
+        self.assertEqual(circuitbreaker.OPEN, breaker.state)
+        self.assertRaises(exc.CircuitOpen, craton_session.get,
+                          'http://craton/v1/hosts')
+
+    def test_keystoneauth_session_opens_on_connection_failures(self):
+        """Verify keystoneauth1 connection failures open the breaker."""
+        breaker = circuitbreaker.CircuitBreaker(minimum_requests=2,
+                                                window_size=2)
+        craton_session = self.keystoneauth_session(circuit_breaker=breaker)
+        self.transport.request.side_effect = (
+            requests_exc.ConnectionError('refused'))
+
+        for _ in range(2):
+            self.assertRaises(exc.ConnectionFailed, craton_session.get,
+                              'http://craton/v1/hosts')
+        self.assertEqual(circuitbreaker.OPEN, breaker.state)
@@ -0,0 +1,35 @@
+#   Licensed under the Apache License, Version 2.0 (the "License"); you may
+#   not use this file except in compliance with the License. You may obtain
+#   a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#   WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#   License for the specific language governing permissions and limitations
+#   under the License.
+
+"""Tests for `cratonclient.v1.client` module."""
+import mock
+
+from cratonclient.tests import base
+from cratonclient.v1 import client
+
+
+class TestClient(base.TestCase):
+    """Tests for the v1 Client."""
+
+    def test_inventories_do_not_share_regions(self):
+        """Verify an inventory keeps its region after another is made."""
+        cc = client.Client(mock.Mock(), 'http://example.com')
+        first = cc.inventory(1)
+        cc.inventory(2)
+        self.assertEqual(1, first.hosts.region_id)
+        self.assertNotIn('region_id', cc._manager_kwargs)
+
+    def test_inventories_are_created_once(self):
+        """Verify every region's inventory is created once and shared."""
+        cc = client.Client(mock.Mock(), 'http://example.com')
+        self.assertIs(cc.inventory(1), cc.inventory(1))
+        self.assertIsNot(cc.inventory(1), cc.inventory(2))
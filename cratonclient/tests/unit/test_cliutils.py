@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.common.cliutils` module."""
+import json
+
+import mock
+import six
+
+from cratonclient.common import cliutils
+from cratonclient.tests import base
+
+
+class Row(object):
+    """A minimal object to print."""
+
+    def __init__(self, id, name):
+        """Set our attributes."""
+        self.id = id
+        self.name = name
+
+
+class TestSortItems(base.TestCase):
+    """Tests for client-side ordering with sort_items."""
+
+    def setUp(self):
+        """Create some unordered rows."""
+        super(TestSortItems, self).setUp()
+        self.rows = [Row(3, 'c'), Row(1, None), Row(4, 'a'), Row(2, 'b')]
+
+    def ids(self, rows):
+        """Return the IDs of rows."""
+        return [row.id for row in rows]
+
+    def test_top_k(self):
+        """Verify a limit keeps only the first rows in order."""
+        self.assertEqual([1, 2], self.ids(cliutils.sort_items(
+            iter(self.rows), 'id', limit=2)))
+        self.assertEqual([4, 3], self.ids(cliutils.sort_items(
+            iter(self.rows), 'id', reverse=True, limit=2)))
+
+    def test_full_sort_puts_missing_values_last(self):
+        """Verify sorting without a limit and with None values."""
+        self.assertEqual([4, 2, 3, 1], self.ids(cliutils.sort_items(
+            self.rows, 'name', limit=0)))
+
+    def test_streams_without_sort_key(self):
+        """Verify unsorted rows are passed through lazily."""
+        rows = iter(self.rows)
+        self.assertIs(rows, cliutils.sort_items(rows))
+        self.assertEqual([3], self.ids(cliutils.sort_items(rows, limit=1)))
+        self.assertEqual(1, next(rows).id)
+
+
+class TestListItems(base.TestCase):
+    """Tests for listing the objects of list commands."""
+
+    def setUp(self):
+        """Create a fake manager."""
+        super(TestListItems, self).setUp()
+        self.manager = mock.Mock()
+        self.manager.iterate.return_value = iter([Row(1, 'a'), Row(2, 'b')])
+        self.manager.list.return_value = [Row(2, 'b'), Row(1, 'a')]
+
+    def test_streamed_formats_iterate(self):
+        """Verify unsorted rows are fetched a page at a time."""
+        objs = cliutils.list_items(self.manager, output_format='jsonl',
+                                   limit=1, cell_id=4)
+
+        self.assertEqual([1], [row.id for row in objs])
+        self.manager.iterate.assert_called_once_with(page_size=1, cell_id=4)
+        self.assertFalse(self.manager.list.called)
+
+    def test_chunked_tables_iterate(self):
+        """Verify chunked tables are fetched a page at a time."""
+        cliutils.list_items(self.manager, chunk_size=10)
+
+        self.manager.iterate.assert_called_once_with(page_size=100)
+
+    def test_tables_and_sorted_rows_list(self):
+        """Verify whole tables and sorted rows are listed at once."""
+        cliutils.list_items(self.manager)
+        objs = cliutils.list_items(self.manager, output_format='jsonl',
+                                   sort_key='id', sort_dir='asc')
+
+        self.assertEqual([1, 2], [row.id for row in objs])
+        self.assertEqual([mock.call(), mock.call(sort_key='id',
+                                                 sort_dir='asc')],
+                         self.manager.list.call_args_list)
+        self.assertFalse(self.manager.iterate.called)
+
+
+class TestPrintList(base.TestCase):
+    """Tests for print_list output formats."""
+
+    def print_list(self, objs, **kwargs):
+        """Return what print_list writes to stdout."""
+        with mock.patch('sys.stdout', new=six.StringIO()) as stdout:
+            cliutils.print_list(objs, ['id', 'name'], **kwargs)
+        return stdout.getvalue()
+
+    def rows(self):
+        """Return a generator of rows."""
+        return (Row(i, 'host-{0}'.format(i)) for i in (2, 1))
+
+    def test_json(self):
+        """Verify json output is one array of objects."""
+        output = self.print_list(self.rows(), output_format='json')
+
+        self.assertEqual([{'id': 2, 'name': 'host-2'},
+                          {'id': 1, 'name': 'host-1'}], json.loads(output))
+        self.assertEqual([], json.loads(self.print_list(
+            [], output_format='json')))
+
+    def test_jsonl(self):
+        """Verify jsonl output is one object per line."""
+        output = self.print_list(self.rows(), output_format='jsonl')
+
+        self.assertEqual([{'id': 2, 'name': 'host-2'},
+                          {'id': 1, 'name': 'host-1'}],
+                         [json.loads(line) for line in output.splitlines()])
+
+    def test_csv_and_value(self):
+        """Verify csv has a header and value has none."""
+        self.assertEqual('id,name\r\n2,host-2\r\n1,host-1\r\n',
+                         self.print_list(self.rows(), output_format='csv'))
+        self.assertEqual('2 host-2\n1 host-1\n',
+                         self.print_list(self.rows(), output_format='value'))
+
+    def test_table_chunks(self):
+        """Verify chunked tables are each sorted and complete."""
+        output = self.print_list(self.rows(), chunk_size=1)
+
+        self.assertEqual(2, output.count('| id | name   |'))
+        self.assertLess(output.index('host-2'), output.index('host-1'))
+
+    def test_streams_rows(self):
+        """Verify rows are written before the next object is produced."""
+        outputs = []
+
+        def rows():
+            yield Row(1, 'a')
+            outputs.append(stdout.getvalue())
+            yield Row(2, 'b')
+
+        with mock.patch('sys.stdout', new=six.StringIO()) as stdout:
+            cliutils.print_list(rows(), ['id', 'name'],
+                                output_format='jsonl')
+
+        self.assertEqual(['{"id": 1, "name": "a"}\n'], outputs)
+
+    def test_unknown_format(self):
+        """Verify unknown formats are refused."""
+        self.assertRaises(ValueError, self.print_list, [],
+                          output_format='yaml')
+
+
+class TestPrintDict(base.TestCase):
+    """Tests for print_dict output formats."""
+
+    def print_dict(self, **kwargs):
+        """Return what print_dict writes to stdout."""
+        with mock.patch('sys.stdout', new=six.StringIO()) as stdout:
+            cliutils.print_dict({'name': 'h1', 'id': 1}, **kwargs)
+        return stdout.getvalue()
+
+    def test_formats(self):
+        """Verify each machine-readable format."""
+        self.assertEqual({'name': 'h1', 'id': 1},
+                         json.loads(self.print_dict(output_format='json')))
+        self.assertEqual('{"id": 1, "name": "h1"}\n',
+                         self.print_dict(output_format='jsonl'))
+        self.assertEqual('Property,Value\r\nid,1\r\nname,h1\r\n',
+                         self.print_dict(output_format='csv'))
+        self.assertEqual('1\nh1\n', self.print_dict(output_format='value'))
@@ -0,0 +1,74 @@
+#   Licensed under the Apache License, Version 2.0 (the "License"); you may
+#   not use this file except in compliance with the License. You may obtain
+#   a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#   WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#   License for the specific language governing permissions and limitations
+#   under the License.
+
+"""Tests for the command index of `cratonclient.shell.v1.shell`."""
+import json
+import os
+
+import fixtures
+import mock
+
+from cratonclient.shell.v1 import shell
+from cratonclient.tests import base
+
+
+class TestCommandIndex(base.TestCase):
+    """Tests for building and caching the command index."""
+
+    def setUp(self):
+        """Create a temporary cache path."""
+        super(TestCommandIndex, self).setUp()
+        self.directory = self.useFixture(fixtures.TempDir()).path
+        self.path = os.path.join(self.directory, 'craton', 'commands.json')
+
+    def test_build_command_index(self):
+        """Verify commands are mapped to the module defining them."""
+        index = shell.build_command_index()
+        self.assertEqual('cratonclient.shell.v1.hosts_shell',
+                         index['host-list'])
+        self.assertEqual('cratonclient.shell.v1.regions_shell',
+                         index['region-show'])
+        self.assertEqual('cratonclient.shell.v1.export_shell',
+                         index['export'])
+
+    def test_load_command_index_saves_cache(self):
+        """Verify the index is built once and then read from the cache."""
+        index = shell.load_command_index(self.path)
+        self.assertTrue(os.path.exists(self.path))
+        with mock.patch.object(shell, 'build_command_index') as build:
+            self.assertEqual(index, shell.load_command_index(self.path))
+        self.assertFalse(build.called)
+
+    def test_load_command_index_rebuilds_stale_cache(self):
+        """Verify a cache written for other modules is ignored."""
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as cache_file:
+            json.dump({'signature': ['0.0.0'],
+                       'commands': {'host-list': 'nowhere'}}, cache_file)
+        index = shell.load_command_index(self.path)
+        self.assertEqual('cratonclient.shell.v1.hosts_shell',
+                         index['host-list'])
+
+    def test_load_command_index_ignores_corrupt_cache(self):
+        """Verify an unreadable cache is rebuilt."""
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'w') as cache_file:
+            cache_file.write('{not json')
+        index = shell.load_command_index(self.path)
+        self.assertIn('host-list', index)
+
+    def test_load_command_index_without_writable_cache(self):
+        """Verify failing to save the cache is not an error."""
+        with mock.patch('tempfile.mkstemp', side_effect=OSError):
+            index = shell.load_command_index(self.path)
+        self.assertIn('host-list', index)
+        self.assertFalse(os.path.exists(self.path))
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.completion` module."""
+import os
+
+import fixtures
+import mock
+
+from cratonclient import completion
+from cratonclient.tests import base
+from cratonclient.v1 import hosts
+from cratonclient.v1 import regions
+
+
+class TestCompletionCache(base.TestCase):
+    """Tests for the CompletionCache."""
+
+    def setUp(self):
+        """Create a cache in a temporary directory."""
+        super(TestCompletionCache, self).setUp()
+        self.directory = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'completion')
+        self.cache = completion.CompletionCache(self.directory)
+        self.manager = mock.Mock(key='host')
+
+    def host(self, host_id, name=None):
+        """Return a host resource."""
+        info = {'id': host_id}
+        if name is not None:
+            info['name'] = name
+        return hosts.Host(self.manager, info, loaded=True)
+
+    def test_add_writes_ids_and_human_ids(self):
+        """Verify each region's resources are written to their own file."""
+        self.cache.add('host', 1, [self.host(12, 'Web 01'), self.host(13)])
+        self.cache.add('host', 2, [self.host(20, 'db')])
+        self.cache.flush()
+
+        with open(os.path.join(self.directory, 'host-1')) as f:
+            self.assertEqual('12 web-01\n13 \n', f.read())
+        self.assertEqual({'12': 'web-01', '13': ''},
+                         self.cache.entries('host', 1))
+        self.assertEqual({'20': 'db'}, self.cache.entries('host', 2))
+
+    def test_add_without_region(self):
+        """Verify resources without a region are written to one file."""
+        region = regions.Region(mock.Mock(key='region'),
+                                {'id': 1, 'name': 'ORD'}, loaded=True)
+        self.cache.add('region', None, [region])
+        self.cache.flush()
+        self.assertTrue(os.path.exists(os.path.join(self.directory,
+                                                    'region')))
+        self.assertEqual({'1': 'ord'}, self.cache.entries('region'))
+
+    def test_add_replace(self):
+        """Verify replacing forgets resources that were not listed."""
+        self.cache.add('host', 1, [self.host(12, 'a'), self.host(13, 'b')])
+        self.cache.add('host', 1, [self.host(14, 'c')])
+        self.assertEqual({'12': 'a', '13': 'b', '14': 'c'},
+                         self.cache.entries('host', 1))
+        self.cache.add('host', 1, [self.host(13, 'd')], replace=True)
+        self.assertEqual({'13': 'd'}, self.cache.entries('host', 1))
+
+    def test_add_unchanged_does_not_write(self):
+        """Verify the file is left alone when nothing changed."""
+        self.cache.add('host', 1, [self.host(12, 'a')])
+        self.cache.flush()
+        with mock.patch.object(self.cache, '_write') as write:
+            self.cache.add('host', 1, [self.host(12, 'a')], replace=True)
+            self.cache.flush()
+        self.assertFalse(write.called)
+
+    def test_remove(self):
+        """Verify deleted resources are forgotten."""
+        self.cache.add('host', 1, [self.host(12, 'a'), self.host(13, 'b')])
+        self.cache.flush()
+        self.cache.remove('host', 1, 12)
+        self.assertEqual({'13': 'b'}, self.cache.entries('host', 1))
+        self.cache.flush()
+        self.assertEqual({'13': 'b'}, self.cache.entries('host', 1))
+
+    def test_changes_are_written_once(self):
+        """Verify changes are buffered until flushed, one write per file."""
+        self.cache.add('host', 1, [self.host(12, 'a')])
+        self.cache.add('host', 1, [self.host(13, 'b')])
+        self.cache.remove('host', 1, 12)
+        self.assertFalse(os.path.exists(os.path.join(self.directory,
+                                                     'host-1')))
+        self.assertEqual({'13': 'b'}, self.cache.entries('host', 1))
+
+        with mock.patch.object(self.cache, '_write',
+                               wraps=self.cache._write) as write:
+            self.cache.flush()
+            self.cache.flush()
+        write.assert_called_once_with('host', 1, {'13': 'b'})
+        with open(os.path.join(self.directory, 'host-1')) as f:
+            self.assertEqual('13 b\n', f.read())
+
+    def test_missing_cache(self):
+        """Verify nothing is remembered before the first write."""
+        self.assertEqual({}, self.cache.entries('host', 1))
+
+    def test_unwritable_cache_is_ignored(self):
+        """Verify failing to write the cache is not an error."""
+        with mock.patch('tempfile.mkstemp', side_effect=OSError):
+            self.cache.add('host', 1, [self.host(12, 'a')])
+            self.cache.flush()
+        self.assertEqual({}, self.cache.entries('host', 1))
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.concurrency` module."""
+import threading
+
+import mock
+from requests import exceptions as requests_exc
+
+from cratonclient import concurrency
+from cratonclient import deadline
+from cratonclient import exceptions as exc
+from cratonclient.tests import base
+
+
+class TestMapConcurrently(base.TestCase):
+    """Tests for map_concurrently."""
+
+    def test_returns_outcomes_in_order(self):
+        """Verify results and exceptions are reported per item."""
+        def double(item):
+            if item == 2:
+                raise exc.NotFound()
+            return item * 2
+
+        outcomes = concurrency.map_concurrently(double, [1, 2, 3])
+
+        self.assertEqual([1, 2, 3], [o.item for o in outcomes])
+        self.assertEqual([2, None, 6], [o.result for o in outcomes])
+        self.assertIsInstance(outcomes[1].exception, exc.NotFound)
+
+    def test_empty_items(self):
+        """Verify no pool is needed for no items."""
+        self.assertEqual([], concurrency.map_concurrently(None, []))
+
+    def test_propagates_deadline_to_workers(self):
+        """Verify workers see the caller's deadline."""
+        with deadline.Deadline(10) as active:
+            outcomes = concurrency.map_concurrently(
+                lambda item: deadline.current(), [1, 2])
+
+        self.assertEqual([active, active], [o.result for o in outcomes])
+
+    def test_cancels_work_after_deadline(self):
+        """Verify queued work is cancelled once the deadline expires."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        with deadline.Deadline(0.05):
+            outcomes = concurrency.map_concurrently(
+                lambda item: release.wait(5), [1, 2], max_workers=1)
+
+        for outcome in outcomes:
+            self.assertIsInstance(outcome.exception, exc.DeadlineExceeded)
+
+
+class TestImapConcurrently(base.TestCase):
+    """Tests for imap_concurrently."""
+
+    def test_yields_outcomes_in_order(self):
+        """Verify results and exceptions are reported per item, in order."""
+        def double(item):
+            if item == 2:
+                raise exc.NotFound()
+            return item * 2
+
+        outcomes = list(concurrency.imap_concurrently(double, [1, 2, 3]))
+
+        self.assertEqual([1, 2, 3], [o.item for o in outcomes])
+        self.assertEqual([2, None, 6], [o.result for o in outcomes])
+        self.assertIsInstance(outcomes[1].exception, exc.NotFound)
+
+    def test_consumes_items_lazily(self):
+        """Verify only a bounded window of items is read ahead."""
+        consumed = []
+
+        def items():
+            for item in range(100):
+                consumed.append(item)
+                yield item
+
+        outcomes = concurrency.imap_concurrently(lambda item: item, items(),
+                                                 max_workers=2)
+        self.assertEqual(0, next(outcomes).result)
+        self.assertEqual(4, len(consumed))
+        self.assertEqual(list(range(1, 100)),
+                         [outcome.result for outcome in outcomes])
+
+    def test_deadline_exceeded(self):
+        """Verify work still running at the deadline is reported."""
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        with deadline.Deadline(0.05):
+            outcomes = list(concurrency.imap_concurrently(
+                lambda item: release.wait(5), [1], max_workers=1))
+
+        self.assertIsInstance(outcomes[0].exception, exc.DeadlineExceeded)
+
+
+class TestAdaptiveLimiter(base.TestCase):
+    """Tests for the AdaptiveLimiter class."""
+
+    def setUp(self):
+        """Create a limiter with a fake clock."""
+        super(TestAdaptiveLimiter, self).setUp()
+        self.now = 0.0
+        self.limiter = concurrency.AdaptiveLimiter(
+            initial=4, minimum=1, maximum=6, latency_threshold=1.0,
+            clock=lambda: self.now)
+
+    def respond(self, status_code=200, latency=0.1):
+        """Feed a fake response to the limiter."""
+        self.limiter.observe_response(mock.Mock(
+            status_code=status_code, timings={'total': latency}))
+
+    def test_grows_additively(self):
+        """Verify about a round of healthy responses adds one slot."""
+        for _ in range(5):
+            self.respond()
+
+        self.assertEqual(5, self.limiter.limit)
+
+    def test_never_exceeds_maximum(self):
+        """Verify the limit is capped."""
+        for _ in range(100):
+            self.respond()
+
+        self.assertEqual(6, self.limiter.limit)
+
+    def test_backs_off_multiplicatively(self):
+        """Verify overload halves the limit once per interval."""
+        self.respond(status_code=429)
+        self.assertEqual(2, self.limiter.limit)
+
+        self.respond(status_code=503)
+        self.assertEqual(2, self.limiter.limit)
+
+        self.now = 2.0
+        self.respond(latency=5.0)
+        self.assertEqual(1, self.limiter.limit)
+
+    def test_backs_off_on_timeouts(self):
+        """Verify transport timeouts count as overload."""
+        self.limiter.observe_error(mock.Mock(response=None,
+                                             exception=exc.Timeout()))
+
+        self.assertEqual(2, self.limiter.limit)
+
+    def test_client_errors_are_ignored(self):
+        """Verify errors with a response are handled by observe_response."""
+        self.limiter.observe_error(mock.Mock(exception=exc.NotFound()))
+
+        self.assertEqual(4, self.limiter.limit)
+
+    def test_keystoneauth_session(self):
+        """Verify the limiter backs off for a keystoneauth1 session."""
+        session = self.keystoneauth_session()
+        self.limiter.install(session)
+        self.transport.request.return_value = base.http_response(503)
+
+        self.assertRaises(exc.HTTPServerError, session.get,
+                          'http://craton/v1/hosts')
+        self.assertEqual(2, self.limiter.limit)
+
+        self.now = 2.0
+        self.transport.request.return_value = None
+        self.transport.request.side_effect = (
+            requests_exc.ReadTimeout('slow'))
+        self.assertRaises(exc.Timeout, session.get, 'http://craton/v1/hosts')
+        self.assertEqual(1, self.limiter.limit)
+
+    def test_map_concurrently_respects_limit(self):
+        """Verify no more calls run at once than the limit allows."""
+        limiter = concurrency.AdaptiveLimiter(initial=2, maximum=2)
+        peak = []
+        lock = threading.Lock()
+
+        def work(item):
+            with lock:
+                peak.append(limiter.in_flight)
+            return item
+
+        outcomes = concurrency.map_concurrently(work, range(10),
+                                                limiter=limiter)
+
+        self.assertEqual(list(range(10)), [o.result for o in outcomes])
+        self.assertLessEqual(max(peak), 2)
+        self.assertEqual(0, limiter.in_flight)
@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.crud` module."""
+import mock
+
+from cratonclient import cache
+from cratonclient import concurrency
+from cratonclient import crud
+from cratonclient import exceptions as exc
+from cratonclient.tests import base
+
+
+class FakeResource(crud.Resource):
+    """A resource used for testing our CRUDClient."""
+
+    pass
+
+
+class FakeManager(crud.CRUDClient):
+    """A manager used for testing our CRUDClient."""
+
+    key = 'fake'
+    base_path = '/fakes'
+    resource_class = FakeResource
+
+
+class TestCRUDClient(base.TestCase):
+    """Test our generic CRUDClient."""
+
+    def setUp(self):
+        """Create a manager with a fake session."""
+        super(TestCRUDClient, self).setUp()
+        self.session = mock.Mock()
+        self.response = self.session.get.return_value
+        self.response.request_event = None
+        self.manager = FakeManager(self.session, 'http://example.com/v1/')
+
+    def test_list_passes_operation_name(self):
+        """Verify list tells the session which operation is running."""
+        self.response.json.return_value = [{'id': 1}, {'id': 2}]
+
+        fakes = self.manager.list()
+
+        self.session.get.assert_called_once_with(
+            'http://example.com/v1/fakes', params={}, operation='fake.list')
+        self.assertEqual([1, 2], [fake.id for fake in fakes])
+
+    def test_records_parse_timing(self):
+        """Verify we time JSON conversion and dispatch after-parse hooks."""
+        request_event = mock.Mock(timings={}, server_request_id='req-1')
+        self.response.request_event = request_event
+        self.response.json.return_value = {'id': 1}
+
+        fake = self.manager.get(fake_id=1)
+
+        self.assertEqual('req-1', fake.request_id)
+        self.assertIn('parse', request_event.timings)
+        self.assertIs(fake, request_event.resources)
+        self.session.dispatch_hook.assert_called_once_with('after-parse',
+                                                           request_event)
+
+
+class TestCRUDClientCompletionCache(base.TestCase):
+    """Test how our CRUDClient maintains a completion cache."""
+
+    def setUp(self):
+        """Create a manager whose session has a completion cache."""
+        super(TestCRUDClientCompletionCache, self).setUp()
+        self.session = mock.Mock()
+        self.session.get.return_value.request_event = None
+        self.session.get.return_value.json.return_value = [{'id': 1}]
+        self.completion_cache = self.session.completion_cache
+        self.manager = FakeManager(self.session, 'http://example.com/v1/')
+
+    def test_unfiltered_list_replaces_entries(self):
+        """Verify a listing without filters replaces what was cached."""
+        fakes = self.manager.list()
+        self.completion_cache.add.assert_called_once_with(
+            'fake', None, fakes, replace=True)
+
+    def test_filtered_list_adds_entries(self):
+        """Verify a filtered listing only adds to what was cached."""
+        fakes = self.manager.list(name='fake')
+        self.completion_cache.add.assert_called_once_with(
+            'fake', None, fakes, replace=False)
+
+    def test_get_adds_entry(self):
+        """Verify a retrieved item is cached."""
+        self.session.get.return_value.json.return_value = {'id': 1}
+        fake = self.manager.get(fake_id=1)
+        self.completion_cache.add.assert_called_once_with('fake', None,
+                                                          [fake])
+
+    def test_delete_removes_entry(self):
+        """Verify a deleted item is forgotten."""
+        self.session.delete.return_value.status_code = 204
+        self.manager.region_id = 3
+        self.assertTrue(self.manager.delete(fake_id=1))
+        self.completion_cache.remove.assert_called_once_with('fake', 3, 1)
+
+    def test_failed_delete_keeps_entry(self):
+        """Verify an item that was not deleted is not forgotten."""
+        self.session.delete.return_value.status_code = 404
+        self.assertFalse(self.manager.delete(fake_id=1))
+        self.assertFalse(self.completion_cache.remove.called)
+
+
+class TestCRUDClientIterate(base.TestCase):
+    """Test listing a CRUDClient's items page by page."""
+
+    def setUp(self):
+        """Create a manager with a scripted listing."""
+        super(TestCRUDClientIterate, self).setUp()
+        self.manager = FakeManager(mock.Mock(), 'http://example.com/v1/')
+        self.manager.list = mock.Mock()
+
+    def pages(self, *pages):
+        """Make each listing return the next page of IDs."""
+        self.manager.list.side_effect = [
+            [FakeResource(self.manager, {'id': item_id}, loaded=True)
+             for item_id in page] for page in pages]
+
+    def test_follows_markers(self):
+        """Verify each page starts after the last item of the previous."""
+        self.pages([1, 2], [3, 4], [5])
+
+        ids = [fake.id for fake in self.manager.iterate(page_size=2,
+                                                        cell_id=3)]
+
+        self.assertEqual([1, 2, 3, 4, 5], ids)
+        self.assertEqual([
+            mock.call(cell_id=3, limit=2),
+            mock.call(cell_id=3, limit=2, marker=2),
+            mock.call(cell_id=3, limit=2, marker=4),
+        ], self.manager.list.call_args_list)
+
+    def test_lists_at_once_when_marker_is_ignored(self):
+        """Verify no items are dropped when a page repeats."""
+        self.pages([1, 2], [1, 2], [1, 2, 3, 4, 5])
+
+        ids = [fake.id for fake in self.manager.iterate(page_size=2,
+                                                        cell_id=3)]
+
+        self.assertEqual([1, 2, 3, 4, 5], ids)
+        self.assertEqual(mock.call(cell_id=3),
+                         self.manager.list.call_args_list[-1])
+
+
+class TestCRUDClientGetMany(base.TestCase):
+    """Test retrieving many items by ID."""
+
+    def setUp(self):
+        """Create a manager with a fake session."""
+        super(TestCRUDClientGetMany, self).setUp()
+        self.session = mock.Mock()
+        self.manager = FakeManager(self.session, 'http://example.com/v1/')
+
+    def response_for(self, url, **kwargs):
+        """Return a fake response, or raise NotFound for fake 404."""
+        item_id = int(url.rsplit('/', 1)[1])
+        if item_id == 404:
+            raise exc.NotFound()
+        response = mock.Mock(request_event=None)
+        response.json.return_value = {'id': item_id}
+        return response
+
+    def test_concurrent_gets(self):
+        """Verify each ID is fetched once with per-ID errors."""
+        self.session.get.side_effect = self.response_for
+
+        outcomes = self.manager.get_many([3, 404, 1, 3], max_workers=2)
+
+        self.assertEqual([3, 404, 1], list(outcomes))
+        self.assertEqual(3, outcomes[3].result.id)
+        self.assertIsInstance(outcomes[404].exception, exc.NotFound)
+        self.assertEqual(3, self.session.get.call_count)
+
+    def test_limiter_bounds_concurrency(self):
+        """Verify a limiter's maximum is not capped by a default."""
+        limiter = concurrency.AdaptiveLimiter(initial=16, maximum=16)
+        with mock.patch.object(concurrency, 'map_concurrently',
+                               return_value=[]) as map_concurrently:
+            self.manager.get_many([1, 2], limiter=limiter)
+
+        _, kwargs = map_concurrently.call_args
+        self.assertIsNone(kwargs['max_workers'])
+        self.assertIs(limiter, kwargs['limiter'])
+
+    def test_server_side_id_filter(self):
+        """Verify managers with an id_filter list all IDs at once."""
+        self.manager.id_filter = 'ids'
+        response = self.session.get.return_value
+        response.request_event = None
+        response.json.return_value = [{'id': 1}, {'id': 3}]
+
+        outcomes = self.manager.get_many([1, 2, 3])
+
+        self.session.get.assert_called_once_with(
+            'http://example.com/v1/fakes', params={'ids': [1, 2, 3]},
+            operation='fake.list')
+        self.assertEqual([1, 3], [outcomes[i].result.id for i in (1, 3)])
+        self.assertIsInstance(outcomes[2].exception, exc.NotFound)
+
+    def test_no_ids(self):
+        """Verify no requests are made without IDs."""
+        self.assertEqual({}, self.manager.get_many([]))
+        self.assertFalse(self.session.get.called)
+
+
+class TestCRUDClientReconcile(base.TestCase):
+    """Test reconciling a manager's items with a desired state."""
+
+    def setUp(self):
+        """Create a manager whose listing holds three items."""
+        super(TestCRUDClientReconcile, self).setUp()
+        self.manager = FakeManager(mock.Mock(), 'http://example.com/v1/')
+        self.manager.natural_key = ('name',)
+        self.manager.list = mock.Mock(return_value=[
+            FakeResource(self.manager, info, loaded=True) for info in [
+                {'id': 1, 'name': 'a', 'note': 'same'},
+                {'id': 2, 'name': 'b', 'note': 'old'},
+                {'id': 3, 'name': 'c', 'note': 'gone'},
+            ]])
+        self.manager.create = mock.Mock()
+        self.manager.update = mock.Mock()
+        self.manager.delete = mock.Mock()
+        self.desired = [
+            {'name': 'a', 'note': 'same'},
+            {'name': 'b', 'note': 'new'},
+            {'name': 'd', 'note': 'added'},
+        ]
+
+    def test_plan_is_minimal(self):
+        """Verify only differences are planned, creations first."""
+        operations = self.manager.plan(self.desired, prune=True, limit=5)
+
+        self.assertEqual([
+            crud.Operation(crud.CREATE, ('d',), None,
+                           {'name': 'd', 'note': 'added'}),
+            crud.Operation(crud.UPDATE, ('b',), 2, {'note': 'new'}),
+            crud.Operation(crud.DELETE, ('c',), 3, None),
+        ], operations)
+        self.manager.list.assert_called_once_with(limit=5)
+
+    def test_dry_run_changes_nothing(self):
+        """Verify a dry run only returns the plan."""
+        operations = self.manager.reconcile(self.desired, dry_run=True)
+
+        self.assertEqual([crud.CREATE, crud.UPDATE],
+                         [operation.action for operation in operations])
+        self.assertFalse(self.manager.create.called)
+        self.assertFalse(self.manager.update.called)
+
+    def test_executes_plan(self):
+        """Verify each planned operation calls the manager once."""
+        outcomes = self.manager.reconcile(self.desired, prune=True)
+
+        self.assertEqual(3, len(outcomes))
+        self.manager.create.assert_called_once_with(name='d', note='added')
+        self.manager.update.assert_called_once_with(fake_id=2, note='new')
+        self.manager.delete.assert_called_once_with(fake_id=3)
+
+    def test_limiter_bounds_concurrency(self):
+        """Verify a limiter's maximum is not capped by a default."""
+        limiter = concurrency.AdaptiveLimiter(initial=16, maximum=16)
+        with mock.patch.object(concurrency, 'map_concurrently',
+                               return_value=[]) as map_concurrently:
+            self.manager.reconcile(self.desired, limiter=limiter)
+
+        _, kwargs = map_concurrently.call_args
+        self.assertIsNone(kwargs['max_workers'])
+        self.assertIs(limiter, kwargs['limiter'])
+
+    def test_rejects_duplicates_and_missing_key(self):
+        """Verify bad input is refused before anything is changed."""
+        self.assertRaises(ValueError, self.manager.plan,
+                          [{'name': 'a'}, {'name': 'a'}])
+        self.manager.natural_key = None
+        self.assertRaises(ValueError, self.manager.plan, [])
+
+
+class TestCRUDClientWatch(base.TestCase):
+    """Test watching a CRUDClient's listing for changes."""
+
+    def setUp(self):
+        """Create a manager whose listings are scripted."""
+        super(TestCRUDClientWatch, self).setUp()
+        self.session = mock.Mock(conditional_cache=None)
+        self.manager = FakeManager(self.session, 'http://example.com/v1/')
+        self.sleep = mock.Mock()
+
+    def listings(self, *bodies):
+        """Make each GET return the next body."""
+        responses = []
+        for body in bodies:
+            response = mock.Mock(request_event=None)
+            response.json.return_value = body
+            responses.append(response)
+        self.session.get.side_effect = responses
+
+    def watch(self, polls, **kwargs):
+        """Return the actions and IDs of every batch of events."""
+        return [[(event.action, event.id) for event in events]
+                for events in self.manager.watch(
+                    interval=5, max_polls=polls, sleep=self.sleep, **kwargs)]
+
+    def test_yields_only_changes(self):
+        """Verify we diff each listing against the previous one by ID."""
+        self.listings(
+            [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}],
+            [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}],
+            [{'id': 1, 'name': 'z'}, {'id': 3, 'name': 'c'}],
+        )
+
+        batches = self.watch(3, cell_id=4)
+
+        self.assertEqual([
+            [(crud.ADDED, 1), (crud.ADDED, 2)],
+            [(crud.CHANGED, 1), (crud.ADDED, 3), (crud.REMOVED, 2)],
+        ], batches)
+        self.assertEqual([mock.call(5), mock.call(5)],
+                         self.sleep.call_args_list)
+        self.session.get.assert_called_with(
+            'http://example.com/v1/fakes', params={'cell_id': 4},
+            operation='fake.list', conditional_cache=mock.ANY)
+
+    def test_uses_its_own_conditional_cache(self):
+        """Verify every poll uses one cache without changing the session."""
+        self.session.get.return_value = mock.Mock(
+            request_event=None, **{'json.return_value': []})
+
+        self.watch(2)
+
+        caches = [kwargs['conditional_cache']
+                  for _, kwargs in self.session.get.call_args_list]
+        self.assertIsInstance(caches[0], cache.ConditionalCache)
+        self.assertIs(caches[0], caches[1])
+        self.assertIsNone(self.session.conditional_cache)
+
+    def test_uses_the_session_conditional_cache(self):
+        """Verify a session's own cache is left to the session."""
+        self.session.conditional_cache = cache.ConditionalCache()
+        self.listings([])
+
+        self.watch(1)
+
+        self.session.get.assert_called_once_with(
+            'http://example.com/v1/fakes', params={},
+            operation='fake.list')
+
+
+class TestResource(base.TestCase):
+    """Test our generic Resource."""
+
+    def test_lazy_load_records_request_id(self):
+        """Verify lazy loading fetches by ID and keeps the request ID."""
+        manager = mock.Mock(key='fake')
+        manager.get.return_value = FakeResource(
+            manager, {'id': 1, 'name': 'fake'}, request_id='req-1')
+        resource = FakeResource(manager, {'id': 1})
+
+        self.assertEqual('fake', resource.name)
+        manager.get.assert_called_once_with(fake_id=1)
+        self.assertEqual('req-1', resource.request_id)
+        self.assertNotIn('x_request_id', resource.to_dict())
+
+    def test_human_id(self):
+        """Verify the human ID is a slug of the name, without lazy loading."""
+        manager = mock.Mock(key='fake')
+
+        class HumanResource(FakeResource):
+            HUMAN_ID = True
+
+        self.assertEqual('web-01', HumanResource(
+            manager, {'id': 1, 'name': 'Web 01'}).human_id)
+        self.assertIsNone(HumanResource(manager, {'id': 1}).human_id)
+        self.assertIsNone(FakeResource(
+            manager, {'id': 1, 'name': 'fake'}).human_id)
+        self.assertFalse(manager.get.called)
@@ -0,0 +1,168 @@
+#   Licensed under the Apache License, Version 2.0 (the "License"); you may
+#   not use this file except in compliance with the License. You may obtain
+#   a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#   WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#   License for the specific language governing permissions and limitations
+#   under the License.
+
+"""Tests for `cratonclient.shell.daemon` module."""
+import argparse
+import os
+import socket
+import stat
+import threading
+import time
+
+import fixtures
+import mock
+import six
+
+from cratonclient.shell import daemon
+from cratonclient.shell import main
+from cratonclient.tests import base
+
+
+def options(**kwargs):
+    """Return base options of the craton CLI."""
+    defaults = {'craton_url': 'http://craton', 'craton_project_id': 1,
+                'os_username': 'user', 'os_password': 'secret'}
+    defaults.update(kwargs)
+    return argparse.Namespace(**defaults)
+
+
+class TestCredentialsKey(base.TestCase):
+    """Tests for the credentials key."""
+
+    def test_depends_on_endpoint_and_credentials(self):
+        """Verify different credentials have different keys."""
+        key = daemon.credentials_key(options())
+        self.assertEqual(key, daemon.credentials_key(options()))
+        self.assertNotEqual(key, daemon.credentials_key(
+            options(os_password='other')))
+        self.assertNotEqual(key, daemon.credentials_key(
+            options(craton_url='http://other')))
+        self.assertNotIn('secret', key)
+
+
+class TestForward(base.TestCase):
+    """Tests for forwarding without a daemon."""
+
+    def setUp(self):
+        """Create a temporary socket path."""
+        super(TestForward, self).setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'daemon.sock')
+
+    def test_no_socket(self):
+        """Verify nothing is forwarded without a socket."""
+        self.assertIsNone(daemon.forward(self.path, ['host-list'], 'key'))
+
+    def test_stale_socket(self):
+        """Verify nothing is forwarded when nothing listens."""
+        open(self.path, 'w').close()
+        self.assertIsNone(daemon.forward(self.path, ['host-list'], 'key'))
+
+    def test_unresponsive_daemon(self):
+        """Verify nothing is forwarded when the daemon does not answer."""
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(listener.close)
+        listener.bind(self.path)
+        listener.listen(1)
+
+        self.assertIsNone(daemon.forward(self.path, ['host-list'], 'key',
+                                         timeout=0.01))
+
+
+class TestDaemonServer(base.ShellTestCase):
+    """Tests for serving commands over a socket."""
+
+    def setUp(self):
+        """Start a daemon with a fake client."""
+        super(TestDaemonServer, self).setUp()
+        self.path = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'craton', 'daemon.sock')
+        self.stdout = self.useFixture(fixtures.MonkeyPatch(
+            'sys.stdout', six.StringIO())).new_value
+        self.stderr = self.useFixture(fixtures.MonkeyPatch(
+            'sys.stderr', six.StringIO())).new_value
+        self.craton_shell = main.CratonShell()
+        self.craton_shell.cc = mock.Mock()
+        self.key = daemon.credentials_key(options())
+        self.server = daemon.DaemonServer(self.path, self.craton_shell,
+                                          self.key)
+        thread = threading.Thread(target=self.server.serve,
+                                  kwargs={'poll_interval': 0.01})
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.shutdown)
+
+    def forward(self, argv, key=None):
+        """Forward a command to the daemon."""
+        return daemon.forward(self.path, argv, key or self.key)
+
+    def test_socket_is_private(self):
+        """Verify only the owner can use the socket."""
+        mode = stat.S_IMODE(os.stat(self.path).st_mode)
+        self.assertEqual(0, mode & 0o077)
+
+    def test_runs_command_with_its_client(self):
+        """Verify commands run with the daemon's client and stream output."""
+        inventory = self.craton_shell.cc.inventory.return_value
+        inventory.hosts.iterate.return_value = []
+        self.assertEqual(0, self.forward(['host-list', '-r', '1',
+                                          '--format', 'csv']))
+        self.craton_shell.cc.inventory.assert_called_once_with(1)
+        self.assertTrue(self.stdout.getvalue().startswith('id,name,'))
+
+    def test_waits_for_accepted_commands(self):
+        """Verify the accept timeout does not limit running commands."""
+        inventory = mock.Mock()
+        inventory.hosts.iterate.return_value = []
+
+        def slow_inventory(region_id):
+            time.sleep(0.1)
+            return inventory
+
+        self.craton_shell.cc.inventory.side_effect = slow_inventory
+        self.assertEqual(0, daemon.forward(
+            self.path, ['host-list', '-r', '1', '--format', 'csv'],
+            self.key, timeout=0.01))
+
+    def test_reports_errors(self):
+        """Verify failing commands return their status and error."""
+        self.craton_shell.cc.inventory.side_effect = Exception('boom')
+        self.assertEqual(1, self.forward(['host-list', '-r', '1']))
+        self.assertIn('ERROR: boom', self.stderr.getvalue())
+
+    def test_reports_usage_errors(self):
+        """Verify invalid arguments return argparse's status."""
+        self.assertEqual(2, self.forward(['host-list', '--no-such-option']))
+        self.assertIn('usage:', self.stderr.getvalue())
+
+    def test_refuses_other_credentials(self):
+        """Verify commands for other credentials are refused."""
+        key = daemon.credentials_key(options(os_username='other'))
+        self.assertIsNone(self.forward(['host-list', '-r', '1'], key))
+        self.assertFalse(self.craton_shell.cc.inventory.called)
+
+    def test_refuses_local_commands(self):
+        """Verify commands that must run locally are refused."""
+        with mock.patch.object(self.craton_shell, 'do_shell') as do_shell:
+            self.assertIsNone(self.forward(['--craton-url', 'x', 'shell']))
+        self.assertFalse(do_shell.called)
+
+    def test_refuses_watches(self):
+        """Verify watches, which only end when interrupted, are refused."""
+        self.assertIsNone(self.forward(['host-list', '-r', '1', '--watch']))
+        self.assertFalse(self.craton_shell.cc.inventory.called)
+
+    def test_only_one_daemon_per_socket(self):
+        """Verify a second daemon cannot take over the socket."""
+        self.assertRaises(RuntimeError, daemon.DaemonServer, self.path,
+                          self.craton_shell, self.key)
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.deadline` module."""
+import datetime
+
+import mock
+from requests import exceptions as requests_exc
+
+from cratonclient import circuitbreaker
+from cratonclient import concurrency
+from cratonclient import deadline
+from cratonclient import exceptions as exc
+from cratonclient import ratelimit
+from cratonclient import session
+from cratonclient.tests import base
+
+
+class TestDeadline(base.TestCase):
+    """Tests for the Deadline class."""
+
+    def setUp(self):
+        """Set up a fake clock."""
+        super(TestDeadline, self).setUp()
+        self.now = 100.0
+
+    def clock(self):
+        """Return the fake time."""
+        return self.now
+
+    def test_remaining_and_check(self):
+        """Verify we track the time remaining."""
+        active = deadline.Deadline(2.0, clock=self.clock)
+        self.now += 1.5
+
+        self.assertEqual(0.5, active.check())
+        self.now += 1
+
+        self.assertTrue(active.expired())
+        self.assertRaises(exc.DeadlineExceeded, active.check)
+
+    def test_current_returns_earliest_deadline(self):
+        """Verify nested deadlines pick the earliest expiry."""
+        self.assertIsNone(deadline.current())
+        with deadline.Deadline(1.0, clock=self.clock) as outer:
+            with deadline.Deadline(5.0, clock=self.clock):
+                self.assertIs(outer, deadline.current())
+            self.assertIs(outer, deadline.current())
+        self.assertIsNone(deadline.current())
+
+    def test_shrink_timeout(self):
+        """Verify timeouts are limited to the time remaining."""
+        self.assertEqual(1.0, deadline.shrink_timeout(None, 1.0))
+        self.assertEqual(0.5, deadline.shrink_timeout(0.5, 1.0))
+        self.assertEqual((1.0, 0.5),
+                         deadline.shrink_timeout((3.05, 0.5), 1.0))
+
+
+class TestSessionDeadline(base.TestCase):
+    """Tests for the Session integration of deadlines."""
+
+    def setUp(self):
+        """Create a session with a fake transport."""
+        super(TestSessionDeadline, self).setUp()
+        self.transport = mock.Mock()
+        self.transport.request.return_value = mock.MagicMock(
+            status_code=200, headers={}, elapsed=datetime.timedelta(0))
+        self.craton_session = session.Session(session=self.transport)
+
+    def test_shrinks_request_timeout(self):
+        """Verify the request timeout never exceeds the deadline."""
+        with deadline.Deadline(0.5):
+            self.craton_session.get('http://craton/v1/hosts', timeout=30)
+
+        _, kwargs = self.transport.request.call_args
+        self.assertLessEqual(kwargs['timeout'], 0.5)
+
+    def test_raises_once_expired(self):
+        """Verify no request is sent after the deadline."""
+        with deadline.Deadline(0):
+            self.assertRaises(exc.DeadlineExceeded, self.craton_session.get,
+                              'http://craton/v1/hosts')
+
+        self.assertFalse(self.transport.request.called)
+
+    def expire_during_request(self, now):
+        """Make the request time out once the fake clock has moved on."""
+        def request(*args, **kwargs):
+            now[0] = 1.0
+            raise requests_exc.ReadTimeout()
+        self.transport.request.side_effect = request
+
+    def test_deadline_timeouts_are_not_server_failures(self):
+        """Verify a timeout shrunk by the deadline raises DeadlineExceeded."""
+        now = [0.0]
+        self.expire_during_request(now)
+        breaker = circuitbreaker.CircuitBreaker(minimum_requests=1,
+                                                window_size=1)
+        limiter = concurrency.AdaptiveLimiter(initial=4)
+        craton_session = session.Session(session=self.transport,
+                                         circuit_breaker=breaker)
+        limiter.install(craton_session)
+
+        with deadline.Deadline(0.5, clock=lambda: now[0]):
+            error = self.assertRaises(exc.DeadlineExceeded,
+                                      craton_session.get,
+                                      'http://craton/v1/hosts')
+
+        self.assertIsInstance(error.original_exception, exc.Timeout)
+        self.assertEqual(circuitbreaker.CLOSED, breaker.state)
+        self.assertEqual(4, limiter.limit)
+
+    def test_other_timeouts_are_kept(self):
+        """Verify a timeout before the deadline is a plain Timeout."""
+        self.transport.request.side_effect = requests_exc.ReadTimeout()
+
+        with deadline.Deadline(30):
+            error = self.assertRaises(exc.Timeout, self.craton_session.get,
+                                      'http://craton/v1/hosts', timeout=0.1)
+
+        self.assertNotIsInstance(error, exc.DeadlineExceeded)
+
+    def test_rate_limit_wait_past_deadline(self):
+        """Verify waiting for a token past the deadline is not attempted."""
+        limiter = ratelimit.RateLimiter(rate=0.1, burst=1)
+        craton_session = session.Session(session=self.transport,
+                                         rate_limiter=limiter)
+        craton_session.get('http://craton/v1/hosts')
+
+        with deadline.Deadline(1.0):
+            self.assertRaises(exc.DeadlineExceeded, craton_session.get,
+                              'http://craton/v1/hosts')
+
+        self.assertEqual(1, self.transport.request.call_count)
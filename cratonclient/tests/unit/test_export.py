@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for the inventory export."""
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from argparse import Namespace
+import mock
+import six
+
+from cratonclient.shell.v1 import export_shell
+from cratonclient.tests import base
+from cratonclient.tests.unit import test_mirror
+from cratonclient.v1 import export
+
+
+class TestExport(base.TestCase):
+    """Unit tests for iter_inventory and write_records."""
+
+    def setUp(self):
+        """Create a fake client."""
+        super(TestExport, self).setUp()
+        self.client = test_mirror.fake_client(
+            test_mirror.REGIONS, test_mirror.CELLS, test_mirror.HOSTS)
+
+    def test_streams_every_resource(self):
+        """Verify regions come first, then each region's cells and hosts."""
+        records = list(export.iter_inventory(self.client, max_workers=2))
+
+        self.assertEqual([('regions', 1), ('regions', 2)],
+                         [(t, info['id']) for t, info in records[:2]])
+        self.assertEqual(
+            sorted([('cells', 10), ('cells', 20)] +
+                   [('hosts', host['id']) for host in test_mirror.HOSTS]),
+            sorted((t, info['id']) for t, info in records[2:]))
+        inventory = self.client.inventories[1]
+        inventory.hosts.list.assert_called_once_with(
+            limit=export.DEFAULT_PAGE_SIZE)
+
+    def test_selects_types_and_regions(self):
+        """Verify only the requested types and regions are listed."""
+        records = list(export.iter_inventory(
+            self.client, resource_types=['hosts'], region_ids=[2]))
+
+        self.assertEqual(set(['hosts']), set(t for t, _ in records))
+        self.assertEqual(set([2]), set(info['region_id']
+                                       for _, info in records))
+        self.assertEqual([2], list(self.client.inventories))
+
+    def test_raises_producer_errors(self):
+        """Verify a failure listing a region is raised to the caller."""
+        inventory = self.client.inventory.side_effect
+
+        def failing_inventory(region_id):
+            failing = inventory(region_id)
+            failing.cells.list.side_effect = ValueError
+            return failing
+
+        self.client.inventory.side_effect = failing_inventory
+        records = export.iter_inventory(self.client,
+                                        resource_types=['cells'])
+
+        self.assertRaises(ValueError, list, records)
+
+    def test_write_csv(self):
+        """Verify CSV rows share one header and encode nested values."""
+        stream = six.StringIO()
+        counts = export.write_records([
+            ('regions', {'id': 1, 'name': 'ORD'}),
+            ('hosts', {'id': 5, 'name': 'h', 'labels': ['a']}),
+        ], stream, 'csv')
+
+        rows = list(csv.DictReader(six.StringIO(stream.getvalue())))
+        self.assertEqual({'regions': 1, 'cells': 0, 'hosts': 1}, counts)
+        self.assertEqual(['regions', 'hosts'],
+                         [row['resource_type'] for row in rows])
+        self.assertEqual('["a"]', rows[1]['labels'])
+
+
+class TestExportShell(base.TestCase):
+    """Test the export command."""
+
+    def setUp(self):
+        """Create a temporary directory for exports."""
+        super(TestExportShell, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_writes_gzipped_jsonl(self):
+        """Verify a .gz output is compressed JSON-lines."""
+        client = test_mirror.fake_client(test_mirror.REGIONS, [], [])
+        path = os.path.join(self.directory, 'fleet.jsonl.gz')
+        args = Namespace(output=path, compress=False, record_format=None,
+                         regions=None, resource_types=['regions'],
+                         page_size=10, max_workers=2)
+
+        with mock.patch('sys.stderr', new=six.StringIO()) as stderr:
+            export_shell.do_export(client, args)
+
+        with io.TextIOWrapper(gzip.GzipFile(path, 'rb')) as exported:
+            records = [json.loads(line) for line in exported]
+        self.assertEqual(['ORD', 'DFW'], [r['name'] for r in records])
+        self.assertIn('Exported 2 regions', stderr.getvalue())
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.common.fileutils` module."""
+import os
+
+import fixtures
+
+from cratonclient.common import fileutils
+from cratonclient.tests import base
+
+
+class TestAtomicWrite(base.TestCase):
+    """Tests for atomic_write."""
+
+    def setUp(self):
+        """Create a temporary directory."""
+        super(TestAtomicWrite, self).setUp()
+        self.directory = self.useFixture(fixtures.TempDir()).path
+        self.path = os.path.join(self.directory, 'cache', 'file')
+
+    def read(self):
+        """Return the contents of our file."""
+        with open(self.path) as f:
+            return f.read()
+
+    def test_replaces_file(self):
+        """Verify the file and its directory are created and replaced."""
+        with fileutils.atomic_write(self.path) as f:
+            f.write(u'first')
+        with fileutils.atomic_write(self.path) as f:
+            f.write(u'second')
+
+        self.assertEqual('second', self.read())
+        self.assertEqual(['file'],
+                         os.listdir(os.path.dirname(self.path)))
+
+    def test_failure_keeps_file(self):
+        """Verify a failed write leaves the previous contents alone."""
+        with fileutils.atomic_write(self.path) as f:
+            f.write(u'first')
+
+        def fail():
+            with fileutils.atomic_write(self.path) as f:
+                f.write(u'partial')
+                raise ValueError()
+
+        self.assertRaises(ValueError, fail)
+        self.assertEqual('first', self.read())
+        self.assertEqual(['file'],
+                         os.listdir(os.path.dirname(self.path)))
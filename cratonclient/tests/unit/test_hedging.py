@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.hedging` module."""
+import datetime
+import threading
+import time
+
+import mock
+
+from cratonclient import exceptions as exc
+from cratonclient import hedging
+from cratonclient import session
+from cratonclient.tests import base
+
+
+class TestHedgingPolicy(base.TestCase):
+    """Tests for the HedgingPolicy class."""
+
+    def test_delay_from_percentile(self):
+        """Verify the delay is taken from observed latencies."""
+        policy = hedging.HedgingPolicy(percentile=90, min_samples=10)
+        self.assertIsNone(policy.hedge_delay())
+
+        for latency in range(1, 11):
+            policy.observe(latency / 10.0)
+
+        self.assertEqual(0.9, policy.hedge_delay())
+
+    def test_fast_requests_are_not_hedged(self):
+        """Verify fast requests are sent once."""
+        policy = hedging.HedgingPolicy(delay=5, budget=1)
+        attempt = mock.Mock(return_value='response')
+
+        self.assertEqual(('response', False), policy.send(attempt))
+        self.assertEqual(1, attempt.call_count)
+
+    def test_slow_requests_are_hedged(self):
+        """Verify the hedge wins when the first attempt is slow."""
+        policy = hedging.HedgingPolicy(delay=0.01, budget=1)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        slow_response = mock.Mock()
+        responses = iter([slow_response, 'fast'])
+
+        def attempt():
+            response = next(responses)
+            if response is slow_response:
+                release.wait(5)
+            return response
+
+        self.assertEqual(('fast', True), policy.send(attempt))
+        release.set()
+        for _ in range(500):
+            if slow_response.close.called:
+                break
+            time.sleep(0.01)
+        self.assertTrue(slow_response.close.called)
+
+    def test_queued_requests_are_not_hedged(self):
+        """Verify the delay does not include waiting for the hedges' pool."""
+        policy = hedging.HedgingPolicy(delay=0.05, budget=1, max_workers=1)
+        attempt = mock.Mock(side_effect=lambda: time.sleep(0.02))
+        threads = [threading.Thread(target=policy.send, args=(attempt,))
+                   for _ in range(8)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(8, attempt.call_count)
+
+    def test_budget_limits_hedges(self):
+        """Verify we do not hedge without budget."""
+        policy = hedging.HedgingPolicy(delay=0, budget=0.5)
+        attempt = mock.Mock(return_value='response')
+
+        policy.send(attempt)
+        self.assertEqual(1, attempt.call_count)
+
+    def test_refused_hedges_keep_their_budget(self):
+        """Verify a hedge refused by may_hedge does not spend budget."""
+        policy = hedging.HedgingPolicy(delay=0.01, budget=0.5)
+        may_hedge = mock.Mock(side_effect=[False, True])
+
+        def attempt():
+            time.sleep(0.05)
+            return 'response'
+
+        self.assertEqual(('response', False),
+                         policy.send(attempt, may_hedge=may_hedge))
+        self.assertFalse(may_hedge.called)
+        self.assertEqual(('response', False),
+                         policy.send(attempt, may_hedge=may_hedge))
+        self.assertEqual(('response', True),
+                         policy.send(attempt, may_hedge=may_hedge))
+        self.assertEqual(2, may_hedge.call_count)
+
+    def test_hedge_errors_fall_back_to_primary(self):
+        """Verify a failed hedge does not fail the request."""
+        policy = hedging.HedgingPolicy(delay=0.01, budget=1)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        calls = []
+
+        def attempt():
+            calls.append(None)
+            if len(calls) == 1:
+                release.wait(5)
+                return 'slow'
+            release.set()
+            raise exc.Timeout()
+
+        self.assertEqual(('slow', True), policy.send(attempt))
+
+
+class TestSessionHedging(base.TestCase):
+    """Tests for the Session integration of hedging."""
+
+    def test_only_idempotent_methods_are_hedged(self):
+        """Verify we never hedge requests that are not idempotent."""
+        transport = mock.Mock()
+        transport.request.return_value = mock.MagicMock(
+            status_code=200, headers={}, elapsed=datetime.timedelta(0))
+        policy = mock.Mock()
+        policy.applies_to.return_value = False
+        craton_session = session.Session(session=transport, hedging=policy)
+
+        craton_session.post('http://craton/v1/hosts', json={})
+
+        self.assertFalse(policy.send.called)
+        policy.applies_to.assert_called_once_with('POST')
+
+    def test_records_hedged_requests(self):
+        """Verify the request event records whether we hedged."""
+        transport = mock.Mock()
+        policy = mock.Mock()
+        policy.send.return_value = (mock.MagicMock(
+            status_code=200, headers={}, elapsed=datetime.timedelta(0)), True)
+        craton_session = session.Session(session=transport, hedging=policy)
+
+        response = craton_session.get('http://craton/v1/hosts')
+
+        self.assertTrue(response.request_event.hedged)
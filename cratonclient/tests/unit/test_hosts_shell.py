@@ -12,8 +12,10 @@
 
 """Tests for `cratonclient.shell.v1.hosts_shell` module."""
 
+import json
 import mock
 import re
+import six
 
 from argparse import Namespace
 from testtools import matchers
@@ -90,6 +92,17 @@ class TestHostsShell(base.ShellTestCase):
             mock_list.assert_called_once_with(cell_id=1)
             mock_list.reset_mock()
 
+    @mock.patch('cratonclient.v1.hosts.HostManager.list')
+    @mock.patch('cratonclient.common.cliutils.print_watch')
+    def test_host_list_watch_success(self, mock_print_watch, mock_list):
+        """Verify --watch polls the hosts instead of listing them once."""
+        self.shell('host-list -r 1 --limit 2 --watch --watch-interval 5')
+        self.assertFalse(mock_list.called)
+        mock_print_watch.assert_called_once_with(
+            mock.ANY, mock.ANY, interval=5.0, limit=2)
+        self.assertIsInstance(mock_print_watch.call_args[0][0],
+                              hosts.HostManager)
+
     @mock.patch('cratonclient.v1.hosts.HostManager.list')
     def test_host_list_detail_success(self, mock_list):
         """Verify --detail argument successfully pass detail to Client."""
@@ -104,7 +117,62 @@ class TestHostsShell(base.ShellTestCase):
         mock_list.assert_called_once_with()
         mock_printlist.assert_called_once_with(mock.ANY,
                                                list({'id': 'ID',
-                                                     'name': 'Name'}))
+                                                     'name': 'Name'}),
+                                               sortby_index=None,
+                                               output_format='table',
+                                               chunk_size=None)
+
+    @mock.patch('cratonclient.v1.hosts.HostManager.iterate')
+    @mock.patch('cratonclient.common.cliutils.print_list')
+    def test_host_list_format_success(self, mock_printlist, mock_iterate):
+        """Verify --format is passed on to print_list."""
+        self.shell('host-list -r 1 --format jsonl')
+        mock_printlist.assert_called_once_with(mock.ANY, mock.ANY,
+                                               sortby_index=None,
+                                               output_format='jsonl',
+                                               chunk_size=None)
+
+    @mock.patch('cratonclient.v1.hosts.HostManager.list')
+    def test_host_list_streams_pages(self, mock_list):
+        """Verify unsorted rows are fetched and printed page by page."""
+        pages = [[hosts.Host(mock.Mock(), {'id': i}) for i in ids]
+                 for ids in ([1, 2], [3])]
+        mock_list.side_effect = pages
+
+        stdout, _ = self.shell('host-list -r 1 --limit 2 --fields id '
+                               '--format value')
+
+        self.assertEqual('1\n2\n', stdout)
+        mock_list.assert_called_once_with(limit=2)
+
+    @mock.patch('cratonclient.v1.hosts.HostManager.list')
+    def test_host_list_without_server_paging(self, mock_list):
+        """Verify every row is printed when the server ignores markers."""
+        first_page = [hosts.Host(mock.Mock(), {'id': i})
+                      for i in range(1, 101)]
+        mock_list.side_effect = [
+            first_page, first_page,
+            [hosts.Host(mock.Mock(), {'id': i}) for i in range(1, 251)],
+        ]
+
+        stdout, _ = self.shell('host-list -r 1 --fields id --format value')
+
+        self.assertEqual([str(i) for i in range(1, 251)], stdout.split())
+        self.assertEqual(mock.call(), mock_list.call_args_list[-1])
+
+    @mock.patch('cratonclient.v1.hosts.HostManager.list')
+    def test_host_list_chunk_size(self, mock_list):
+        """Verify --chunk-size prints a table per chunk of fetched rows."""
+        mock_list.side_effect = [
+            [hosts.Host(mock.Mock(), {'id': i}) for i in range(1, 101)],
+            [hosts.Host(mock.Mock(), {'id': 101})],
+        ]
+
+        stdout, _ = self.shell('host-list -r 1 --fields id --chunk-size 50')
+
+        self.assertEqual(3, stdout.count('| id '))
+        mock_list.assert_has_calls([mock.call(limit=100),
+                                    mock.call(limit=100, marker=100)])
 
     @mock.patch('cratonclient.v1.hosts.HostManager.list')
     def test_host_list_detail_and_fields_specified(self, mock_list):
@@ -119,6 +187,18 @@ class TestHostsShell(base.ShellTestCase):
         mock_list.assert_called_once_with(sort_key='cell_id',
                                           sort_dir='asc')
 
+    @mock.patch('cratonclient.v1.hosts.HostManager.list')
+    def test_host_list_sorts_and_limits_on_client(self, mock_list):
+        """Verify rows are ordered and limited even if the server did not."""
+        mock_list.return_value = [
+            hosts.Host(mock.Mock(), {'id': i, 'name': 'h{0}'.format(i)},
+                       loaded=True) for i in (2, 5, 1, 4, 3)]
+
+        stdout, _ = self.shell('host-list -r 1 --sort-key id --sort-dir desc '
+                               '--limit 2 --fields id --format value')
+
+        self.assertEqual('5\n4\n', stdout)
+
     def test_host_list_sort_key_invalid(self):
         """Verify --sort-key with invalid args, fails with Command Error."""
         self.assertRaises(exc.CommandError,
@@ -259,7 +339,7 @@ class TestHostsShell(base.ShellTestCase):
                                             'http://127.0.0.1/')
         client.inventory = mock.Mock(name='inventory')
         client.inventory.return_value = inventory
-        test_args = Namespace(id=1, region=1)
+        test_args = Namespace(id=1, region=1, output_format='table')
         hosts_shell.do_host_show(client, test_args)
         mock_get.assert_called_once_with(vars(test_args)['id'])
 
@@ -287,3 +367,83 @@ class TestHostsShell(base.ShellTestCase):
         test_args = Namespace(id=1, region=1)
         hosts_shell.do_host_delete(client, test_args)
         mock_delete.assert_called_once_with(vars(test_args)['id'])
+
+
+class TestHostImport(base.TestCase):
+    """Test the host-import command."""
+
+    def setUp(self):
+        """Create a fake client whose hosts are created successfully."""
+        super(TestHostImport, self).setUp()
+        self.client = mock.Mock()
+        self.create = self.client.inventory.return_value.hosts.create
+        self.create.side_effect = lambda **fields: mock.Mock(
+            id=fields['name'].upper())
+
+    def import_hosts(self, text, **kwargs):
+        """Run host-import and return the parsed report."""
+        args = dict(file=six.StringIO(text), region=1, project_id=None,
+                    record_format=None, max_workers=2, report=six.StringIO(),
+                    dry_run=False, craton_project_id=7)
+        args.update(kwargs)
+        args = Namespace(**args)
+        with mock.patch('sys.stderr', new=six.StringIO()):
+            try:
+                hosts_shell.do_host_import(self.client, args)
+                error = None
+            except exc.CommandError as e:
+                error = e
+        report = [json.loads(line)
+                  for line in args.report.getvalue().splitlines()]
+        return report, error
+
+    def test_imports_csv(self):
+        """Verify CSV rows are converted and created concurrently."""
+        report, error = self.import_hosts(
+            'name,ip_address,device_type,cell_id,active,labels\n'
+            'h1,10.0.0.1,server,3,false,a;b\n'
+            'h2,10.0.0.2,server,,,\n',
+            record_format='csv')
+
+        self.assertIsNone(error)
+        self.assertEqual([{'row': 1, 'name': 'h1', 'status': 'created',
+                           'id': 'H1'},
+                          {'row': 2, 'name': 'h2', 'status': 'created',
+                           'id': 'H2'}], report)
+        self.create.assert_any_call(name='h1', ip_address='10.0.0.1',
+                                    device_type='server', cell_id=3,
+                                    active=False, labels=['a', 'b'],
+                                    region_id=1, project_id=7)
+        self.client.inventory.assert_called_with(1)
+
+    def test_reports_invalid_rows(self):
+        """Verify invalid rows are reported and the command fails."""
+        report, error = self.import_hosts(
+            '{"name": "h1", "ip_address": "10.0.0.1", "device_type": "x"}\n'
+            '{"name": "h2", "bogus": 1}\n'
+            '\n'
+            '{"name": "h3", "ip_address": "10.0.0.3"}\n')
+
+        self.assertIsInstance(error, exc.CommandError)
+        self.assertEqual(['created', 'failed', 'failed'],
+                         [entry['status'] for entry in report])
+        self.assertIn('bogus', report[1]['error'])
+        self.assertIn('device_type', report[2]['error'])
+        self.assertEqual(1, self.create.call_count)
+
+    def test_dry_run(self):
+        """Verify a dry run validates without creating hosts."""
+        report, error = self.import_hosts(
+            '{"name": "h1", "ip_address": "10.0.0.1", "device_type": "x"}\n',
+            dry_run=True)
+
+        self.assertIsNone(error)
+        self.assertEqual('valid', report[0]['status'])
+        self.assertFalse(self.create.called)
+
+    def test_invalid_json_aborts(self):
+        """Verify a malformed line stops the import."""
+        report, error = self.import_hosts('{"name"\n')
+
+        self.assertEqual([], report)
+        self.assertIn('Line 1', str(error))
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.v1.index` module."""
+import mock
+
+from cratonclient import crud
+from cratonclient.tests import base
+from cratonclient.v1 import hosts
+from cratonclient.v1 import index
+from cratonclient.v1 import sync
+
+
+def host(host_id, name, cell_id, device_type='server', ip_address=None,
+         **info):
+    """Create a host resource as a listing returns it."""
+    info.update(id=host_id, name=name, cell_id=cell_id,
+                device_type=device_type, ip_address=ip_address)
+    return hosts.Host(mock.Mock(), info)
+
+
+class TestInventoryIndex(base.TestCase):
+    """Unit tests for the InventoryIndex."""
+
+    def setUp(self):
+        """Index a handful of hosts."""
+        super(TestInventoryIndex, self).setUp()
+        self.index = index.InventoryIndex([
+            host(1, 'compute-1', 1, ip_address='10.1.0.10', active=True),
+            host(2, 'compute-2', 1, ip_address='10.1.1.10', active=False),
+            host(3, 'switch-1', 2, 'switch', ip_address='10.2.0.1'),
+            host(4, 'compute-3', 2, ip_address='fd00::4'),
+            host(5, 'unaddressed', 2),
+        ])
+
+    def ids(self, resources):
+        """Return the IDs of resources."""
+        return [resource.id for resource in resources]
+
+    def test_find_by_indexed_fields(self):
+        """Verify single and compound lookups use the hash indexes."""
+        self.assertEqual([1, 2], self.ids(self.index.find(cell_id=1)))
+        self.assertEqual([4, 5], self.ids(self.index.find(
+            cell_id=2, device_type='server')))
+        self.assertEqual([], self.ids(self.index.find(cell_id=3)))
+        self.assertEqual(3, self.index.find_one(name='switch-1').id)
+
+    def test_find_filters_unindexed_fields(self):
+        """Verify criteria without an index are checked one by one."""
+        self.assertEqual([1], self.ids(self.index.find(cell_id=1,
+                                                       active=True)))
+
+    def test_missing_fields_are_not_loaded(self):
+        """Verify fields missing from a listing do not cause requests."""
+        manager = mock.Mock()
+        resources = [hosts.Host(manager, {'id': host_id, 'name': 'host'})
+                     for host_id in range(1, 6)]
+
+        hosts_index = index.InventoryIndex(resources)
+
+        self.assertEqual([1, 2, 3, 4, 5],
+                         self.ids(hosts_index.find(cell_id=None,
+                                                   active=None)))
+        self.assertEqual([], hosts_index.in_network('0.0.0.0/0'))
+        self.assertFalse(manager.get.called)
+
+    def test_ip_lookups(self):
+        """Verify exact and CIDR lookups of IPv4 and IPv6 addresses."""
+        self.assertEqual(2, self.index.by_ip('10.1.1.10').id)
+        self.assertIsNone(self.index.by_ip('10.1.1.11'))
+        self.assertIsNone(self.index.by_ip('not-an-ip'))
+        self.assertEqual([1, 2],
+                         self.ids(self.index.in_network('10.1.0.0/16')))
+        self.assertEqual([1, 2, 3],
+                         self.ids(self.index.in_network('10.0.0.0/8')))
+        self.assertEqual([4], self.ids(self.index.in_network('fd00::/64')))
+
+    def test_add_replaces_and_reindexes(self):
+        """Verify updating a resource moves it between index entries."""
+        self.index.add(host(1, 'compute-1', 2, ip_address='10.3.0.1'))
+
+        self.assertEqual(5, len(self.index))
+        self.assertEqual([2], self.ids(self.index.find(cell_id=1)))
+        self.assertEqual([1, 3, 4, 5], self.ids(self.index.find(cell_id=2)))
+        self.assertIsNone(self.index.by_ip('10.1.0.10'))
+        self.assertEqual(1, self.index.by_ip('10.3.0.1').id)
+
+    def test_remove(self):
+        """Verify removed resources disappear from every index."""
+        removed = self.index.remove(3)
+
+        self.assertEqual(3, removed.id)
+        self.assertNotIn(3, self.index)
+        self.assertEqual([], self.index.find(device_type='switch'))
+        self.assertNotIn('switch', self.index.values('device_type'))
+        self.assertIsNone(self.index.by_ip('10.2.0.1'))
+        self.assertIsNone(self.index.remove(3))
+
+    def test_apply_changes(self):
+        """Verify watch events and sync changes update the index."""
+        self.index.apply(crud.WatchEvent(crud.ADDED, 6,
+                                         host(6, 'compute-6', 1)))
+        self.index.apply(sync.Change(sync.REMOVED, 'hosts', 1, 1, None))
+
+        self.assertEqual([2, 6], self.ids(self.index.find(cell_id=1)))
@@ -14,6 +14,7 @@
 
 
 import mock
+import os
 import re
 
 from testtools import matchers
@@ -115,3 +116,101 @@ class TestMainShell(base.ShellTestCase):
                                                     proj_id))
 
         self.assertTrue(mock_create.called)
+
+    @mock.patch('cratonclient.shell.main.CratonShell.get_subcommand_parser')
+    def test_help_does_not_load_commands(self, mock_get_subcommand_parser):
+        """Verify help is printed without building the subcommands."""
+        self.shell('--help')
+        self.assertFalse(mock_get_subcommand_parser.called)
+
+    @mock.patch('cratonclient.session.Session')
+    @mock.patch('cratonclient.v1.client.Client')
+    def test_main_builds_only_invoked_subcommand(self, mock_client,
+                                                 mock_session):
+        """Verify only the invoked subcommand's parser is built."""
+        craton_shell = main.CratonShell()
+        with mock.patch('sys.stdout'):
+            craton_shell.main(['host-list', '-r', '1'])
+        self.assertEqual(['host-list'], list(craton_shell.subcommands))
+
+    def test_subcommand_parser_for_unknown_command(self):
+        """Verify an unknown command builds every subcommand's parser."""
+        craton_shell = main.CratonShell()
+        craton_shell.get_subcommand_parser('no-such-command')
+        self.assertIn('host-list', craton_shell.subcommands)
+        self.assertIn('region-show', craton_shell.subcommands)
+
+    def test_subcommand_parser_for_all_commands(self):
+        """Verify every command module is loaded without a command."""
+        craton_shell = main.CratonShell()
+        craton_shell.get_subcommand_parser()
+        self.assertEqual(
+            sorted(list(craton_shell.get_command_index()) +
+                   ['bash-completion', 'batch', 'daemon', 'shell']),
+            sorted(craton_shell.subcommands),
+        )
+
+    @mock.patch('cratonclient.shell.main.CratonShell.main')
+    @mock.patch('cratonclient.shell.daemon.forward')
+    def test_main_forwards_to_daemon(self, mock_forward, mock_main):
+        """Verify commands run by a daemon are not run locally."""
+        mock_forward.return_value = 0
+        with mock.patch('sys.argv', ['craton', '--os-password', 'secret',
+                                     'host-list', '-r', '1']):
+            self.assertEqual(0, main.main())
+        mock_forward.assert_called_once_with(mock.ANY,
+                                             ['host-list', '-r', '1'],
+                                             mock.ANY)
+        self.assertFalse(mock_main.called)
+
+    @mock.patch('cratonclient.shell.main.CratonShell.main')
+    @mock.patch('cratonclient.shell.daemon.forward')
+    def test_main_exits_with_forwarded_status(self, mock_forward, mock_main):
+        """Verify the exit status of a forwarded command is kept."""
+        mock_forward.return_value = 2
+        with mock.patch('sys.argv', ['craton', 'host-list']):
+            exit = self.assertRaises(SystemExit, main.main)
+        self.assertEqual(2, exit.code)
+        self.assertFalse(mock_main.called)
+
+    @mock.patch('cratonclient.shell.daemon.forward')
+    def test_local_commands_are_not_forwarded(self, mock_forward):
+        """Verify help and local commands are never sent to a daemon."""
+        craton_shell = main.CratonShell()
+        for argv in (['--help'], ['help', 'host-list'], ['shell'],
+                     ['--craton-url', 'x', 'batch'],
+                     ['host-list', '-r', '1', '--watch'], []):
+            self.assertIsNone(craton_shell.forward(argv))
+        self.assertFalse(mock_forward.called)
+
+    @mock.patch('cratonclient.session.Session')
+    @mock.patch('cratonclient.v1.client.Client')
+    def test_main_keeps_completion_cache(self, mock_client, mock_session):
+        """Verify the CLI's session records IDs for shell completion."""
+        self.shell('host-list -r 1')
+        completion_cache = mock_session.return_value.completion_cache
+        self.assertEqual(os.environ['CRATON_COMPLETION_CACHE'],
+                         completion_cache.directory)
+
+    @mock.patch('cratonclient.completion.CompletionCache')
+    @mock.patch('cratonclient.session.Session')
+    @mock.patch('cratonclient.v1.client.Client')
+    def test_main_flushes_completion_cache(self, mock_client, mock_session,
+                                           mock_cache):
+        """Verify IDs are written once the command ran, even if it failed."""
+        mock_client.return_value.inventory.side_effect = Exception('boom')
+        craton_shell = main.CratonShell()
+        self.assertRaises(Exception, craton_shell.main,
+                          ['host-list', '-r', '1'])
+        mock_cache.return_value.flush.assert_called_once_with()
+
+    @mock.patch('cratonclient.session.Session')
+    @mock.patch('cratonclient.v1.client.Client')
+    def test_bash_completion(self, mock_client, mock_session):
+        """Verify every command and option is printed for bash."""
+        stdout, _ = self.shell('bash-completion')
+        words = stdout.split()
+        for word in ('host-list', 'region-show', 'bash-completion',
+                     '--craton-url', '--format', '--region'):
+            self.assertIn(word, words)
+        self.assertEqual(sorted(words), words)
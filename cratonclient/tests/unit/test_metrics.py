@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.metrics` module."""
+import mock
+
+from cratonclient import exceptions as exc
+from cratonclient import metrics
+from cratonclient.tests import base
+
+
+def make_event(url='http://craton:8080/v1/hosts/12?detail=1', method='GET',
+               total=0.2, request_bytes=0, response_bytes=512,
+               exception=None):
+    """Build a fake RequestEvent."""
+    return mock.Mock(url=url, method=method, timings={'total': total},
+                     request_bytes=request_bytes,
+                     response_bytes=response_bytes, exception=exception)
+
+
+class TestEndpointFor(base.TestCase):
+    """Tests for endpoint_for."""
+
+    def test_replaces_ids_and_drops_query(self):
+        """Verify IDs are templated and query strings removed."""
+        self.assertEqual(
+            '/v1/hosts/{id}',
+            metrics.endpoint_for('http://craton:8080/v1/hosts/12?detail=1'))
+
+    def test_keeps_collection_paths(self):
+        """Verify collection paths are unchanged."""
+        self.assertEqual('/v1/cells',
+                         metrics.endpoint_for('http://craton/v1/cells/'))
+
+
+class TestHistogram(base.TestCase):
+    """Tests for the Histogram class."""
+
+    def test_observations_are_bucketed(self):
+        """Verify observations land in cumulative buckets."""
+        histogram = metrics.Histogram([1, 2, 3])
+        for value in (0.5, 1.5, 1.7, 10):
+            histogram.observe(value)
+
+        self.assertEqual([(1, 1), (2, 3), (3, 3), (float('inf'), 4)],
+                         histogram.cumulative_counts())
+        self.assertEqual(4, histogram.count)
+        self.assertEqual(13.7, histogram.sum)
+
+    def test_percentile_interpolates(self):
+        """Verify percentiles are interpolated within buckets."""
+        histogram = metrics.Histogram([1, 2])
+        for _ in range(10):
+            histogram.observe(1.5)
+
+        self.assertEqual(1.5, histogram.percentile(50))
+
+    def test_percentile_of_empty_histogram(self):
+        """Verify an empty histogram has no percentiles."""
+        self.assertIsNone(metrics.Histogram([1]).percentile(99))
+
+
+class TestMetricsCollector(base.TestCase):
+    """Tests for the MetricsCollector class."""
+
+    def test_install_registers_hooks(self):
+        """Verify we subscribe to the session hooks."""
+        collector = metrics.MetricsCollector()
+        session = mock.Mock()
+
+        collector.install(session)
+
+        session.register_hook.assert_has_calls([
+            mock.call('after-response', collector.observe_response),
+            mock.call('on-error', collector.observe_error),
+        ])
+
+    def test_snapshot(self):
+        """Verify the snapshot contains latencies, sizes, and errors."""
+        collector = metrics.MetricsCollector()
+        collector.observe_response(make_event())
+        collector.observe_error(make_event(exception=exc.NotFound()))
+
+        snapshot = collector.snapshot()
+
+        key = ('/v1/hosts/{id}', 'GET')
+        self.assertEqual(1, snapshot['latency'][key]['count'])
+        self.assertEqual(1, snapshot['response_size'][key]['count'])
+        self.assertEqual(
+            {('/v1/hosts/{id}', 'GET', 'NotFound'): 1}, snapshot['errors'])
+
+    def test_to_prometheus(self):
+        """Verify we render the Prometheus text exposition format."""
+        collector = metrics.MetricsCollector(latency_buckets=(0.1, 1.0))
+        collector.observe_response(make_event(total=0.2))
+        collector.observe_error(make_event(exception=exc.Timeout()))
+
+        text = collector.to_prometheus()
+
+        self.assertIn('# TYPE cratonclient_request_duration_seconds '
+                      'histogram\n', text)
+        self.assertIn('cratonclient_request_duration_seconds_bucket{'
+                      'endpoint="/v1/hosts/{id}",method="GET",le="0.1"} 0\n',
+                      text)
+        self.assertIn('cratonclient_request_duration_seconds_bucket{'
+                      'endpoint="/v1/hosts/{id}",method="GET",le="1.0"} 1\n',
+                      text)
+        self.assertIn('cratonclient_request_duration_seconds_count{'
+                      'endpoint="/v1/hosts/{id}",method="GET"} 1\n', text)
+        self.assertIn('cratonclient_request_errors_total{'
+                      'endpoint="/v1/hosts/{id}",exception="Timeout",'
+                      'method="GET"} 1\n', text)
+
+    def test_keystoneauth_session(self):
+        """Verify errors of a keystoneauth1 session are collected."""
+        collector = metrics.MetricsCollector()
+        session = self.keystoneauth_session()
+        collector.install(session)
+        self.transport.request.return_value = base.http_response(503)
+
+        self.assertRaises(exc.HTTPServerError, session.get,
+                          'http://craton/v1/hosts/1')
+
+        snapshot = collector.snapshot()
+        key = ('/v1/hosts/{id}', 'GET')
+        self.assertEqual(1, snapshot['latency'][key]['count'])
+        self.assertEqual(
+            {('/v1/hosts/{id}', 'GET', 'HTTPServerError'): 1},
+            snapshot['errors'])
+
+    def test_gauges(self):
+        """Verify registered gauges are reported."""
+        collector = metrics.MetricsCollector()
+        collector.register_gauge('concurrency_limit', lambda: 7, 'Limit.')
+
+        self.assertEqual({'concurrency_limit': 7},
+                         collector.snapshot()['gauges'])
+        self.assertIn('# TYPE cratonclient_concurrency_limit gauge\n'
+                      'cratonclient_concurrency_limit 7\n',
+                      collector.to_prometheus())
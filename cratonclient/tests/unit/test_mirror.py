@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.v1.mirror` module."""
+import mock
+
+from cratonclient.tests import base
+from cratonclient.v1 import cells
+from cratonclient.v1 import hosts
+from cratonclient.v1 import mirror
+from cratonclient.v1 import regions
+
+
+def fake_client(region_records, cell_records, host_records):
+    """Build a fake v1 client returning the given records."""
+    client = mock.Mock()
+    client.regions = regions.RegionManager(mock.Mock(), 'http://craton/v1')
+    client.regions.list = mock.Mock(return_value=[
+        regions.Region(client.regions, record) for record in region_records])
+    inventories = {}
+
+    def inventory(region_id):
+        session = mock.Mock()
+        inv = mock.Mock()
+        inv.cells = cells.CellManager(region_id, session, 'http://craton/v1')
+        inv.cells.list = mock.Mock(return_value=[
+            cells.Cell(inv.cells, record) for record in cell_records
+            if record['region_id'] == region_id])
+        inv.hosts = hosts.HostManager(region_id, session, 'http://craton/v1')
+        inv.hosts.list = mock.Mock(return_value=[
+            hosts.Host(inv.hosts, record) for record in host_records
+            if record['region_id'] == region_id])
+        inventories[region_id] = inv
+        return inv
+
+    client.inventory.side_effect = inventory
+    client.inventories = inventories
+    return client
+
+
+REGIONS = [{'id': 1, 'name': 'ORD'}, {'id': 2, 'name': 'DFW'}]
+CELLS = [
+    {'id': 10, 'region_id': 1, 'name': 'C1'},
+    {'id': 20, 'region_id': 2, 'name': 'C2'},
+]
+HOSTS = [
+    {'id': 100, 'region_id': 1, 'cell_id': 10, 'name': 'h1',
+     'ip_address': '10.0.0.1', 'device_type': 'server'},
+    {'id': 101, 'region_id': 1, 'cell_id': 10, 'name': 'h2',
+     'ip_address': '10.0.0.2', 'device_type': 'switch'},
+    {'id': 200, 'region_id': 2, 'cell_id': 20, 'name': 'h3',
+     'ip_address': '10.0.1.1', 'device_type': 'server'},
+]
+
+
+class TestInventoryMirror(base.TestCase):
+    """Tests for the InventoryMirror class."""
+
+    def setUp(self):
+        """Create a mirror of a fake client."""
+        super(TestInventoryMirror, self).setUp()
+        self.now = 1000.0
+        self.client = fake_client(REGIONS, CELLS, HOSTS)
+        self.mirror = mirror.InventoryMirror(self.client,
+                                             clock=lambda: self.now)
+        self.addCleanup(self.mirror.close)
+
+    def test_sync_counts(self):
+        """Verify sync mirrors every resource."""
+        self.assertEqual({'regions': 2, 'cells': 2, 'hosts': 3},
+                         self.mirror.sync())
+        self.assertEqual(1000.0, self.mirror.synced_at())
+
+    def test_queries(self):
+        """Verify queries are answered from the mirror."""
+        self.mirror.sync()
+
+        host = self.mirror.host_by_ip('10.0.0.2')
+        self.assertIsInstance(host, hosts.Host)
+        self.assertEqual(101, host.id)
+        self.assertTrue(host.is_loaded())
+        self.assertIs(self.client.inventories[1].hosts, host.manager)
+        self.assertEqual([100, 101],
+                         [h.id for h in self.mirror.hosts_in_cell(10)])
+        self.assertEqual([200], [h.id for h in self.mirror.hosts_in_region(
+            2, device_type='server')])
+        self.assertEqual([10],
+                         [c.id for c in self.mirror.cells_in_region(1)])
+        self.assertEqual('DFW', self.mirror.get_region(2).name)
+        self.assertIsNone(self.mirror.get_host(999))
+
+    def test_sync_replaces_contents(self):
+        """Verify a sync removes resources that no longer exist."""
+        self.mirror.sync()
+        self.client.inventories.clear()
+        self.client.inventory.side_effect = fake_client(
+            REGIONS, CELLS, HOSTS[:1]).inventory.side_effect
+
+        self.mirror.sync()
+
+        self.assertIsNone(self.mirror.host_by_ip('10.0.0.2'))
+
+    def test_queries_resync_when_stale(self):
+        """Verify a stale mirror is synchronized before a query."""
+        self.mirror.max_age = 60
+        self.mirror.hosts_in_region(1)
+        self.assertEqual(1, self.client.regions.list.call_count)
+
+        self.now += 30
+        self.mirror.hosts_in_region(1)
+        self.assertEqual(1, self.client.regions.list.call_count)
+
+        self.now += 31
+        self.mirror.hosts_in_region(1)
+        self.assertEqual(2, self.client.regions.list.call_count)
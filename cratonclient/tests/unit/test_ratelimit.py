@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.ratelimit` module."""
+import datetime
+
+import mock
+
+from cratonclient import exceptions as exc
+from cratonclient import ratelimit
+from cratonclient import session
+from cratonclient.tests import base
+
+
+class FakeClock(object):
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        """Start the clock at zero."""
+        self.now = 0.0
+
+    def __call__(self):
+        """Return the current time."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Advance the clock instead of sleeping."""
+        self.now += seconds
+
+
+class TestBasePathFor(base.TestCase):
+    """Tests for base_path_for."""
+
+    def test_skips_version(self):
+        """Verify the version prefix is skipped."""
+        self.assertEqual('/hosts',
+                         ratelimit.base_path_for('http://craton/v1/hosts/1'))
+
+    def test_root(self):
+        """Verify URLs without a path map to the root."""
+        self.assertEqual('/', ratelimit.base_path_for('http://craton/v1'))
+
+
+class TestTokenBucket(base.TestCase):
+    """Tests for the TokenBucket class."""
+
+    def setUp(self):
+        """Create a bucket with a fake clock."""
+        super(TestTokenBucket, self).setUp()
+        self.clock = FakeClock()
+        self.bucket = ratelimit.TokenBucket(2, capacity=2, clock=self.clock,
+                                            sleep=self.clock.sleep)
+
+    def test_allows_bursts_up_to_capacity(self):
+        """Verify a full bucket allows a burst of requests."""
+        self.assertEqual(0.0, self.bucket.try_acquire())
+        self.assertEqual(0.0, self.bucket.try_acquire())
+        self.assertEqual(0.5, self.bucket.try_acquire())
+
+    def test_refills_over_time(self):
+        """Verify tokens are added at the configured rate."""
+        self.bucket.try_acquire(2)
+        self.clock.now += 0.5
+
+        self.assertEqual(0.0, self.bucket.try_acquire())
+
+    def test_non_blocking_acquire(self):
+        """Verify a non-blocking acquire fails when the bucket is empty."""
+        self.bucket.try_acquire(2)
+
+        self.assertFalse(self.bucket.acquire(blocking=False))
+
+    def test_blocking_acquire_waits(self):
+        """Verify a blocking acquire sleeps until a token is available."""
+        self.bucket.try_acquire(2)
+
+        self.assertTrue(self.bucket.acquire())
+        self.assertEqual(0.5, self.clock.now)
+
+    def test_blocking_acquire_honors_timeout(self):
+        """Verify a blocking acquire gives up after the timeout."""
+        self.bucket.try_acquire(2)
+
+        self.assertFalse(self.bucket.acquire(timeout=0.1))
+
+
+class TestRateLimiter(base.TestCase):
+    """Tests for the RateLimiter class."""
+
+    def test_per_path_limits(self):
+        """Verify limits apply per base path."""
+        limiter = ratelimit.RateLimiter(per_path={'/hosts': (1, 1)},
+                                        blocking=False)
+
+        limiter.acquire('http://craton/v1/hosts')
+        self.assertRaises(exc.RateLimited, limiter.acquire,
+                          'http://craton/v1/hosts/1')
+        limiter.acquire('http://craton/v1/cells')
+
+    def test_refunds_path_token_when_global_limit_is_hit(self):
+        """Verify we do not waste path tokens when the global bucket fails."""
+        limiter = ratelimit.RateLimiter(rate=1, burst=1,
+                                        per_path={'hosts': (1, 1)})
+        limiter.bucket.try_acquire()
+
+        self.assertNotEqual(0.0, limiter.try_acquire('http://craton/v1/hosts'))
+        self.assertEqual(0.0, limiter.path_buckets['/hosts'].try_acquire())
+
+    @mock.patch('time.sleep')
+    def test_blocking_acquire_sleeps(self, mock_sleep):
+        """Verify the limiter sleeps for the delay in blocking mode."""
+        limiter = ratelimit.RateLimiter(rate=1, burst=1)
+        limiter.bucket = mock.Mock()
+        limiter.bucket.try_acquire.side_effect = [0.25, 0.0]
+
+        limiter.acquire('http://craton/v1/hosts')
+
+        mock_sleep.assert_called_once_with(0.25)
+
+    def test_session_acquires_before_sending(self):
+        """Verify the Session consults the rate limiter."""
+        transport = mock.Mock()
+        limiter = ratelimit.RateLimiter(rate=1, burst=1, blocking=False)
+        craton_session = session.Session(session=transport,
+                                         rate_limiter=limiter)
+        transport.request.return_value = mock.MagicMock(
+            status_code=200, headers={}, elapsed=datetime.timedelta(0))
+
+        craton_session.get('http://craton/v1/hosts')
+        error = self.assertRaises(exc.RateLimited, craton_session.get,
+                                  'http://craton/v1/hosts')
+        self.assertEqual(1, transport.request.call_count)
+        self.assertGreater(error.retry_after, 0)
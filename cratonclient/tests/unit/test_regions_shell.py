@@ -90,6 +90,6 @@ class TestRegionsShell(base.ShellTestCase):
         session = mock.Mock()
         session.project_id = 1
         client.regions = regions.RegionManager(session, 'http://127.0.0.1/')
-        test_args = Namespace(id=1)
+        test_args = Namespace(id=1, output_format='table')
         regions_shell.do_region_show(client, test_args)
         mock_get.assert_called_once_with(vars(test_args)['id'])
@@ -0,0 +1,147 @@
+#   Licensed under the Apache License, Version 2.0 (the "License"); you may
+#   not use this file except in compliance with the License. You may obtain
+#   a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#   WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#   License for the specific language governing permissions and limitations
+#   under the License.
+
+"""Tests for `cratonclient.shell.repl` module."""
+import fixtures
+import mock
+import six
+
+from cratonclient.shell import main
+from cratonclient.shell import repl
+from cratonclient.tests import base
+
+
+class TestCratonRepl(base.ShellTestCase):
+    """Tests for the interactive shell."""
+
+    def setUp(self):
+        """Create a shell with a fake client."""
+        super(TestCratonRepl, self).setUp()
+        self.craton_shell = main.CratonShell()
+        self.craton_shell.cc = mock.Mock()
+        self.stdout = six.StringIO()
+        self.useFixture(fixtures.MockPatch(
+            'cratonclient.common.cliutils.print_list'))
+
+    def run_lines(self, *lines):
+        """Run lines through a new interactive shell."""
+        stdin = six.StringIO(''.join(line + '\n' for line in lines))
+        shell = repl.CratonRepl(self.craton_shell, stdin=stdin,
+                                stdout=self.stdout)
+        with mock.patch('sys.stderr', new=six.StringIO()) as mock_stderr:
+            shell.cmdloop()
+        return shell, mock_stderr.getvalue()
+
+    def test_registers_after_parse_hook(self):
+        """Verify the shell remembers the resources commands return."""
+        shell, _ = self.run_lines()
+        self.craton_shell.cc._session.register_hook.assert_called_once_with(
+            'after-parse', shell.remember_names)
+
+    def test_runs_commands_with_one_client(self):
+        """Verify every command is run with the same client."""
+        with mock.patch.object(self.craton_shell, 'get_client') as get_client:
+            self.run_lines('host-list -r 1', 'host-list -r 2')
+        self.assertFalse(get_client.called)
+        self.assertEqual([mock.call(1), mock.call(2)],
+                         self.craton_shell.cc.inventory.call_args_list)
+
+    def test_continues_after_usage_error(self):
+        """Verify an invalid command does not end the shell."""
+        with mock.patch('sys.stdout', new=six.StringIO()):
+            self.run_lines('host-list --no-such-option', 'host-list -r 1')
+        self.craton_shell.cc.inventory.assert_called_once_with(1)
+
+    def test_continues_after_error(self):
+        """Verify a failing command prints an error and the shell goes on."""
+        cc = self.craton_shell.cc
+        cc.inventory.side_effect = [Exception('boom'), mock.Mock()]
+        _, stderr = self.run_lines('host-list -r 1', 'host-list -r 2')
+        self.assertEqual([mock.call(1), mock.call(2)],
+                         cc.inventory.call_args_list)
+        self.assertIn('ERROR: ', stderr)
+        self.assertIn('boom', stderr)
+
+    def test_exit(self):
+        """Verify exit leaves the shell."""
+        self.run_lines('exit', 'host-list -r 1')
+        self.assertFalse(self.craton_shell.cc.inventory.called)
+
+    def test_nested_shell(self):
+        """Verify the shell cannot be started from itself."""
+        with mock.patch('cratonclient.shell.main.CratonShell.do_shell') as \
+                do_shell:
+            _, stderr = self.run_lines('shell')
+        self.assertFalse(do_shell.called)
+        self.assertIn('Already in the interactive shell', stderr)
+
+    def test_nested_commands(self):
+        """Verify commands reading their own commands are refused."""
+        with mock.patch('cratonclient.shell.main.CratonShell.do_batch') as \
+                do_batch:
+            _, stderr = self.run_lines('batch', 'daemon')
+        self.assertFalse(do_batch.called)
+        self.assertIn('batch cannot be run in the interactive shell',
+                      stderr)
+        self.assertIn('daemon cannot be run in the interactive shell',
+                      stderr)
+
+    def test_help_lists_commands(self):
+        """Verify help lists the craton and built-in commands."""
+        self.run_lines('help')
+        self.assertIn('host-list', self.stdout.getvalue())
+        self.assertIn('exit', self.stdout.getvalue())
+
+    def test_complete_command_names(self):
+        """Verify command names are completed."""
+        shell = repl.CratonRepl(self.craton_shell)
+        self.assertEqual(['host-list'], shell.completenames('host-l'))
+        self.assertEqual(['host-list'],
+                         shell.complete_help('host-l', 'help host-l', 5, 11))
+
+    def test_complete_options(self):
+        """Verify the options of a command are completed."""
+        shell = repl.CratonRepl(self.craton_shell)
+        self.assertEqual(['--format'], shell.completedefault(
+            '--fo', 'host-show 1 --fo', 12, 16))
+
+    def test_complete_remembered_names(self):
+        """Verify the IDs and names of returned resources are completed."""
+        shell = repl.CratonRepl(self.craton_shell)
+        host = mock.Mock()
+        host.manager.key = 'host'
+        host.to_dict.return_value = {'id': 12, 'name': 'host-12'}
+        cell = mock.Mock()
+        cell.manager.key = 'cell'
+        cell.to_dict.return_value = {'id': 13, 'name': 'cell-13'}
+        shell.remember_names(mock.Mock(resources=[host]))
+        shell.remember_names(mock.Mock(resources=cell))
+
+        self.assertEqual(['12'], shell.completedefault(
+            '1', 'host-show 1', 10, 11))
+        self.assertEqual(['host-12'], shell.completedefault(
+            'h', 'host-update h', 12, 13))
+        self.assertEqual(['13', 'cell-13'], sorted(
+            shell.completedefault('', 'cell-show ', 10, 10)))
+
+
+class TestShellCommand(base.ShellTestCase):
+    """Tests for the craton shell command."""
+
+    @mock.patch('cratonclient.shell.repl.CratonRepl')
+    @mock.patch('cratonclient.session.Session')
+    @mock.patch('cratonclient.v1.client.Client')
+    def test_shell_starts_repl(self, mock_client, mock_session, mock_repl):
+        """Verify craton shell starts the interactive shell."""
+        self.shell('shell --prompt >')
+        mock_repl.assert_called_once_with(mock.ANY, prompt='>')
+        mock_repl.return_value.cmdloop.assert_called_once_with()
@@ -12,8 +12,14 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 """Session specific unit tests."""
+import datetime
+
+from keystoneauth1 import exceptions as ksa_exc
 from keystoneauth1 import session as ksa_session
+import mock
+from requests import exceptions as requests_exc
 
+from cratonclient import exceptions as exc
 from cratonclient import session
 from cratonclient.tests import base
 
@@ -85,3 +91,258 @@ class TestSession(base.TestCase):
         craton_session = session.Session(session=ksa_session_obj)
 
         self.assertIs(ksa_session_obj, craton_session._session)
+
+
+class TestSessionHooks(base.TestCase):
+    """Unit tests for the request instrumentation hooks."""
+
+    def setUp(self):
+        """Create a Session with a fake underlying transport."""
+        super(TestSessionHooks, self).setUp()
+        self.response = mock.Mock(status_code=200,
+                                  headers={},
+                                  content=b'{"id": 1}',
+                                  elapsed=datetime.timedelta(seconds=0.25))
+        self.response.request.body = b'{"name": "foo"}'
+        self.transport = mock.Mock()
+        self.transport.request.return_value = self.response
+        self.craton_session = session.Session(session=self.transport)
+
+    def test_rejects_unknown_events(self):
+        """Verify we only allow hooks for events we dispatch."""
+        self.assertRaises(ValueError, self.craton_session.register_hook,
+                          'not-an-event', mock.Mock())
+
+    def test_dispatches_before_and_after_hooks(self):
+        """Verify hooks receive the event with timings and sizes."""
+        events = []
+        self.craton_session.register_hook(
+            'before-request', lambda e: events.append(('before', e)))
+        self.craton_session.register_hook(
+            'after-response', lambda e: events.append(('after', e)))
+
+        self.craton_session.get('http://example.com/v1/hosts',
+                                operation='host.list')
+
+        self.assertEqual(['before', 'after'], [name for name, _ in events])
+        event = events[-1][1]
+        self.assertEqual('host.list', event.operation)
+        self.assertEqual(200, event.status_code)
+        self.assertEqual(9, event.response_bytes)
+        self.assertEqual(15, event.request_bytes)
+        self.assertEqual(0.25, event.timings['time_to_headers'])
+        self.assertIn('total', event.timings)
+        self.assertIn('body', event.timings)
+
+    def test_does_not_send_operation_to_the_server(self):
+        """Verify the operation name is stripped from the request."""
+        self.craton_session.get('http://example.com', operation='host.get')
+
+        _, kwargs = self.transport.request.call_args
+        self.assertNotIn('operation', kwargs)
+
+    def test_dispatches_on_error_for_error_responses(self):
+        """Verify on-error hooks see the exception we raise."""
+        self.response.status_code = 404
+        on_error = mock.Mock()
+        self.craton_session.register_hook('on-error', on_error)
+
+        self.assertRaises(exc.NotFound, self.craton_session.get,
+                          'http://example.com')
+        event = on_error.call_args[0][0]
+        self.assertIsInstance(event.exception, exc.NotFound)
+
+    def test_dispatches_on_error_for_connection_failures(self):
+        """Verify on-error hooks are called for connection failures."""
+        self.transport.request.side_effect = (
+            requests_exc.ConnectionError('boom'))
+        on_error = mock.Mock()
+        self.craton_session.register_hook('on-error', on_error)
+
+        self.assertRaises(exc.ConnectionFailed, self.craton_session.get,
+                          'http://example.com')
+        self.assertTrue(on_error.called)
+
+    def test_dispatches_on_error_for_timeouts(self):
+        """Verify on-error hooks are called for transport failures."""
+        self.transport.request.side_effect = requests_exc.Timeout('boom')
+        on_error = mock.Mock()
+        self.craton_session.register_hook('on-error', on_error)
+
+        self.assertRaises(exc.Timeout, self.craton_session.get,
+                          'http://example.com')
+        self.assertTrue(on_error.called)
+
+    def test_hook_exceptions_are_ignored(self):
+        """Verify a broken hook cannot break a request."""
+        self.craton_session.register_hook(
+            'after-response', mock.Mock(side_effect=RuntimeError))
+
+        response = self.craton_session.get('http://example.com')
+
+        self.assertIs(self.response, response)
+
+    def test_accepts_hooks_in_constructor(self):
+        """Verify hooks may be passed when creating the Session."""
+        hook = mock.Mock()
+        craton_session = session.Session(session=self.transport,
+                                         hooks={'after-response': hook})
+
+        craton_session.get('http://example.com')
+
+        self.assertTrue(hook.called)
+
+    def test_keystoneauth_error_responses_dispatch_hooks(self):
+        """Verify a keystoneauth1 session reports error responses."""
+        craton_session = self.keystoneauth_session()
+        self.transport.request.return_value = base.http_response(503)
+        after_response = mock.Mock()
+        on_error = mock.Mock()
+        craton_session.register_hook('after-response', after_response)
+        craton_session.register_hook('on-error', on_error)
+
+        self.assertRaises(exc.HTTPServerError, craton_session.get,
+                          'http://example.com')
+
+        event = after_response.call_args[0][0]
+        self.assertEqual(503, event.status_code)
+        self.assertIn('total', event.timings)
+        on_error.assert_called_once_with(event)
+        self.assertIsInstance(event.exception, exc.HTTPServerError)
+
+    def test_keystoneauth_connection_failures_dispatch_on_error(self):
+        """Verify a keystoneauth1 session reports transport failures."""
+        craton_session = self.keystoneauth_session()
+        self.transport.request.side_effect = (
+            requests_exc.ConnectionError('refused'))
+        on_error = mock.Mock()
+        craton_session.register_hook('on-error', on_error)
+
+        self.assertRaises(exc.ConnectionFailed, craton_session.get,
+                          'http://example.com')
+
+        event = on_error.call_args[0][0]
+        self.assertIsInstance(event.exception, exc.ConnectionFailed)
+
+
+class TestKeystoneauthSession(base.TestCase):
+    """Unit tests for a Session using a keystoneauth1 session."""
+
+    def setUp(self):
+        """Create a Session whose keystoneauth1 session has no server."""
+        super(TestKeystoneauthSession, self).setUp()
+        self.craton_session = self.keystoneauth_session()
+
+    def test_returns_error_responses_to_us(self):
+        """Verify keystoneauth1 does not raise for error status codes."""
+        self.transport.request.return_value = base.http_response(404)
+
+        self.assertRaises(exc.NotFound, self.craton_session.get,
+                          'http://example.com')
+
+    def test_translates_server_errors(self):
+        """Verify 5xx responses raise our server errors."""
+        self.transport.request.return_value = base.http_response(503)
+
+        error = self.assertRaises(exc.HTTPServerError,
+                                  self.craton_session.get,
+                                  'http://example.com')
+        self.assertEqual(503, error.status_code)
+
+    def test_translates_connection_failures(self):
+        """Verify keystoneauth1 ConnectFailure raises ConnectionFailed."""
+        self.transport.request.side_effect = (
+            requests_exc.ConnectionError('refused'))
+
+        error = self.assertRaises(exc.ConnectionFailed,
+                                  self.craton_session.get,
+                                  'http://example.com')
+        self.assertIsInstance(error.original_exception,
+                              ksa_exc.ConnectFailure)
+
+    def test_translates_timeouts(self):
+        """Verify keystoneauth1 ConnectTimeout raises Timeout."""
+        self.transport.request.side_effect = requests_exc.ReadTimeout('slow')
+
+        error = self.assertRaises(exc.Timeout, self.craton_session.get,
+                                  'http://example.com')
+        self.assertIsInstance(error.original_exception,
+                              ksa_exc.ConnectTimeout)
+
+
+class TestSessionTracing(base.TestCase):
+    """Unit tests for request IDs and trace context propagation."""
+
+    def setUp(self):
+        """Create a Session with a fake underlying transport."""
+        super(TestSessionTracing, self).setUp()
+        self.response = mock.Mock(
+            status_code=200,
+            headers={'x-openstack-request-id': 'req-from-server'},
+            content=b'{}',
+            elapsed=datetime.timedelta(seconds=0.1))
+        self.response.request.body = None
+        self.transport = mock.Mock()
+        self.transport.request.return_value = self.response
+        self.craton_session = session.Session(session=self.transport)
+
+    def sent_headers(self):
+        """Return the headers passed to the underlying transport."""
+        _, kwargs = self.transport.request.call_args
+        return kwargs['headers']
+
+    def test_generates_request_id_and_traceparent(self):
+        """Verify every request is sent with an ID and trace context."""
+        response = self.craton_session.get('http://example.com')
+
+        headers = self.sent_headers()
+        event = response.request_event
+        self.assertEqual(event.request_id, headers['X-OpenStack-Request-ID'])
+        self.assertTrue(event.request_id.startswith('req-'))
+        self.assertEqual(
+            '00-{0}-{1}-01'.format(event.trace_id, event.span_id),
+            headers['traceparent'])
+
+    def test_propagates_existing_trace_context(self):
+        """Verify we reuse the caller's request ID and trace ID."""
+        trace_id = '4bf92f3577b34da6a3ce929d0e0e4736'
+        self.craton_session.get('http://example.com', headers={
+            'X-OpenStack-Request-ID': 'req-caller',
+            'Traceparent': '00-{0}-00f067aa0ba902b7-01'.format(trace_id),
+        })
+
+        headers = self.sent_headers()
+        self.assertEqual('req-caller', headers['X-OpenStack-Request-ID'])
+        self.assertNotIn('Traceparent', headers)
+        self.assertTrue(headers['traceparent'].startswith(
+            '00-{0}-'.format(trace_id)))
+
+    def test_records_server_request_id(self):
+        """Verify we record the request ID returned by the server."""
+        response = self.craton_session.get('http://example.com')
+
+        self.assertEqual('req-from-server',
+                         response.request_event.server_request_id)
+        self.assertEqual('req-from-server',
+                         self.craton_session.last_request_id)
+
+    def test_records_request_id_on_errors(self):
+        """Verify HTTPErrors carry the request ID."""
+        self.response.status_code = 500
+
+        error = self.assertRaises(exc.InternalServerError,
+                                  self.craton_session.get,
+                                  'http://example.com')
+        self.assertEqual('req-from-server', error.request_id)
+
+    def test_span_factory_wraps_the_request(self):
+        """Verify the span factory's context manager wraps sending."""
+        span_factory = mock.MagicMock()
+        craton_session = session.Session(session=self.transport,
+                                         span_factory=span_factory)
+
+        response = craton_session.get('http://example.com')
+
+        span_factory.assert_called_once_with(response.request_event)
+        self.assertTrue(span_factory.return_value.__enter__.called)
+        self.assertTrue(span_factory.return_value.__exit__.called)
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.v1.sync` module."""
+import json
+
+import mock
+
+from cratonclient.tests import base
+from cratonclient.v1 import hosts
+from cratonclient.v1 import mirror
+from cratonclient.v1 import regions
+from cratonclient.v1 import sync
+
+
+class FakeManager(object):
+    """A manager serving records with a crude changes_since filter."""
+
+    def __init__(self, resource_class, records):
+        """Store the records served by this manager."""
+        self.resource_class = resource_class
+        self.records = records
+        self.calls = []
+
+    def list(self, **kwargs):
+        """List the records, honoring changes_since and fields."""
+        self.calls.append(kwargs)
+        records = self.records
+        since = kwargs.get('changes_since')
+        if since is not None:
+            records = [r for r in records
+                       if (r.get('update_at') or r['created_at']) >= since]
+        if 'fields' in kwargs:
+            records = [{'id': r['id']} for r in records]
+        return [self.resource_class(self, dict(r)) for r in records]
+
+
+class DeltaSyncTestCase(base.TestCase):
+    """Base test case with a fake client holding one region."""
+
+    def setUp(self):
+        """Create a fake client with one region."""
+        super(DeltaSyncTestCase, self).setUp()
+        self.regions = FakeManager(regions.Region, [
+            {'id': 1, 'name': 'ORD', 'created_at': '2016-01-01T00:00:00'},
+        ])
+        self.hosts = FakeManager(hosts.Host, [
+            {'id': 10, 'region_id': 1, 'name': 'h1',
+             'created_at': '2016-01-01T00:00:00', 'update_at': None},
+            {'id': 11, 'region_id': 1, 'name': 'h2',
+             'created_at': '2016-01-02T00:00:00', 'update_at': None},
+        ])
+        self.cells = FakeManager(regions.Region, [])
+        self.client = mock.Mock()
+        self.client.regions = self.regions
+        self.client.inventory.return_value = mock.Mock(hosts=self.hosts,
+                                                       cells=self.cells)
+        self.added = []
+        self.changed = []
+        self.removed = []
+        self.syncer = sync.DeltaSync(self.client,
+                                     on_added=self.added.append,
+                                     on_changed=self.changed.append,
+                                     on_removed=self.removed.append)
+
+
+class TestDeltaSync(DeltaSyncTestCase):
+    """Tests for the DeltaSync class."""
+
+    def test_first_poll_adds_everything(self):
+        """Verify the first poll reports every record as added."""
+        self.syncer.poll()
+
+        self.assertEqual([('regions', 1), ('hosts', 10), ('hosts', 11)],
+                         [(c.resource_type, c.id) for c in self.added])
+        self.assertEqual('2016-01-02T00:00:00',
+                         self.syncer.watermark('hosts', 1))
+
+    def test_later_polls_only_fetch_changes(self):
+        """Verify we ask for and report only changed records."""
+        self.syncer.poll()
+        self.hosts.records[0]['update_at'] = '2016-01-03T00:00:00'
+        self.hosts.records.append({'id': 12, 'region_id': 1, 'name': 'h3',
+                                   'created_at': '2016-01-04T00:00:00'})
+        del self.hosts.records[1]
+
+        changes = self.syncer.poll()
+
+        self.assertEqual({'changes_since': '2016-01-02T00:00:00'},
+                         self.hosts.calls[1])
+        self.assertEqual([12], [c.id for c in self.added[3:]])
+        self.assertEqual([10], [c.id for c in self.changed])
+        self.assertEqual([11], [c.id for c in self.removed])
+        self.assertEqual(3, len(changes))
+        self.assertEqual('2016-01-04T00:00:00',
+                         self.syncer.watermark('hosts', 1))
+
+    def test_changes_within_the_same_second_are_reported(self):
+        """Verify records changed without a newer timestamp are reported."""
+        self.hosts.records[0]['update_at'] = '2016-01-02T00:00:00'
+        self.syncer.poll()
+        self.hosts.records[0]['name'] = 'h1-renamed'
+
+        self.syncer.poll()
+
+        self.assertEqual([(10, 'h1-renamed')],
+                         [(c.id, c.resource.name) for c in self.changed])
+
+    def test_unchanged_records_are_not_reported(self):
+        """Verify records at the watermark are not reported twice."""
+        self.syncer.poll()
+
+        self.assertEqual([], self.syncer.poll())
+
+    def test_state_is_resumable(self):
+        """Verify the state survives a JSON round trip."""
+        self.syncer.poll()
+        state = json.loads(json.dumps(self.syncer.state))
+
+        resumed = sync.DeltaSync(self.client, state=state)
+
+        self.assertEqual([], resumed.poll())
+
+    def test_removed_regions_remove_their_resources(self):
+        """Verify deleting a region removes its cells and hosts."""
+        self.syncer.poll()
+        self.regions.records = []
+
+        self.syncer.poll()
+
+        self.assertEqual([('regions', 1), ('hosts', 10), ('hosts', 11)],
+                         [(c.resource_type, c.id) for c in self.removed])
+
+
+class TestMirrorSyncChanges(DeltaSyncTestCase):
+    """Tests for InventoryMirror.sync_changes."""
+
+    def test_sync_changes_applies_to_mirror(self):
+        """Verify the mirror applies changes and remembers its state."""
+        inventory_mirror = mirror.InventoryMirror(self.client)
+        self.addCleanup(inventory_mirror.close)
+        inventory_mirror.sync_changes()
+        del self.hosts.records[1]
+
+        changes = inventory_mirror.sync_changes()
+
+        self.assertEqual([(sync.REMOVED, 11)],
+                         [(c.action, c.id) for c in changes])
+        self.assertEqual([10],
+                         [h.id for h in inventory_mirror.hosts_in_region(1)])
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Tests for `cratonclient.v1.variables` module."""
+import mock
+
+from cratonclient.tests import base
+from cratonclient.tests.unit import test_mirror
+from cratonclient.v1 import cells
+from cratonclient.v1 import hosts
+from cratonclient.v1 import regions
+from cratonclient.v1 import sync
+from cratonclient.v1 import variables
+
+REGIONS = [
+    {'id': 1, 'name': 'ORD', 'variables': {'ntp': 'ntp-ord', 'dns': 'd1'}},
+    {'id': 2, 'name': 'DFW', 'variables': {'ntp': 'ntp-dfw'}},
+]
+CELLS = [
+    {'id': 10, 'region_id': 1, 'name': 'C1', 'variables': {'dns': 'd10'}},
+    {'id': 20, 'region_id': 2, 'name': 'C2', 'variables': {}},
+]
+
+
+def host(host_id, region_id, cell_id, **host_variables):
+    """Create a host with its own variables."""
+    return hosts.Host(mock.Mock(), {'id': host_id, 'region_id': region_id,
+                                    'cell_id': cell_id,
+                                    'variables': host_variables})
+
+
+class TestVariableResolver(base.TestCase):
+    """Unit tests for the VariableResolver."""
+
+    def setUp(self):
+        """Create a resolver over a fake client."""
+        super(TestVariableResolver, self).setUp()
+        self.client = test_mirror.fake_client(REGIONS, CELLS, [])
+        self.client.regions.get = mock.Mock(
+            side_effect=lambda region_id: regions.Region(
+                self.client.regions,
+                [r for r in REGIONS if r['id'] == region_id][0]))
+        self.cell_get = mock.Mock(
+            side_effect=lambda cell_id: cells.Cell(
+                mock.Mock(), [c for c in CELLS if c['id'] == cell_id][0]))
+        inventory = self.client.inventory.side_effect
+
+        def inventory_with_get(region_id):
+            inv = inventory(region_id)
+            inv.cells.get = self.cell_get
+            return inv
+
+        self.client.inventory.side_effect = inventory_with_get
+        self.resolver = variables.VariableResolver(self.client)
+
+    def test_layers_host_over_cell_over_region(self):
+        """Verify the most specific layer wins for each variable."""
+        resolved = self.resolver.resolve_many([
+            host(100, 1, 10, ntp='ntp-host'),
+            host(101, 1, 10),
+            host(200, 2, None),
+        ])
+
+        self.assertEqual({'ntp': 'ntp-host', 'dns': 'd10'}, resolved[100])
+        self.assertEqual({'ntp': 'ntp-ord', 'dns': 'd10'}, resolved[101])
+        self.assertEqual({'ntp': 'ntp-dfw'}, resolved[200])
+
+    def test_fetches_each_parent_once(self):
+        """Verify regions and cells are fetched once for many hosts."""
+        self.resolver.resolve_many([host(i, 1, 10) for i in range(50)])
+        self.resolver.resolve(host(99, 1, 10))
+
+        self.client.regions.get.assert_called_once_with(region_id=1)
+        self.cell_get.assert_called_once_with(cell_id=10)
+
+    def test_prime_lists_instead_of_getting(self):
+        """Verify prime loads parents with one listing per region."""
+        self.resolver.prime()
+        self.resolver.resolve_many([host(100, 1, 10), host(200, 2, 20)])
+
+        self.assertFalse(self.client.regions.get.called)
+        self.assertFalse(self.cell_get.called)
+
+    def test_invalidation_refetches_parent(self):
+        """Verify a changed cell is fetched again and layers rebuilt."""
+        self.resolver.resolve(host(100, 1, 10))
+        CELLS[0]['variables'] = {'dns': 'd11'}
+        self.addCleanup(CELLS[0].__setitem__, 'variables', {'dns': 'd10'})
+
+        self.resolver.apply(sync.Change(sync.CHANGED, 'cells', 1, 10, None))
+
+        self.assertEqual('d11', self.resolver.resolve(host(100, 1, 10))['dns'])
+        self.assertEqual(2, self.cell_get.call_count)
+        self.assertEqual(1, self.client.regions.get.call_count)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Ansible dynamic inventory built from the Craton inventory."""
+import json
+import logging
+import os
+import re
+import time
+
+import six
+
+from cratonclient.common import fileutils
+from cratonclient import concurrency
+
+LOG = logging.getLogger(__name__)
+
+_INVALID_GROUP_CHARACTERS = re.compile(r'[^A-Za-z0-9_]')
+
+
+def group_name(*parts):
+    """Return a valid Ansible group name made of the given parts."""
+    return _INVALID_GROUP_CHARACTERS.sub(
+        '_', '_'.join(str(part) for part in parts))
+
+
+def _add_to_group(inventory, group, host_name=None, child=None):
+    entry = inventory.setdefault(group, {'hosts': [], 'children': []})
+    if host_name is not None and host_name not in entry['hosts']:
+        entry['hosts'].append(host_name)
+    if child is not None and child not in entry['children']:
+        entry['children'].append(child)
+
+
+def host_vars(info, region, cell):
+    """Return the Ansible variables of a host.
+
+    The host's own ``variables`` are included along with ``ansible_host``
+    and ``craton_*`` variables describing where it lives.
+    """
+    hostvars = dict(info.get('variables') or {})
+    if info.get('ip_address'):
+        hostvars.setdefault('ansible_host', info['ip_address'])
+    hostvars.update({
+        'craton_id': info.get('id'),
+        'craton_region': region.get('name'),
+        'craton_region_id': region.get('id'),
+        'craton_cell': cell.get('name'),
+        'craton_cell_id': info.get('cell_id'),
+        'craton_device_type': info.get('device_type'),
+        'craton_labels': sorted(info.get('labels') or []),
+    })
+    return hostvars
+
+
+def build_inventory(client, region_ids=None,
+                    max_workers=concurrency.DEFAULT_MAX_WORKERS):
+    """Fetch the Craton inventory and return it as an Ansible inventory.
+
+    Regions are listed first and then the cells and hosts of every region are
+    fetched concurrently, with a single request per region for each. Hosts
+    are grouped by region (``region_<name>``), by cell
+    (``cell_<region name>_<cell name>``, a child of its region's group), by
+    device type (``type_<device type>``) and by label
+    (``label_<label>``).
+
+    .. code-block:: python
+
+        >>> from cratonclient.v1 import ansible_inventory
+        >>> inventory = ansible_inventory.build_inventory(client)
+        >>> inventory['region_ORD']['children']
+        ['cell_ORD_C1', 'cell_ORD_C2']
+
+    :param client:
+        The :class:`~cratonclient.v1.client.Client` to fetch from.
+    :param region_ids:
+        The IDs of the regions to include. Defaults to every region.
+    :param int max_workers:
+        The number of regions to fetch concurrently.
+    :returns:
+        A dictionary in the format Ansible expects from ``--list``, including
+        ``_meta.hostvars``.
+    """
+    regions = [region.to_dict() for region in client.regions.list()]
+    if region_ids is not None:
+        wanted = set(region_ids)
+        regions = [region for region in regions if region['id'] in wanted]
+
+    def fetch(region):
+        inventory = client.inventory(region['id'])
+        return inventory.cells.list(), inventory.hosts.list()
+
+    outcomes = concurrency.map_concurrently(fetch, regions,
+                                            max_workers=max_workers)
+    result = {'_meta': {'hostvars': {}}}
+    hostvars = result['_meta']['hostvars']
+    for outcome in outcomes:
+        if outcome.exception is not None:
+            raise outcome.exception
+        region = outcome.item
+        region_group = group_name('region', region['name'])
+        _add_to_group(result, 'all', child=region_group)
+        _add_to_group(result, region_group)
+        cells, hosts = outcome.result
+        cells = {cell.id: cell.to_dict() for cell in cells}
+        for cell in cells.values():
+            _add_to_group(result, region_group, child=group_name(
+                'cell', region['name'], cell['name']))
+        for host in hosts:
+            info = host.to_dict()
+            name = info.get('name') or info.get('ip_address')
+            cell = cells.get(info.get('cell_id'), {})
+            hostvars[name] = host_vars(info, region, cell)
+            if cell:
+                _add_to_group(result, group_name('cell', region['name'],
+                                                 cell['name']), name)
+            else:
+                _add_to_group(result, region_group, name)
+            if info.get('device_type'):
+                _add_to_group(result, group_name('type', info['device_type']),
+                              name)
+            for label in info.get('labels') or []:
+                _add_to_group(result, group_name('label', label), name)
+    LOG.debug('Built an inventory of %d hosts from %d regions',
+              len(hostvars), len(regions))
+    return result
+
+
+def load_cache(path, ttl, key=None, clock=time.time):
+    """Return a cached inventory if it is younger than ``ttl`` seconds.
+
+    :param str key:
+        Identifies where the inventory was fetched from. An inventory saved
+        with another key is ignored.
+    :returns:
+        The cached inventory, or None if it is missing, stale, unreadable or
+        saved with another key.
+    """
+    try:
+        age = clock() - os.path.getmtime(path)
+        if age > ttl:
+            return None
+        with open(path) as cache_file:
+            cached = json.load(cache_file)
+    except (IOError, OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get('key') != key:
+        return None
+    return cached.get('inventory')
+
+
+def save_cache(path, inventory, key=None):
+    """Atomically write an inventory to the cache file at ``path``."""
+    with fileutils.atomic_write(path) as cache_file:
+        cache_file.write(six.text_type(
+            json.dumps({'key': key, 'inventory': inventory})))
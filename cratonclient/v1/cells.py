@@ -18,7 +18,7 @@ from cratonclient import crud
 class Cell(crud.Resource):
     """Representation of a Region."""
 
-    pass
+    HUMAN_ID = True
 
 
 class CellManager(crud.CRUDClient):
@@ -28,6 +28,7 @@ class CellManager(crud.CRUDClient):
     base_path = '/cells'
     resource_class = Cell
     region_id = 0
+    natural_key = ('name',)
 
     def __init__(self, region_id, session, url):
         """Initialize our CellManager object with region, session, and url."""
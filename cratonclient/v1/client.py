@@ -12,7 +12,10 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 """Top-level client for version 1 of Craton's API."""
+import threading
+
 from cratonclient.v1 import inventory
+from cratonclient.v1 import regions
 
 
 class Client(object):
@@ -36,8 +39,21 @@ class Client(object):
             self._url += '/v1'
 
         self._manager_kwargs = {'session': self._session, 'url': self._url}
+        self.regions = regions.RegionManager(**self._manager_kwargs)
+        self._inventories = {}
+        self._inventories_lock = threading.Lock()
 
     def inventory(self, region_id):
-        """Retrieve inventory for a given region."""
-        self._manager_kwargs['region_id'] = region_id
-        return inventory.Inventory(**self._manager_kwargs)
+        """Retrieve inventory for a given region.
+
+        Each region's inventory is created once and shared, so it may be
+        retrieved as often as needed and from several threads.
+        """
+        with self._inventories_lock:
+            region_inventory = self._inventories.get(region_id)
+            if region_inventory is None:
+                # NOTE: Do not modify the shared keyword arguments.
+                region_inventory = inventory.Inventory(
+                    region_id=region_id, **self._manager_kwargs)
+                self._inventories[region_id] = region_inventory
+            return region_inventory
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Streaming export of the Craton inventory."""
+import csv
+import json
+import logging
+import threading
+
+from concurrent import futures
+import six
+from six.moves import queue
+
+from cratonclient import concurrency
+from cratonclient.v1 import cells
+from cratonclient.v1 import hosts
+from cratonclient.v1 import regions as regions_module
+
+LOG = logging.getLogger(__name__)
+
+RESOURCE_TYPES = ('regions', 'cells', 'hosts')
+DEFAULT_PAGE_SIZE = 500
+
+# NOTE: The columns of a CSV export, which holds every resource type.
+CSV_FIELDS = ['resource_type'] + sorted(
+    set(regions_module.REGION_FIELDS) | set(cells.CELL_FIELDS) |
+    set(hosts.HOST_FIELDS) | set(['labels', 'variables']))
+
+_DONE = object()
+
+
+def iter_inventory(client, resource_types=RESOURCE_TYPES, region_ids=None,
+                   page_size=DEFAULT_PAGE_SIZE,
+                   max_workers=concurrency.DEFAULT_MAX_WORKERS):
+    """Lazily yield ``(resource type, record)`` for the whole inventory.
+
+    Regions are yielded first. The cells and hosts of every region are then
+    listed page by page, for several regions concurrently, and yielded as
+    they arrive through a bounded queue. Memory use therefore does not grow
+    with the size of the inventory.
+
+    :param client:
+        The :class:`~cratonclient.v1.client.Client` to export from.
+    :param resource_types:
+        The resource types to export, out of ``'regions'``, ``'cells'`` and
+        ``'hosts'``.
+    :param region_ids:
+        The IDs of the regions to export. Defaults to every region.
+    :param int page_size:
+        The number of cells or hosts to request per page.
+    :param int max_workers:
+        The number of regions to fetch concurrently.
+    """
+    regions = client.regions.list()
+    if region_ids is not None:
+        wanted = set(region_ids)
+        regions = [region for region in regions if region.id in wanted]
+    if 'regions' in resource_types:
+        for region in regions:
+            yield 'regions', region.to_dict()
+    region_types = [resource_type for resource_type in ('cells', 'hosts')
+                    if resource_type in resource_types]
+    if not regions or not region_types:
+        return
+
+    records = queue.Queue(maxsize=2 * page_size)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                records.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce(region_id):
+        try:
+            for resource_type in region_types:
+                manager = getattr(client.inventory(region_id), resource_type)
+                for resource in manager.iterate(page_size=page_size):
+                    info = resource.to_dict()
+                    info.setdefault('region_id', region_id)
+                    if not put((resource_type, info)):
+                        return
+        except Exception as e:
+            put((_DONE, e))
+            return
+        put((_DONE, None))
+
+    executor = futures.ThreadPoolExecutor(
+        max_workers=max(min(max_workers, len(regions)), 1))
+    producers = []
+    try:
+        for region in regions:
+            producers.append(executor.submit(produce, region.id))
+        remaining = len(regions)
+        while remaining:
+            resource_type, info = records.get()
+            if resource_type is _DONE:
+                remaining -= 1
+                if info is not None:
+                    raise info
+                continue
+            yield resource_type, info
+    finally:
+        stopped.set()
+        for producer in producers:
+            producer.cancel()
+        executor.shutdown(wait=False)
+
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True)
+    if isinstance(value, six.text_type) and not six.PY3:
+        return value.encode('utf-8')
+    return value
+
+
+def write_records(records, stream, record_format='jsonl'):
+    """Write ``(resource type, record)`` pairs to a text stream.
+
+    :param records:
+        An iterable such as the one returned by :func:`iter_inventory`.
+    :param stream:
+        A file-like object open for writing text.
+    :param str record_format:
+        Either ``'jsonl'``, one JSON object per line with a
+        ``resource_type`` key, or ``'csv'``, with the columns in
+        :data:`CSV_FIELDS`.
+    :returns:
+        A dictionary of the number of records written per resource type.
+    """
+    counts = dict.fromkeys(RESOURCE_TYPES, 0)
+    writer = None
+    if record_format == 'csv':
+        writer = csv.DictWriter(stream, CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+    for resource_type, info in records:
+        row = dict(info, resource_type=resource_type)
+        if writer is None:
+            stream.write(json.dumps(row, sort_keys=True) + '\n')
+        else:
+            writer.writerow({k: _csv_value(v) for (k, v) in row.items()})
+        counts[resource_type] = counts.get(resource_type, 0) + 1
+    LOG.debug('Exported %(regions)d regions, %(cells)d cells and %(hosts)d '
+              'hosts', counts)
+    return counts
+
+
+def export_inventory(client, stream, record_format='jsonl', **kwargs):
+    """Stream the inventory to a text stream.
+
+    .. code-block:: python
+
+        >>> import gzip, io
+        >>> from cratonclient.v1 import export
+        >>> with io.TextIOWrapper(gzip.open('fleet.jsonl.gz', 'wb')) as f:
+        ...     export.export_inventory(client, f)
+        {'regions': 3, 'cells': 40, 'hosts': 12000}
+
+    Keyword arguments are passed to :func:`iter_inventory`.
+
+    :returns:
+        A dictionary of the number of records written per resource type.
+    """
+    return write_records(iter_inventory(client, **kwargs), stream,
+                         record_format)
@@ -18,7 +18,7 @@ from cratonclient import crud
 class Host(crud.Resource):
     """Representation of a Host."""
 
-    pass
+    HUMAN_ID = True
 
 
 class HostManager(crud.CRUDClient):
@@ -28,6 +28,7 @@ class HostManager(crud.CRUDClient):
     base_path = '/hosts'
     resource_class = Host
     region_id = 0
+    natural_key = ('name',)
 
     def __init__(self, region_id, session, url):
         """Initialize our HostManager object with region, session and url."""
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""In-memory secondary indexes over fetched inventory."""
+import bisect
+import collections
+import ipaddress
+import threading
+
+import six
+
+from cratonclient import crud
+
+DEFAULT_FIELDS = ('name', 'cell_id', 'device_type')
+
+
+def _address(value):
+    try:
+        return ipaddress.ip_address(six.text_type(value))
+    except ValueError:
+        return None
+
+
+def _field(resource, name):
+    # NOTE: Read what was fetched rather than the attribute, which
+    # lazy-loads a resource missing the field with one GET per resource.
+    return resource._info.get(name)
+
+
+def _hashable(value):
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _hashable(item))
+                            for key, item in value.items()))
+    return value
+
+
+class InventoryIndex(object):
+    """Index resources by their fields for constant time lookups.
+
+    A hash index is kept for each of ``fields`` and IP addresses in
+    ``ip_field`` are kept sorted so that every address within a network can
+    be found with a binary search.
+
+    .. code-block:: python
+
+        >>> from cratonclient.v1 import index
+        >>> hosts = index.InventoryIndex(inventory.hosts.list())
+        >>> host = hosts.by_ip('10.1.1.20')
+        >>> compute = hosts.find(cell_id=4, device_type='server')
+        >>> rack = hosts.in_network('10.1.1.0/24')
+
+    Resources are keyed by ``id``. Adding a resource that is already indexed
+    replaces it, so the index can be kept up to date with the events of
+    :meth:`~cratonclient.crud.CRUDClient.watch` or the changes of a
+    :class:`~cratonclient.v1.sync.DeltaSync` through :meth:`apply`.
+    """
+
+    def __init__(self, resources=(), fields=DEFAULT_FIELDS,
+                 ip_field='ip_address'):
+        """Initialize and populate our index.
+
+        :param resources:
+            An iterable of resources, e.g., returned by
+            :meth:`~cratonclient.v1.hosts.HostManager.list`.
+        :param tuple fields:
+            The names of the fields to keep a hash index of.
+        :param str ip_field:
+            The name of the field holding an IP address, or None to not
+            index addresses.
+        """
+        self.fields = tuple(fields)
+        self.ip_field = ip_field
+        self._lock = threading.RLock()
+        self._resources = collections.OrderedDict()
+        self._indexes = {field: {} for field in self.fields}
+        self._addresses = []
+        entries = {}
+        for resource in resources:
+            self._remove(resource.id)
+            self._resources[resource.id] = resource
+            self._index(resource)
+            entries[resource.id] = self._address_entry(resource)
+        # NOTE: Sort once rather than inserting in order one at a time.
+        self._addresses = sorted(entry for entry in entries.values()
+                                 if entry is not None)
+
+    def __len__(self):
+        """Return the number of resources indexed."""
+        return len(self._resources)
+
+    def __iter__(self):
+        """Iterate over the resources in the order they were added."""
+        with self._lock:
+            return iter(list(self._resources.values()))
+
+    def __contains__(self, resource_id):
+        """Return whether a resource ID is indexed."""
+        return resource_id in self._resources
+
+    def _address_entry(self, resource):
+        if self.ip_field is None:
+            return None
+        address = _address(_field(resource, self.ip_field))
+        if address is None:
+            return None
+        return (address.version, int(address), resource.id)
+
+    def _index(self, resource):
+        for field in self.fields:
+            value = _hashable(_field(resource, field))
+            self._indexes[field].setdefault(value, set()).add(resource.id)
+
+    def _remove(self, resource_id):
+        resource = self._resources.pop(resource_id, None)
+        if resource is None:
+            return None
+        for field in self.fields:
+            value = _hashable(_field(resource, field))
+            ids = self._indexes[field].get(value)
+            if ids is not None:
+                ids.discard(resource_id)
+                if not ids:
+                    del self._indexes[field][value]
+        entry = self._address_entry(resource)
+        if entry is not None:
+            position = bisect.bisect_left(self._addresses, entry)
+            if (position < len(self._addresses) and
+                    self._addresses[position] == entry):
+                del self._addresses[position]
+        return resource
+
+    def add(self, resource):
+        """Index a resource, replacing any with the same ID."""
+        with self._lock:
+            self._remove(resource.id)
+            self._resources[resource.id] = resource
+            self._index(resource)
+            entry = self._address_entry(resource)
+            if entry is not None:
+                bisect.insort(self._addresses, entry)
+
+    def remove(self, resource_id):
+        """Stop indexing a resource and return it, if it was indexed."""
+        with self._lock:
+            return self._remove(resource_id)
+
+    def apply(self, event):
+        """Apply a change reported by a watch or a delta sync.
+
+        :param event:
+            A :class:`~cratonclient.crud.WatchEvent` or a
+            :class:`~cratonclient.v1.sync.Change`.
+        """
+        if event.action == crud.REMOVED:
+            self.remove(event.id)
+        else:
+            self.add(event.resource)
+
+    def get(self, resource_id):
+        """Return a resource by ID, or None."""
+        return self._resources.get(resource_id)
+
+    def _resolve(self, ids):
+        return [self._resources[resource_id]
+                for resource_id in sorted(ids)]
+
+    def find(self, **criteria):
+        """Return the resources matching every criterion.
+
+        Criteria on indexed fields are answered from their indexes, starting
+        with the most selective one. Other criteria are checked against the
+        remaining candidates.
+
+        .. code-block:: python
+
+            >>> hosts.find(cell_id=4, device_type='server', active=True)
+        """
+        with self._lock:
+            candidates = None
+            indexed = sorted(
+                (len(self._indexes[field].get(_hashable(value), ())), field)
+                for field, value in criteria.items()
+                if field in self._indexes)
+            for _, field in indexed:
+                ids = self._indexes[field].get(_hashable(criteria[field]),
+                                               set())
+                candidates = (set(ids) if candidates is None
+                              else candidates & ids)
+                if not candidates:
+                    return []
+            if candidates is None:
+                candidates = self._resources
+            remaining = [(field, value) for field, value in criteria.items()
+                         if field not in self._indexes]
+            return [resource for resource in self._resolve(candidates)
+                    if all(_field(resource, field) == value
+                           for field, value in remaining)]
+
+    def find_one(self, **criteria):
+        """Return the first resource matching every criterion, or None."""
+        resources = self.find(**criteria)
+        return resources[0] if resources else None
+
+    def values(self, field):
+        """Return the distinct values of an indexed field."""
+        with self._lock:
+            return list(self._indexes[field])
+
+    def _address_range(self, low, high):
+        with self._lock:
+            start = bisect.bisect_left(self._addresses, low)
+            end = bisect.bisect_right(self._addresses, high)
+            return [self._resources[entry[2]]
+                    for entry in self._addresses[start:end]]
+
+    def by_ip(self, address):
+        """Return the resource with an IP address, or None."""
+        address = _address(address)
+        if address is None:
+            return None
+        key = (address.version, int(address))
+        resources = self._address_range(key, key + (float('inf'),))
+        return resources[0] if resources else None
+
+    def in_network(self, network):
+        """Return the resources whose address is within a network.
+
+        :param str network:
+            A network in CIDR notation, e.g., ``'10.1.0.0/16'``.
+        """
+        network = ipaddress.ip_network(six.text_type(network), strict=False)
+        return self._address_range(
+            (network.version, int(network.network_address)),
+            (network.version, int(network.broadcast_address),
+             float('inf')))
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Local SQLite mirror of the Craton inventory."""
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from cratonclient import concurrency
+from cratonclient.v1 import sync as delta_sync
+
+LOG = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS regions (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS regions_name ON regions (name);
+
+CREATE TABLE IF NOT EXISTS cells (
+    id INTEGER PRIMARY KEY,
+    region_id INTEGER,
+    name TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cells_region_id ON cells (region_id);
+CREATE INDEX IF NOT EXISTS cells_name ON cells (name);
+
+CREATE TABLE IF NOT EXISTS hosts (
+    id INTEGER PRIMARY KEY,
+    region_id INTEGER,
+    cell_id INTEGER,
+    name TEXT,
+    ip_address TEXT,
+    device_type TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS hosts_region_id ON hosts (region_id);
+CREATE INDEX IF NOT EXISTS hosts_cell_id ON hosts (cell_id);
+CREATE INDEX IF NOT EXISTS hosts_name ON hosts (name);
+CREATE INDEX IF NOT EXISTS hosts_ip_address ON hosts (ip_address);
+CREATE INDEX IF NOT EXISTS hosts_device_type ON hosts (device_type);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    resource TEXT PRIMARY KEY,
+    synced_at REAL,
+    watermark TEXT
+);
+"""
+
+# NOTE: The indexed columns of each table, in insertion order, after ``id``.
+COLUMNS = {
+    'regions': ('name',),
+    'cells': ('region_id', 'name'),
+    'hosts': ('region_id', 'cell_id', 'name', 'ip_address', 'device_type'),
+}
+
+
+class InventoryMirror(object):
+    """Mirror regions, cells and hosts into an indexed SQLite database.
+
+    Queries are answered from the local database. When ``max_age`` is set,
+    a query against a mirror older than ``max_age`` seconds first
+    re-synchronizes it from the API.
+
+    .. code-block:: python
+
+        >>> from cratonclient.v1 import mirror
+        >>> inventory_mirror = mirror.InventoryMirror(
+        ...     client, path='/var/cache/craton.sqlite', max_age=300,
+        ... )
+        >>> inventory_mirror.sync()
+        >>> host = inventory_mirror.host_by_ip('10.1.1.20')
+        >>> hosts = inventory_mirror.hosts_in_cell(4)
+
+    Resources returned by the mirror are fully loaded and bound to the
+    managers of the given client so that they can still be updated or
+    deleted.
+    """
+
+    def __init__(self, client, path=':memory:', max_age=None,
+                 max_workers=concurrency.DEFAULT_MAX_WORKERS,
+                 clock=time.time):
+        """Initialize our mirror.
+
+        :param client:
+            The :class:`~cratonclient.v1.client.Client` to synchronize from.
+        :param str path:
+            The path of the SQLite database. Defaults to an in-memory
+            database.
+        :param float max_age:
+            The number of seconds after which the mirror is considered stale
+            and is synchronized before answering a query. If not provided,
+            the mirror is only synchronized by :meth:`sync`.
+        :param int max_workers:
+            The number of regions to fetch concurrently.
+        """
+        self.client = client
+        self.path = path
+        self.max_age = max_age
+        self.max_workers = max_workers
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def close(self):
+        """Close the underlying database."""
+        with self._lock:
+            self._connection.close()
+
+    def _fetch_region(self, region):
+        inventory = self.client.inventory(region.id)
+        return inventory.cells.list(), inventory.hosts.list()
+
+    def sync(self):
+        """Replace the mirror's contents with the current inventory.
+
+        Regions are listed first and then the cells and hosts of every
+        region are fetched concurrently.
+
+        :returns:
+            A dictionary of the number of regions, cells and hosts mirrored.
+        """
+        regions = self.client.regions.list()
+        outcomes = concurrency.map_concurrently(
+            self._fetch_region, regions, max_workers=self.max_workers)
+        for outcome in outcomes:
+            if outcome.exception is not None:
+                raise outcome.exception
+
+        with self._lock, self._connection:
+            for table in ('regions', 'cells', 'hosts'):
+                self._connection.execute('DELETE FROM {0}'.format(table))
+            self._upsert('regions', regions)
+            counts = {'regions': len(regions), 'cells': 0, 'hosts': 0}
+            for outcome in outcomes:
+                cells, hosts = outcome.result
+                self._upsert('cells', cells, region_id=outcome.item.id)
+                self._upsert('hosts', hosts, region_id=outcome.item.id)
+                counts['cells'] += len(cells)
+                counts['hosts'] += len(hosts)
+            self._mark_synced('inventory')
+        LOG.debug('Mirrored %(regions)d regions, %(cells)d cells and '
+                  '%(hosts)d hosts', counts)
+        return counts
+
+    def _upsert(self, table, resources, region_id=None):
+        columns = ('id',) + COLUMNS[table] + ('data',)
+        statement = 'INSERT OR REPLACE INTO {0} ({1}) VALUES ({2})'.format(
+            table, ', '.join(columns), ', '.join('?' * len(columns)))
+        rows = []
+        for resource in resources:
+            info = resource.to_dict()
+            if region_id is not None:
+                info.setdefault('region_id', region_id)
+            rows.append([info.get('id')] +
+                        [info.get(column) for column in COLUMNS[table]] +
+                        [json.dumps(info, sort_keys=True)])
+        self._connection.executemany(statement, rows)
+
+    def _mark_synced(self, resource, watermark=None):
+        self._connection.execute(
+            'INSERT OR REPLACE INTO sync_state (resource, synced_at, '
+            'watermark) VALUES (?, ?, ?)',
+            (resource, self._clock(), watermark))
+
+    def sync_changes(self, **kwargs):
+        """Apply only the changes made since the last call.
+
+        This uses a :class:`~cratonclient.v1.sync.DeltaSync` whose state is
+        saved in the mirror so that it survives restarts. The first call
+        lists everything. Keyword arguments are passed to the
+        :class:`~cratonclient.v1.sync.DeltaSync`.
+
+        :returns:
+            The list of :class:`~cratonclient.v1.sync.Change` applied.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT watermark FROM sync_state WHERE resource = ?',
+                ('delta',)).fetchone()
+        state = json.loads(row['watermark']) if row is not None else None
+        syncer = delta_sync.DeltaSync(self.client, state=state,
+                                      max_workers=self.max_workers, **kwargs)
+        changes = syncer.poll()
+
+        with self._lock, self._connection:
+            for change in changes:
+                if change.action == delta_sync.REMOVED:
+                    self._connection.execute(
+                        'DELETE FROM {0} WHERE id = ?'.format(
+                            change.resource_type), (change.id,))
+                else:
+                    self._upsert(change.resource_type, [change.resource],
+                                 region_id=change.region_id)
+            self._mark_synced('delta', json.dumps(syncer.state))
+            self._mark_synced('inventory')
+        return changes
+
+    def synced_at(self, resource='inventory'):
+        """Return when the mirror was last synchronized, if ever."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT synced_at FROM sync_state WHERE resource = ?',
+                (resource,)).fetchone()
+        return None if row is None else row['synced_at']
+
+    def is_stale(self):
+        """Return whether the mirror is older than ``max_age``."""
+        synced_at = self.synced_at()
+        if synced_at is None:
+            return True
+        if self.max_age is None:
+            return False
+        return self._clock() - synced_at > self.max_age
+
+    def _ensure_fresh(self):
+        if self.max_age is not None and self.is_stale():
+            self.sync()
+
+    def _query(self, table, where='', parameters=()):
+        self._ensure_fresh()
+        statement = 'SELECT data FROM {0}'.format(table)
+        if where:
+            statement += ' WHERE ' + where
+        statement += ' ORDER BY id'
+        with self._lock:
+            rows = self._connection.execute(statement, parameters).fetchall()
+        return [self._resource(table, json.loads(row['data']))
+                for row in rows]
+
+    def _resource(self, table, info):
+        if table == 'regions':
+            manager = self.client.regions
+        else:
+            manager = getattr(self.client.inventory(info.get('region_id')),
+                              table)
+        return manager.resource_class(manager, info, loaded=True)
+
+    def _first(self, resources):
+        return resources[0] if resources else None
+
+    def regions(self):
+        """Return every mirrored region."""
+        return self._query('regions')
+
+    def get_region(self, region_id):
+        """Return a region by ID, or None."""
+        return self._first(self._query('regions', 'id = ?', (region_id,)))
+
+    def cells_in_region(self, region_id):
+        """Return the cells of a region."""
+        return self._query('cells', 'region_id = ?', (region_id,))
+
+    def get_cell(self, cell_id):
+        """Return a cell by ID, or None."""
+        return self._first(self._query('cells', 'id = ?', (cell_id,)))
+
+    def get_host(self, host_id):
+        """Return a host by ID, or None."""
+        return self._first(self._query('hosts', 'id = ?', (host_id,)))
+
+    def host_by_ip(self, ip_address):
+        """Return the host with an IP address, or None."""
+        return self._first(self._query('hosts', 'ip_address = ?',
+                                       (ip_address,)))
+
+    def hosts_by_name(self, name):
+        """Return the hosts with a name."""
+        return self._query('hosts', 'name = ?', (name,))
+
+    def hosts_in_cell(self, cell_id):
+        """Return the hosts of a cell."""
+        return self._query('hosts', 'cell_id = ?', (cell_id,))
+
+    def hosts_in_region(self, region_id, device_type=None):
+        """Return the hosts of a region, optionally of one device type."""
+        if device_type is None:
+            return self._query('hosts', 'region_id = ?', (region_id,))
+        return self._query('hosts', 'region_id = ? AND device_type = ?',
+                           (region_id, device_type))
@@ -18,7 +18,7 @@ from cratonclient import crud
 class Region(crud.Resource):
     """Representation of a Region."""
 
-    pass
+    HUMAN_ID = True
 
 
 class RegionManager(crud.CRUDClient):
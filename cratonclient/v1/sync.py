@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+"""Incremental synchronization of the Craton inventory."""
+import collections
+import hashlib
+import json
+import logging
+
+from oslo_utils import timeutils
+
+from cratonclient import concurrency
+from cratonclient import crud
+
+LOG = logging.getLogger(__name__)
+
+ADDED = crud.ADDED
+CHANGED = crud.CHANGED
+REMOVED = crud.REMOVED
+
+Change = collections.namedtuple(
+    'Change', ['action', 'resource_type', 'region_id', 'id', 'resource'])
+
+
+def changed_at(info):
+    """Return when a record last changed as a naive UTC datetime.
+
+    This uses the ``update_at`` field and falls back to ``created_at``.
+    """
+    stamp = info.get('update_at') or info.get('created_at')
+    if not stamp:
+        return None
+    return timeutils.normalize_time(timeutils.parse_isotime(stamp))
+
+
+def _digest(info):
+    """Return a digest of a record's fields."""
+    data = json.dumps(info, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def _isoformat(stamp):
+    return None if stamp is None else stamp.isoformat()
+
+
+class DeltaSync(object):
+    """Fetch only the inventory records changed since the last poll.
+
+    A watermark, the newest ``update_at``/``created_at`` seen so far, is
+    kept per resource type and region. Each poll asks the server for records
+    changed since the watermark (using the ``since_param`` query parameter)
+    and compares a digest of their fields to that of the records already
+    known to report which were added and which changed. Timestamps alone
+    would miss records changed twice within their precision. Removals are
+    detected by listing only the IDs of the records, unless
+    ``detect_removals`` is False.
+
+    .. code-block:: python
+
+        >>> from cratonclient.v1 import sync
+        >>> syncer = sync.DeltaSync(
+        ...     client,
+        ...     on_added=cmdb.create,
+        ...     on_changed=cmdb.update,
+        ...     on_removed=cmdb.delete,
+        ... )
+        >>> while True:
+        ...     syncer.poll()
+        ...     time.sleep(30)
+
+    The first poll lists everything and reports every record as added.
+    ``state`` is a JSON serializable dictionary that may be saved and passed
+    back in to resume from where a previous instance stopped.
+    """
+
+    def __init__(self, client, on_added=None, on_changed=None,
+                 on_removed=None, state=None, detect_removals=True,
+                 since_param='changes_since',
+                 max_workers=concurrency.DEFAULT_MAX_WORKERS):
+        """Initialize our synchronizer.
+
+        :param client:
+            The :class:`~cratonclient.v1.client.Client` to poll.
+        :param on_added:
+            Called with a :class:`Change` for every new record.
+        :param on_changed:
+            Called with a :class:`Change` for every modified record.
+        :param on_removed:
+            Called with a :class:`Change` for every deleted record. Its
+            ``resource`` is None.
+        :param dict state:
+            The ``state`` of a previous instance to resume from.
+        :param bool detect_removals:
+            Whether to list record IDs to detect deleted records.
+        :param str since_param:
+            The query parameter used to ask for records changed since the
+            watermark.
+        :param int max_workers:
+            The number of regions to poll concurrently.
+        """
+        self.client = client
+        self.callbacks = {
+            ADDED: on_added,
+            CHANGED: on_changed,
+            REMOVED: on_removed,
+        }
+        self.state = state if state is not None else {}
+        self.state.setdefault('watermarks', {})
+        self.state.setdefault('known', {})
+        self.detect_removals = detect_removals
+        self.since_param = since_param
+        self.max_workers = max_workers
+
+    def watermark(self, resource_type, region_id=None):
+        """Return the watermark of a resource type, if any."""
+        return self.state['watermarks'].get(
+            self._key(resource_type, region_id))
+
+    def _key(self, resource_type, region_id):
+        if region_id is None:
+            return resource_type
+        return '{0}:{1}'.format(resource_type, region_id)
+
+    def poll(self):
+        """Fetch the changes since the last poll and emit them.
+
+        :returns:
+            The list of :class:`Change` emitted.
+        """
+        changes = self._poll_manager('regions', self.client.regions, None)
+        region_ids = sorted(int(region_id) for region_id in
+                            self.state['known'].get('regions', {}))
+        removed_regions = set(change.id for change in changes
+                              if change.action == REMOVED)
+
+        outcomes = concurrency.map_concurrently(
+            self._poll_region, region_ids, max_workers=self.max_workers)
+        for outcome in outcomes:
+            if outcome.exception is not None:
+                raise outcome.exception
+            changes.extend(outcome.result)
+        for region_id in removed_regions:
+            changes.extend(self._forget_region(region_id))
+
+        for change in changes:
+            callback = self.callbacks[change.action]
+            if callback is not None:
+                callback(change)
+        return changes
+
+    def _poll_region(self, region_id):
+        inventory = self.client.inventory(region_id)
+        return (self._poll_manager('cells', inventory.cells, region_id) +
+                self._poll_manager('hosts', inventory.hosts, region_id))
+
+    def _forget_region(self, region_id):
+        changes = []
+        for resource_type in ('cells', 'hosts'):
+            key = self._key(resource_type, region_id)
+            self.state['watermarks'].pop(key, None)
+            for record_id in sorted(self.state['known'].pop(key, {})):
+                changes.append(Change(REMOVED, resource_type, region_id,
+                                      int(record_id), None))
+        return changes
+
+    def _poll_manager(self, resource_type, manager, region_id):
+        key = self._key(resource_type, region_id)
+        watermark = self.state['watermarks'].get(key)
+        known = self.state['known'].setdefault(key, {})
+        params = {}
+        newest = None
+        if watermark is not None:
+            params[self.since_param] = watermark
+            newest = timeutils.normalize_time(
+                timeutils.parse_isotime(watermark))
+        since = newest
+
+        changes = []
+        listed_ids = set()
+        for resource in manager.list(**params):
+            info = resource.to_dict()
+            record_id = str(info['id'])
+            listed_ids.add(record_id)
+            stamp = changed_at(info)
+            if since is not None and stamp is not None and stamp < since:
+                # NOTE: The server ignored our filter, skip what we have
+                # already seen.
+                continue
+            digest = _digest(info)
+            previous = known.get(record_id)
+            if previous is None:
+                action = ADDED
+            elif previous != digest:
+                action = CHANGED
+            else:
+                continue
+            known[record_id] = digest
+            if stamp is not None and (newest is None or stamp > newest):
+                newest = stamp
+            changes.append(Change(action, resource_type, region_id,
+                                  info['id'], resource))
+
+        if watermark is None:
+            current_ids = listed_ids
+        elif self.detect_removals:
+            current_ids = set(str(resource.id)
+                              for resource in manager.list(fields=['id']))
+        else:
+            current_ids = None
+        if current_ids is not None:
+            for record_id in sorted(set(known) - current_ids):
+                del known[record_id]
+                changes.append(Change(REMOVED, resource_type, region_id,
+                                      int(record_id), None))
+
+        if newest is not None:
+            self.state['watermarks'][key] = _isoformat(newest)
+        LOG.debug('%d changes to %s since %s', len(changes), key, watermark)
+        return changes